@@ -34,6 +34,7 @@ SIMULATED_DATA_SAMPLES_TEST = 150  # Default number of samples for simulated tes
 # Real Trading defaults
 REAL_TRADE_MIN_OPERATIONAL_USDT = 10.0  # Minimum USDT for a real trade operation
 REAL_TRADE_DEFAULT_INVESTMENT_USDT = 10.0 # Default investment for a real trade if not specified by UI and balance > 100
+DEPTH_ORDER_BOOK_LIMIT = 20 # L2 levels fetched per leg to price fills by VWAP instead of top-of-book
 
 # Batch Processing settings
 BATCH_PRACTICAL_MIN_INVESTMENT = 50.0 # Practical minimum investment for an opportunity considered in batch processing if balance allows
@@ -5,14 +5,14 @@ from datetime import datetime, timezone
 import numpy as np # Para características de modelo, si es necesario
 import pandas as pd # Para características de modelo, si es necesario
 
-from arbitrage_calculator import calculate_net_profitability
+from arbitrage_calculator import calculate_net_profitability, calculate_depth_aware_profitability
 from arbitrage_executor import evaluate_and_simulate_arbitrage
 from data_logger import log_operation_to_csv
 from config import (
     MIN_PROFIT_PERCENTAGE, MIN_PROFIT_FOR_ADJUSTMENT_USDT,
     INVESTMENT_ADJUSTMENT_STEP_USDT, MAX_INVESTMENT_ADJUSTMENT_ATTEMPTS,
     MAX_INVESTMENT_PERCENTAGE_OF_BALANCE, OPERATIONS_LOG_CSV_PATH,
-    REAL_TRADE_MIN_OPERATIONAL_USDT, BATCH_PRACTICAL_MIN_INVESTMENT,
+    REAL_TRADE_MIN_OPERATIONAL_USDT, BATCH_PRACTICAL_MIN_INVESTMENT, DEPTH_ORDER_BOOK_LIMIT,
     DEFAULT_USDT_HOLDER_EXCHANGE_ID # Necesario si app.usdt_holder_exchange_id es None
 )
 
@@ -147,12 +147,31 @@ class OpportunityProcessor:
 
                     orig_inv_detail = inv_amount; best_profit_res = None; best_inv = inv_amount
                     max_inv_cap = current_bal * (MAX_INVESTMENT_PERCENTAGE_OF_BALANCE / 100.0); final_adj_attempt = 0
+
+                    # Depth-aware fill prices: the whole adjustment ladder is evaluated against L2 books in one pass
+                    book_buy, book_sell = await asyncio.gather(
+                        self.app.helpers.get_order_book(ai_input_for_log['ex_min_id_sebo'], symbol, DEPTH_ORDER_BOOK_LIMIT),
+                        self.app.helpers.get_order_book(ai_input_for_log['ex_max_id_sebo'], symbol, DEPTH_ORDER_BOOK_LIMIT))
+                    depth_res = None
+                    if book_buy and book_sell:
+                        ladder = [min(orig_inv_detail + k * INVESTMENT_ADJUSTMENT_STEP_USDT, current_bal, max_inv_cap) for k in range(MAX_INVESTMENT_ADJUSTMENT_ATTEMPTS + 1)]
+                        depth_res = calculate_depth_aware_profitability(ai_input_for_log, ladder, book_buy, book_sell)
+                        if depth_res.get("error_message"): depth_res = None
+                    ai_input_for_log.update({'top_of_book_price_ex_min_buy_asset': ai_input_for_log['current_price_ex_min_buy_asset'],
+                                             'top_of_book_price_ex_max_sell_asset': ai_input_for_log['current_price_ex_max_sell_asset'],
+                                             'depth_aware_results': depth_res})
                     for adj_attempt in range(MAX_INVESTMENT_ADJUSTMENT_ATTEMPTS + 1):
                         final_adj_attempt = adj_attempt
                         if adj_attempt > 0: inv_amount += INVESTMENT_ADJUSTMENT_STEP_USDT
                         inv_amount = min(inv_amount, current_bal, max_inv_cap)
                         if inv_amount < REAL_TRADE_MIN_OPERATIONAL_USDT and adj_attempt > 0: break
                         ai_input_for_log['determined_investment_usdt_v2'] = inv_amount
+                        if depth_res is not None:
+                            if not depth_res['fully_filled'][adj_attempt]:
+                                if adj_attempt == 0: ai_input_for_log['net_profitability_results'] = {"error_message": "Order book depth cannot fill the investment."}
+                                break
+                            ai_input_for_log['current_price_ex_min_buy_asset'] = depth_res['buy_vwap'][adj_attempt]
+                            ai_input_for_log['current_price_ex_max_sell_asset'] = depth_res['sell_vwap'][adj_attempt]
                         curr_profit_res = calculate_net_profitability(ai_input_for_log, inv_amount)
                         if curr_profit_res is None or curr_profit_res.get("error_message"):
                             if adj_attempt == 0: ai_input_for_log['net_profitability_results'] = curr_profit_res or {"error_message":"Calc error"}
@@ -164,6 +183,10 @@ class OpportunityProcessor:
                         if adj_attempt >= MAX_INVESTMENT_ADJUSTMENT_ATTEMPTS: break
 
                     profit_res = best_profit_res; inv_amount = best_inv
+                    if depth_res is not None and profit_res:
+                        # Leave the VWAPs of the chosen size (not the last one tried) for the simulation and the log
+                        ai_input_for_log.update({'current_price_ex_min_buy_asset': profit_res['calculation_stages']['s0_price_buy_at_ex_min'],
+                                                 'current_price_ex_max_sell_asset': profit_res['calculation_stages']['s0_price_sell_at_ex_max']})
                     ai_input_for_log.update({'determined_investment_usdt_v2': inv_amount, 'net_profitability_results': profit_res, 'investment_adjustment_attempts_made': final_adj_attempt + 1, 'original_calculated_investment_before_adjustment': orig_inv_detail})
 
                     if not profit_res or profit_res.get("error_message"):
@@ -41,6 +41,20 @@ class V2Helpers:
             print(f"V2Helpers: CCXT Generic Error Ticker {symbol}@{exchange_id}: {e}")
         return None, None
 
+    async def get_order_book(self, exchange_id: str, symbol: str, limit: int = None):
+        exchange = await self.get_ccxt_exchange_instance(exchange_id)
+        if not exchange:
+            return None
+        try:
+            return await exchange.fetch_order_book(symbol, limit)
+        except ccxt.NetworkError as e:
+            print(f"V2Helpers: CCXT NetworkError OrderBook {symbol}@{exchange_id}: {e}")
+        except ccxt.ExchangeError as e:
+            print(f"V2Helpers: CCXT ExchangeError OrderBook {symbol}@{exchange_id}: {e}")
+        except Exception as e:
+            print(f"V2Helpers: CCXT Generic Error OrderBook {symbol}@{exchange_id}: {e}")
+        return None
+
     async def get_usdt_withdrawal_info(self, from_exchange_id: str):
         usdt_withdrawal_info = {
             "selected_network": None, "selected_fee": float('inf'), "all_networks": []
@@ -3,7 +3,7 @@
 import logging
 import numpy as np
 import pandas as pd
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime, timezone
 import joblib
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
@@ -14,6 +14,17 @@ import os
 
 from config_v3 import AI_MODEL_PATH, AI_CONFIDENCE_THRESHOLD, MIN_PROFIT_PERCENTAGE, MIN_PROFIT_USDT
 from utils import safe_float, safe_dict_get, get_current_timestamp
+from inference_service import InferenceService
+from metrics import registry
+
+MODEL_TRAINED = registry.gauge('v3_ai_model_trained', 'Modelo de IA entrenado y cargado (1) o fallback (0)')
+INFERENCE_QUEUE_DEPTH = registry.gauge('v3_inference_queue_depth', 'Solicitudes esperando micro-batch')
+INFERENCE_INFLIGHT_BATCHES = registry.gauge('v3_inference_inflight_batches', 'Micro-batches ejecutándose en el pool')
+
+POPULAR_CURRENCIES = ['BTC', 'ETH', 'BNB', 'ADA', 'SOL', 'XRP', 'DOT', 'AVAX']
+
+# Lote columnar aceptado por la API batch: DataFrame, array estructurado o lista de dicts
+FeatureBatch = Union[pd.DataFrame, np.ndarray, List[Dict]]
 
 class ArbitrageAIModel:
     """Modelo de IA para análisis y decisiones de arbitraje."""
@@ -30,6 +41,7 @@ class ArbitrageAIModel:
         # Preprocesadores
         self.feature_scaler = StandardScaler()
         self.label_encoders = {}
+        self.encoder_lookups: Dict[str, Dict[str, int]] = {}  # Tablas clase -> código precalculadas
         
         # Metadatos del modelo
         self.feature_names = []
@@ -39,6 +51,10 @@ class ArbitrageAIModel:
         # Configuración del modelo
         self.confidence_threshold = AI_CONFIDENCE_THRESHOLD
         
+        # Servicio de inferencia fuera del event loop (se inicia con start_inference_service)
+        self.inference_service = InferenceService(self)
+        registry.register_collector(self._collect_metrics)
+        
         # Intentar cargar modelo existente
         self._load_model()
     
@@ -55,6 +71,7 @@ class ArbitrageAIModel:
                 self.label_encoders = model_data.get('label_encoders', {})
                 self.feature_names = model_data.get('feature_names', [])
                 self.training_history = model_data.get('training_history', {})
+                self._build_encoder_lookups()
                 
                 self.is_trained = all([
                     self.profitability_classifier is not None,
@@ -158,8 +175,7 @@ class ArbitrageAIModel:
             base_currency = symbol.split('/')[0] if '/' in symbol else 'UNKNOWN'
             
             # Características específicas de monedas populares
-            popular_currencies = ['BTC', 'ETH', 'BNB', 'ADA', 'SOL', 'XRP', 'DOT', 'AVAX']
-            features['is_popular_currency'] = 1 if base_currency in popular_currencies else 0
+            features['is_popular_currency'] = 1 if base_currency in POPULAR_CURRENCIES else 0
             features['is_btc'] = 1 if base_currency == 'BTC' else 0
             features['is_eth'] = 1 if base_currency == 'ETH' else 0
             
@@ -185,6 +201,113 @@ class ArbitrageAIModel:
             # Retornar vector de ceros como fallback
             return np.zeros((1, len(self.feature_names) if self.feature_names else 10))
     
+    def _build_encoder_lookups(self):
+        """Precalcula tablas de lookup a partir de los LabelEncoders ajustados."""
+        self.encoder_lookups = {}
+        for name, encoder in self.label_encoders.items():
+            classes = getattr(encoder, 'classes_', None)
+            if classes is not None:
+                self.encoder_lookups[name] = {label: code for code, label in enumerate(classes)}
+    
+    def _batch_to_frame(self, batch: FeatureBatch) -> pd.DataFrame:
+        """Normaliza un lote a DataFrame sin copiar si ya es columnar."""
+        if isinstance(batch, pd.DataFrame):
+            return batch.reset_index(drop=True)
+        if isinstance(batch, np.ndarray) and batch.dtype.names:
+            return pd.DataFrame.from_records(batch)
+        return pd.DataFrame.from_records(list(batch))
+    
+    def _numeric_column(self, df: pd.DataFrame, column: str, default: float) -> np.ndarray:
+        """Extrae una columna numérica, usando default para ausentes o inválidos."""
+        if column not in df:
+            return np.full(len(df), default, dtype=float)
+        return pd.to_numeric(df[column], errors='coerce').fillna(default).to_numpy(dtype=float)
+    
+    def _nested_column(self, df: pd.DataFrame, column: str, parent: str, path: Tuple[str, ...], default: float) -> np.ndarray:
+        """Extrae una columna plana o, si no existe, el valor anidado en dicts (p.ej. market_data)."""
+        if column in df or parent not in df:
+            return self._numeric_column(df, column, default)
+        
+        def extract(value):
+            for key in path:
+                if not isinstance(value, dict):
+                    return default
+                value = value.get(key, default)
+            return safe_float(value, default)
+        
+        return df[parent].map(extract).to_numpy(dtype=float)
+    
+    def _encode_column(self, df: pd.DataFrame, column: str, encoder_name: str) -> np.ndarray:
+        """Codifica exchanges con la tabla precalculada; los no vistos quedan en -1."""
+        if encoder_name not in self.encoder_lookups:
+            self._build_encoder_lookups()
+        lookup = self.encoder_lookups.get(encoder_name, {})
+        
+        if column not in df:
+            return np.full(len(df), lookup.get('unknown', -1), dtype=float)
+        return df[column].fillna('unknown').map(lookup).fillna(-1).to_numpy(dtype=float)
+    
+    def prepare_features_batch(self, batch: FeatureBatch) -> np.ndarray:
+        """Prepara la matriz de características de un lote completo en operaciones vectorizadas.
+        
+        Acepta columnas planas (buy_fee_taker, sell_fee_taker, balance_usdt) o los dicts
+        anidados market_data/balance_config que usa prepare_features.
+        """
+        df = self._batch_to_frame(batch)
+        n = len(df)
+        features = {}
+        
+        # Características de precios
+        buy_price = self._numeric_column(df, 'current_price_buy', 0.0)
+        sell_price = self._numeric_column(df, 'current_price_sell', 0.0)
+        valid_price = buy_price > 0
+        safe_buy = np.where(valid_price, buy_price, 1.0)
+        
+        features['price_difference_percentage'] = np.where(valid_price, (sell_price - buy_price) / safe_buy * 100, 0.0)
+        features['price_ratio'] = np.where(valid_price, sell_price / safe_buy, 1.0)
+        features['buy_price'] = buy_price
+        features['sell_price'] = sell_price
+        
+        # Características de volumen e inversión
+        investment = self._numeric_column(df, 'investment_usdt', 0.0)
+        features['investment_usdt'] = investment
+        
+        # Características de exchanges
+        features['buy_exchange_encoded'] = self._encode_column(df, 'buy_exchange_id', 'buy_exchange')
+        features['sell_exchange_encoded'] = self._encode_column(df, 'sell_exchange_id', 'sell_exchange')
+        
+        # Características de fees (estimadas)
+        buy_fee = self._nested_column(df, 'buy_fee_taker', 'market_data', ('buy_fees', 'taker'), 0.001)
+        sell_fee = self._nested_column(df, 'sell_fee_taker', 'market_data', ('sell_fees', 'taker'), 0.001)
+        features['estimated_buy_fee_percentage'] = buy_fee * 100
+        features['estimated_sell_fee_percentage'] = sell_fee * 100
+        features['total_estimated_fees'] = features['estimated_buy_fee_percentage'] + features['estimated_sell_fee_percentage']
+        
+        # Características temporales
+        now = datetime.now(timezone.utc)
+        features['hour_of_day'] = np.full(n, now.hour, dtype=float)
+        features['day_of_week'] = np.full(n, now.weekday(), dtype=float)
+        
+        # Características del símbolo
+        symbols = df['symbol'].fillna('UNKNOWN/USDT').astype(str) if 'symbol' in df else pd.Series(['UNKNOWN/USDT'] * n)
+        base_currency = symbols.str.split('/').str[0].where(symbols.str.contains('/', regex=False), 'UNKNOWN')
+        features['is_popular_currency'] = base_currency.isin(POPULAR_CURRENCIES).to_numpy(dtype=float)
+        features['is_btc'] = (base_currency == 'BTC').to_numpy(dtype=float)
+        features['is_eth'] = (base_currency == 'ETH').to_numpy(dtype=float)
+        
+        # Características de balance
+        balance = self._nested_column(df, 'balance_usdt', 'balance_config', ('balance_usdt',), 0.0)
+        features['current_balance_usdt'] = balance
+        features['investment_to_balance_ratio'] = investment / np.maximum(balance, 1)
+        
+        if not self.feature_names:
+            self.feature_names = sorted(features.keys())
+        
+        # Mismo orden de columnas que prepare_features
+        return np.column_stack([
+            features.get(name, np.zeros(n)) for name in self.feature_names
+        ]) if n else np.zeros((0, len(self.feature_names)))
+    
     def train(self, training_data: List[Dict]) -> Dict:
         """Entrena el modelo con datos históricos."""
         try:
@@ -274,64 +397,31 @@ class ArbitrageAIModel:
     
     def _prepare_training_data(self, training_data: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
         """Prepara los datos de entrenamiento."""
-        X_list = []
-        y_profit_list = []
-        y_success_list = []
-        y_risk_list = []
-        
-        # Primero, recopilar todos los exchanges para el label encoding
-        all_buy_exchanges = []
-        all_sell_exchanges = []
-        
-        for data in training_data:
-            all_buy_exchanges.append(data.get('buy_exchange_id', 'unknown'))
-            all_sell_exchanges.append(data.get('sell_exchange_id', 'unknown'))
+        df = self._batch_to_frame(training_data)
+        if df.empty:
+            return np.array([]), np.array([]), np.array([]), np.array([])
         
-        # Ajustar label encoders
+        # Ajustar label encoders con todos los exchanges del lote
         self.label_encoders['buy_exchange'] = LabelEncoder()
         self.label_encoders['sell_exchange'] = LabelEncoder()
-        self.label_encoders['buy_exchange'].fit(all_buy_exchanges)
-        self.label_encoders['sell_exchange'].fit(all_sell_exchanges)
+        self.label_encoders['buy_exchange'].fit(df.get('buy_exchange_id', pd.Series(['unknown'])).fillna('unknown'))
+        self.label_encoders['sell_exchange'].fit(df.get('sell_exchange_id', pd.Series(['unknown'])).fillna('unknown'))
+        self._build_encoder_lookups()
         
-        # Procesar cada registro
-        for data in training_data:
-            try:
-                # Preparar características
-                features = self.prepare_features(data).flatten()
-                
-                # Extraer etiquetas
-                decision = data.get('decision_outcome', 'NO_EJECUTADA')
-                net_profit = safe_float(data.get('net_profit_usdt', 0))
-                
-                # Etiqueta de éxito (binaria)
-                success = 1 if 'EJECUTADA' in decision and net_profit > 0 else 0
-                
-                # Etiqueta de riesgo (basada en pérdidas)
-                risk = 1 if net_profit < -1.0 else 0  # Alto riesgo si pérdida > 1 USDT
-                
-                X_list.append(features)
-                y_profit_list.append(net_profit)
-                y_success_list.append(success)
-                y_risk_list.append(risk)
-                
-            except Exception as e:
-                self.logger.warning(f"Error procesando registro de entrenamiento: {e}")
-                continue
+        # Preparar características
+        X = self.prepare_features_batch(df)
         
-        if not X_list:
-            return np.array([]), np.array([]), np.array([]), np.array([])
+        # Extraer etiquetas
+        decision = df['decision_outcome'].fillna('NO_EJECUTADA').astype(str) if 'decision_outcome' in df else pd.Series(['NO_EJECUTADA'] * len(df))
+        net_profit = self._numeric_column(df, 'net_profit_usdt', 0.0)
         
-        # Establecer nombres de características si no están definidos
-        if not self.feature_names:
-            sample_features = self.prepare_features(training_data[0])
-            self.feature_names = [f'feature_{i}' for i in range(sample_features.shape[1])]
-        
-        return (
-            np.array(X_list),
-            np.array(y_profit_list),
-            np.array(y_success_list),
-            np.array(y_risk_list)
-        )
+        # Etiqueta de éxito (binaria)
+        y_success = (decision.str.contains('EJECUTADA', regex=False).to_numpy() & (net_profit > 0)).astype(int)
+        
+        # Etiqueta de riesgo: alto riesgo si pérdida > 1 USDT
+        y_risk = (net_profit < -1.0).astype(int)
+        
+        return X, net_profit, y_success, y_risk
     
     def predict(self, operation_data: Dict) -> Dict:
         """Realiza una predicción para una operación de arbitraje."""
@@ -392,6 +482,104 @@ class ArbitrageAIModel:
             self.logger.error(f"Error en predicción: {e}")
             return self._fallback_prediction(operation_data)
     
+    async def predict_async(self, operation_data: Dict) -> Dict:
+        """Predicción sin bloquear el event loop, vía el servicio de inferencia."""
+        return await self.inference_service.predict(operation_data)
+    
+    async def start_inference_service(self):
+        """Inicia el pool de inferencia con micro-batching."""
+        await self.inference_service.start()
+    
+    async def stop_inference_service(self):
+        """Detiene el pool de inferencia."""
+        await self.inference_service.stop()
+    
+    def get_inference_stats(self) -> Dict:
+        """Retorna estadísticas y latencias del servicio de inferencia."""
+        return self.inference_service.get_stats()
+    
+    def _collect_metrics(self):
+        MODEL_TRAINED.set(1 if self.is_trained else 0)
+        stats = self.inference_service.get_stats()
+        INFERENCE_QUEUE_DEPTH.set(stats['queue_depth'])
+        INFERENCE_INFLIGHT_BATCHES.set(stats['inflight_batches'])
+    
+    def predict_batch(self, batch: FeatureBatch) -> pd.DataFrame:
+        """Evalúa un lote completo con los tres modelos en una sola llamada por modelo."""
+        df = self._batch_to_frame(batch)
+        if df.empty:
+            return pd.DataFrame(columns=[
+                'should_execute', 'confidence', 'predicted_profit_usdt', 'success_probability',
+                'high_risk_probability', 'reason', 'model_version'
+            ])
+        
+        if not self.is_trained:
+            return self._fallback_prediction_batch(df)
+        
+        try:
+            X_scaled = self.feature_scaler.transform(self.prepare_features_batch(df))
+            
+            profitability_proba = self.profitability_classifier.predict_proba(X_scaled)
+            profit_prediction = self.profit_regressor.predict(X_scaled)
+            risk_proba = self.risk_classifier.predict_proba(X_scaled)
+            
+            n = len(df)
+            success_probability = profitability_proba[:, 1] if profitability_proba.shape[1] > 1 else np.full(n, 0.5)
+            high_risk_probability = risk_proba[:, 1] if risk_proba.shape[1] > 1 else np.full(n, 0.5)
+            
+            profit_factor = np.minimum(profit_prediction / MIN_PROFIT_USDT, 2.0) / 2.0
+            confidence = np.clip(
+                success_probability * 0.4 + (1 - high_risk_probability) * 0.3 + profit_factor * 0.3, 0.0, 1.0
+            )
+            
+            low_success = success_probability < self.confidence_threshold
+            high_risk = high_risk_probability >= 0.7
+            low_profit = profit_prediction < MIN_PROFIT_USDT
+            low_confidence = confidence < self.confidence_threshold
+            should_execute = ~(low_success | high_risk | low_profit | low_confidence)
+            
+            reason = np.select(
+                [should_execute, low_success, high_risk, low_profit],
+                [
+                    pd.Series(success_probability).map('Predicción favorable: {:.3f} éxito, '.format)
+                    + pd.Series(profit_prediction).map('{:.4f} USDT'.format),
+                    pd.Series(success_probability).map('Baja probabilidad de éxito: {:.3f}'.format),
+                    pd.Series(high_risk_probability).map('Alto riesgo: {:.3f}'.format),
+                    pd.Series(profit_prediction).map('Ganancia predicha insuficiente: {:.4f} USDT'.format)
+                ],
+                default=pd.Series(confidence).map('Baja confianza general: {:.3f}'.format)
+            )
+            
+            return pd.DataFrame({
+                'should_execute': should_execute,
+                'confidence': confidence,
+                'predicted_profit_usdt': profit_prediction,
+                'success_probability': success_probability,
+                'high_risk_probability': high_risk_probability,
+                'reason': reason,
+                'model_version': self.training_history.get('last_training', 'unknown')
+            })
+            
+        except Exception as e:
+            self.logger.error(f"Error en predicción batch: {e}")
+            return self._fallback_prediction_batch(df)
+    
+    def score_top20(self, top20_data: List[Dict], investment_usdt: float) -> pd.DataFrame:
+        """Evalúa un refresco completo del top 20 de Sebo en una sola llamada vectorizada."""
+        df = self._batch_to_frame(top20_data)
+        if df.empty:
+            return self.predict_batch(df)
+        
+        batch = pd.DataFrame({
+            'symbol': df.get('symbol'),
+            'buy_exchange_id': df.get('exchange_min_id'),
+            'sell_exchange_id': df.get('exchange_max_id'),
+            'current_price_buy': self._numeric_column(df, 'price_at_exMin_to_buy_asset', 0.0),
+            'current_price_sell': self._numeric_column(df, 'price_at_exMax_to_sell_asset', 0.0),
+            'investment_usdt': investment_usdt
+        })
+        return self.predict_batch(batch)
+    
     def _calculate_confidence(self, success_prob: float, risk_prob: float, predicted_profit: float) -> float:
         """Calcula la confianza general de la predicción."""
         try:
@@ -464,6 +652,38 @@ class ArbitrageAIModel:
                 'model_version': 'fallback'
             }
     
+    def _fallback_prediction_batch(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Versión vectorizada de _fallback_prediction."""
+        buy_price = self._numeric_column(df, 'current_price_buy', 0.0)
+        sell_price = self._numeric_column(df, 'current_price_sell', 0.0)
+        investment = self._numeric_column(df, 'investment_usdt', 0.0)
+        
+        valid_price = buy_price > 0
+        percentage_diff = np.where(valid_price, (sell_price - buy_price) / np.where(valid_price, buy_price, 1.0) * 100, 0.0)
+        
+        # Estimar fees
+        net_percentage = percentage_diff - 0.2
+        estimated_profit = investment * net_percentage / 100
+        
+        is_profitable = valid_price & (net_percentage >= MIN_PROFIT_PERCENTAGE) & (estimated_profit >= MIN_PROFIT_USDT)
+        confidence = np.where(is_profitable, np.minimum(net_percentage / MIN_PROFIT_PERCENTAGE, 1.0), 0.0)
+        
+        reason = np.where(
+            valid_price,
+            pd.Series(net_percentage).map('Análisis básico: {:.4f}% ganancia neta'.format),
+            'Precio de compra inválido'
+        )
+        
+        return pd.DataFrame({
+            'should_execute': is_profitable,
+            'confidence': confidence,
+            'predicted_profit_usdt': np.where(valid_price, estimated_profit, 0.0),
+            'success_probability': confidence,
+            'high_risk_probability': 1.0 - confidence,
+            'reason': reason,
+            'model_version': 'fallback'
+        })
+    
     def update_with_feedback(self, operation_data: Dict, actual_result: Dict):
         """Actualiza el modelo con retroalimentación de operaciones reales."""
         try:
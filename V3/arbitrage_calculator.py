@@ -1,5 +1,6 @@
 # V2/arbitrage_calculator.py
 import json # Solo para un print de debug si se descomenta
+import numpy as np
 
 def calculate_net_profitability(ai_data: dict, investment_usdt: float):
     results = {
@@ -86,3 +87,126 @@ def calculate_net_profitability(ai_data: dict, investment_usdt: float):
 
     # print(f"CALCULATOR DEBUG: {json.dumps(results, indent=2)}")
     return results
+
+
+def _book_levels(levels) -> np.ndarray:
+    """Converts CCXT [[price, amount, ...], ...] levels into an (n, 2) float array."""
+    if not levels:
+        return np.empty((0, 2), dtype=float)
+    book = np.asarray([level[:2] for level in levels], dtype=float)
+    return book[(book[:, 0] > 0) & (book[:, 1] > 0)]
+
+
+def walk_asks_with_quote(asks, quote_amounts):
+    """Spends each quote amount (USDT) walking the asks.
+
+    Returns (base_filled, quote_spent) arrays, one entry per requested amount.
+    Amounts beyond the visible depth are capped at the full book.
+    """
+    quote_amounts = np.atleast_1d(np.asarray(quote_amounts, dtype=float))
+    book = _book_levels(asks)
+    if book.shape[0] == 0:
+        return np.zeros_like(quote_amounts), np.zeros_like(quote_amounts)
+
+    prices, sizes = book[:, 0], book[:, 1]
+    cum_quote = np.concatenate(([0.0], np.cumsum(prices * sizes)))
+    cum_base = np.concatenate(([0.0], np.cumsum(sizes)))
+
+    spent = np.clip(quote_amounts, 0.0, cum_quote[-1])
+    # Level in which each amount finishes filling
+    idx = np.clip(np.searchsorted(cum_quote, spent, side='left'), 1, len(prices))
+    base_filled = cum_base[idx - 1] + (spent - cum_quote[idx - 1]) / prices[idx - 1]
+    return base_filled, spent
+
+
+def walk_bids_with_base(bids, base_amounts):
+    """Sells each base amount walking the bids.
+
+    Returns (quote_received, base_sold) arrays, one entry per requested amount.
+    Amounts beyond the visible depth are capped at the full book.
+    """
+    base_amounts = np.atleast_1d(np.asarray(base_amounts, dtype=float))
+    book = _book_levels(bids)
+    if book.shape[0] == 0:
+        return np.zeros_like(base_amounts), np.zeros_like(base_amounts)
+
+    prices, sizes = book[:, 0], book[:, 1]
+    cum_quote = np.concatenate(([0.0], np.cumsum(prices * sizes)))
+    cum_base = np.concatenate(([0.0], np.cumsum(sizes)))
+
+    sold = np.clip(base_amounts, 0.0, cum_base[-1])
+    idx = np.clip(np.searchsorted(cum_base, sold, side='left'), 1, len(prices))
+    quote_received = cum_quote[idx - 1] + (sold - cum_base[idx - 1]) * prices[idx - 1]
+    return quote_received, sold
+
+
+def calculate_depth_aware_profitability(ai_data: dict, investment_sizes, order_book_buy: dict, order_book_sell: dict):
+    """Evaluates many investment sizes in one pass using L2 depth instead of top-of-book prices.
+
+    Fees are read from ai_data with the same keys as calculate_net_profitability.
+    Returns per-size VWAPs and net profits plus the largest size that stays profitable.
+    """
+    sizes = np.atleast_1d(np.asarray(investment_sizes, dtype=float))
+    results = {
+        "investment_sizes": sizes.tolist(),
+        "buy_vwap": [],
+        "sell_vwap": [],
+        "net_profit_usdt": [],
+        "net_profit_percentage": [],
+        "fully_filled": [],
+        "max_profitable_investment_usdt": 0.0,
+        "best_investment_usdt": 0.0,
+        "best_net_profit_usdt": 0.0,
+        "error_message": None
+    }
+
+    asks = (order_book_buy or {}).get('asks') or []
+    bids = (order_book_sell or {}).get('bids') or []
+    if sizes.size == 0 or not asks or not bids:
+        results["error_message"] = "Order book depth is unavailable."
+        return results
+
+    fee_initial_usdt_withdrawal = ai_data.get('initial_usdt_withdrawal_selected_fee', 0.0) or 0.0
+    fee_rate_taker_ex_min = ai_data.get('ex_min_taker_fee_rate_sebo', 0.0) or 0.0
+    fee_asset_withdrawal_ex_min = ai_data.get('asset_withdrawal_fee_from_ex_min_sebo', 0.0) or 0.0
+    fee_rate_taker_ex_max = ai_data.get('ex_max_taker_fee_rate_sebo', 0.0) or 0.0
+
+    # Buy leg at exMin
+    usdt_available = np.maximum(sizes - fee_initial_usdt_withdrawal, 0.0)
+    asset_bought_gross, usdt_spent = walk_asks_with_quote(asks, usdt_available)
+    asset_bought_net = asset_bought_gross * (1 - fee_rate_taker_ex_min)
+
+    # Transfer exMin -> exMax
+    asset_to_transfer = np.maximum(asset_bought_net - fee_asset_withdrawal_ex_min, 0.0)
+
+    # Sell leg at exMax
+    usdt_from_sale_gross, asset_sold = walk_bids_with_base(bids, asset_to_transfer)
+    final_usdt = usdt_from_sale_gross * (1 - fee_rate_taker_ex_max)
+
+    # Unspent USDT and unsold asset are not counted as recovered value
+    net_profit = final_usdt - sizes
+    fully_filled = (
+        np.isclose(usdt_spent, usdt_available)
+        & np.isclose(asset_sold, asset_to_transfer)
+        & (asset_to_transfer > 0)
+    )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        buy_vwap = np.where(asset_bought_gross > 0, usdt_spent / asset_bought_gross, np.nan)
+        sell_vwap = np.where(asset_sold > 0, usdt_from_sale_gross / asset_sold, np.nan)
+        net_profit_percentage = np.where(sizes > 0, net_profit / sizes * 100, 0.0)
+
+    results["buy_vwap"] = buy_vwap.tolist()
+    results["sell_vwap"] = sell_vwap.tolist()
+    results["net_profit_usdt"] = net_profit.tolist()
+    results["net_profit_percentage"] = net_profit_percentage.tolist()
+    results["fully_filled"] = fully_filled.tolist()
+
+    profitable = fully_filled & (net_profit > 0)
+    if profitable.any():
+        results["max_profitable_investment_usdt"] = float(sizes[profitable].max())
+        best = int(np.argmax(np.where(profitable, net_profit, -np.inf)))
+        results["best_investment_usdt"] = float(sizes[best])
+        results["best_net_profit_usdt"] = float(net_profit[best])
+
+    return results
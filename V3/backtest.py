@@ -11,7 +11,7 @@ import argparse
 import logging
 import sys
 import os
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import json
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -23,12 +23,15 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from ai_model import ArbitrageAIModel
 from simulation_engine import SimulationEngine
 from data_persistence import DataPersistence
+from operation_store import OperationStore
 from utils import setup_logging
 
 async def main():
     parser = argparse.ArgumentParser(description='Realizar backtesting del modelo de IA')
     parser.add_argument('--data-file', type=str, default=None,
-                       help='Archivo CSV con datos históricos para backtesting')
+                       help='Archivo CSV/Parquet o directorio del almacén de operaciones con datos históricos')
+    parser.add_argument('--days', type=int, default=None,
+                       help='Con un almacén de operaciones, usar solo los últimos N días')
     parser.add_argument('--generate-data', type=int, default=0,
                        help='Generar N muestras sintéticas para backtesting')
     parser.add_argument('--initial-balance', type=float, default=1000.0,
@@ -66,7 +69,14 @@ async def main():
         if args.data_file:
             logger.info(f"Cargando datos desde archivo: {args.data_file}")
             try:
-                df = pd.read_csv(args.data_file)
+                if os.path.isdir(args.data_file):
+                    # Leer directamente del almacén columnar (solo las particiones del rango)
+                    start = datetime.now(timezone.utc) - timedelta(days=args.days) if args.days else None
+                    df = OperationStore(args.data_file).read_frame(start=start)
+                elif args.data_file.endswith('.parquet'):
+                    df = pd.read_parquet(args.data_file)
+                else:
+                    df = pd.read_csv(args.data_file)
                 historical_data = df.to_dict('records')
                 logger.info(f"Datos cargados: {len(historical_data)} registros")
             except Exception as e:
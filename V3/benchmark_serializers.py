@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# Simos/V3/benchmark_serializers.py
+
+"""
+Micro-benchmark de serializadores (json, orjson, msgpack) sobre frames top 20.
+Uso: python benchmark_serializers.py [--frames-file data/top20_frames.jsonl] [--repeat 200]
+
+Los frames reales se capturan definiendo SEBO_CAPTURE_TOP20_FILE en config_v3.py;
+sin captura se generan frames sintéticos con el formato de Sebo.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from config_v3 import SEBO_CAPTURE_TOP20_FILE
+from serialization import get_serializer, available_serializers
+from sebo_recorder import read_recording
+
+def load_frames(filepath):
+    """Carga frames top 20 capturados (una lista JSON por línea) o de una grabación de Sebo."""
+    with open(filepath, 'r') as f:
+        first_line = f.readline()
+    if first_line.strip() and isinstance(json.loads(first_line), dict):
+        _, events = read_recording(filepath)
+        return [data for _, event, data in events if event == 'top_20_data']
+
+    frames = []
+    with open(filepath, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                frames.append(json.loads(line))
+    return frames
+
+def generate_frames(count, rows=20):
+    """Frames sintéticos con los campos que emite Sebo en top_20_data."""
+    exchanges = ["binance", "okx", "kucoin", "bybit", "huobi", "gate", "mexc"]
+    frames = []
+    for frame_index in range(count):
+        frame = []
+        for row_index in range(rows):
+            exchange_min, exchange_max = random.sample(exchanges, 2)
+            buy_price = random.uniform(0.0001, 70000)
+            difference = random.uniform(0.1, 5.0)
+            frame.append({
+                "analysis_id": f"{random.getrandbits(96):024x}",
+                "symbol": f"COIN{row_index}/USDT",
+                "symbol_name": f"Coin {row_index}",
+                "exchange_min_id": exchange_min,
+                "exchange_min_name": exchange_min.capitalize(),
+                "exchange_max_id": exchange_max,
+                "exchange_max_name": exchange_max.capitalize(),
+                "price_at_exMin_to_buy_asset": buy_price,
+                "price_at_exMax_to_sell_asset": buy_price * (1 + difference / 100),
+                "percentage_difference": f"{difference:.2f}%",
+                "fees_exMin": {"taker_fee": 0.001, "maker_fee": 0.001},
+                "fees_exMax": {"taker_fee": 0.001, "maker_fee": 0.0008},
+                "timestamp": f"2025-01-01T00:00:{frame_index % 60:02d}.000Z"
+            })
+        frames.append(frame)
+    return frames
+
+def benchmark(serializer, frames, repeat):
+    """Mide encode/decode por frame (µs) y tamaño promedio (bytes)."""
+    encoded = [serializer.dumps({"type": "top20_data", "payload": frame}) for frame in frames]
+    sizes = [len(data.encode('utf-8')) if isinstance(data, str) else len(data) for data in encoded]
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            serializer.dumps({"type": "top20_data", "payload": frame})
+    encode_us = (time.perf_counter() - start) / (repeat * len(frames)) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data in encoded:
+            serializer.loads(data)
+    decode_us = (time.perf_counter() - start) / (repeat * len(frames)) * 1e6
+
+    return {
+        'encode_us': encode_us,
+        'decode_us': decode_us,
+        'avg_bytes': sum(sizes) / len(sizes)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparar serializadores sobre frames top 20')
+    parser.add_argument('--frames-file', type=str, default=SEBO_CAPTURE_TOP20_FILE,
+                       help='Frames top 20 capturados (SEBO_CAPTURE_TOP20_FILE) o grabación (SEBO_RECORD_FILE)')
+    parser.add_argument('--synthetic-frames', type=int, default=100,
+                       help='Frames sintéticos a generar si no hay captura (default: 100)')
+    parser.add_argument('--repeat', type=int, default=200,
+                       help='Repeticiones sobre el conjunto de frames (default: 200)')
+    args = parser.parse_args()
+
+    if args.frames_file and os.path.exists(args.frames_file):
+        frames = load_frames(args.frames_file)
+        source = args.frames_file
+    else:
+        frames = generate_frames(args.synthetic_frames)
+        source = "sintéticos (defina SEBO_CAPTURE_TOP20_FILE para capturar frames reales)"
+
+    if not frames:
+        print("No hay frames para evaluar")
+        return 1
+
+    print(f"Frames: {len(frames)} - {source}")
+    print(f"Serializadores disponibles: {', '.join(available_serializers())}\n")
+    print(f"{'Serializador':<12} {'Encode (µs)':>12} {'Decode (µs)':>12} {'Bytes':>10} {'vs json':>8}")
+
+    baseline = None
+    for name in available_serializers():
+        result = benchmark(get_serializer(name), frames, args.repeat)
+        baseline = baseline or result
+        print(
+            f"{name:<12} {result['encode_us']:>12.1f} {result['decode_us']:>12.1f} "
+            f"{result['avg_bytes']:>10.0f} {result['avg_bytes'] / baseline['avg_bytes']:>7.0%}"
+        )
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# Simos/V3/circuit_breaker.py
+
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Iterable, Optional, Tuple
+from config_v3 import (
+    CIRCUIT_WINDOW_SIZE, CIRCUIT_MIN_CALLS, CIRCUIT_ERROR_RATE, CIRCUIT_SLOW_CALL_MS,
+    CIRCUIT_SLOW_CALL_RATE, CIRCUIT_OPEN_SECONDS, CIRCUIT_MAX_OPEN_SECONDS
+)
+from metrics import registry
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = registry.gauge(
+    'v3_circuit_state', 'Estado del circuito (0 cerrado, 1 semi-abierto, 2 abierto)', ['exchange', 'endpoint']
+)
+CIRCUIT_REJECTED = registry.counter(
+    'v3_circuit_rejected_total', 'Llamadas rechazadas sin ir al exchange', ['exchange', 'endpoint']
+)
+CIRCUIT_TRANSITIONS = registry.counter(
+    'v3_circuit_transitions_total', 'Cambios de estado de los circuitos', ['exchange', 'endpoint', 'state']
+)
+
+class CircuitOpenError(Exception):
+    """La llamada se rechazó porque el circuito del exchange/endpoint está abierto."""
+
+    def __init__(self, exchange_id: str, endpoint: str, retry_in: float):
+        super().__init__(f"Circuito abierto para {exchange_id}/{endpoint} (reintento en {retry_in:.1f}s)")
+        self.exchange_id = exchange_id
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+class ProbeToken:
+    """Prueba del semi-abierto: solo la llamada que lo tiene cierra o reabre el circuito."""
+
+    __slots__ = ('started',)
+
+    def __init__(self):
+        self.started = False  # La llamada salió al exchange (ya no está en la cola)
+
+class CircuitBreaker:
+    """Circuito de un (exchange, clase de endpoint).
+
+    Cerrado: registra las últimas CIRCUIT_WINDOW_SIZE llamadas y abre si la tasa
+    de errores o de llamadas lentas supera su umbral. Abierto: rechaza todo hasta
+    que vence el tiempo de apertura. Semi-abierto: deja pasar una sola llamada de
+    prueba (con un ProbeToken); si sale bien se cierra, si falla vuelve a abrir con
+    el doble de tiempo. Las llamadas rezagadas de antes de abrir no deciden la prueba.
+    """
+
+    def __init__(self, exchange_id: str, endpoint: str):
+        self.logger = logging.getLogger('V3.CircuitBreaker')
+        self.exchange_id = exchange_id
+        self.endpoint = endpoint
+
+        self.state = CLOSED
+        self.window: deque = deque(maxlen=CIRCUIT_WINDOW_SIZE)  # (falló, lenta)
+        self.opened_at = 0.0
+        self.open_seconds = CIRCUIT_OPEN_SECONDS
+        self.probe: Optional[ProbeToken] = None
+        self.last_reason: Optional[str] = None
+
+        self.stats = {
+            'calls': 0,
+            'failures': 0,
+            'slow_calls': 0,
+            'rejected': 0,
+            'trips': 0
+        }
+        CIRCUIT_STATE.set(0, exchange=exchange_id, endpoint=endpoint)
+
+    @property
+    def probe_in_flight(self) -> bool:
+        return self.probe is not None
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def allow(self) -> Tuple[bool, Optional[ProbeToken]]:
+        """Indica si una llamada puede salir; en semi-abierto reserva la única prueba y retorna su token."""
+        if self.state == OPEN:
+            if self.retry_in() > 0:
+                return False, None
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self.probe is not None:
+                return False, None
+            self.probe = ProbeToken()
+            return True, self.probe
+
+        return True, None
+
+    def before_call(self) -> Optional[ProbeToken]:
+        """Lanza CircuitOpenError si la llamada debe fallar rápido; retorna el token si es la prueba."""
+        allowed, probe = self.allow()
+        if not allowed:
+            self.stats['rejected'] += 1
+            CIRCUIT_REJECTED.inc(exchange=self.exchange_id, endpoint=self.endpoint)
+            raise CircuitOpenError(self.exchange_id, self.endpoint, self.retry_in())
+        return probe
+
+    def release(self, probe: Optional[ProbeToken]):
+        """Libera una prueba que no llegó a decidir (cancelada antes de salir de la cola)."""
+        if probe is not None and probe is self.probe:
+            self.probe = None
+
+    def record(self, failed: bool, latency_ms: float, error: str = None, probe: ProbeToken = None):
+        """Registra el resultado de una llamada que sí salió al exchange."""
+        slow = latency_ms >= CIRCUIT_SLOW_CALL_MS
+        self.stats['calls'] += 1
+        self.stats['failures'] += int(failed)
+        self.stats['slow_calls'] += int(slow)
+
+        if self.state == HALF_OPEN:
+            if probe is None or probe is not self.probe:
+                return  # Rezagada de antes de abrir: no decide la prueba
+            self.probe = None
+            if failed or slow:
+                self.open_seconds = min(self.open_seconds * 2, CIRCUIT_MAX_OPEN_SECONDS)
+                self._trip(f"probe fallido: {error or f'{latency_ms:.0f} ms'}")
+            else:
+                self.window.clear()
+                self.open_seconds = CIRCUIT_OPEN_SECONDS
+                self._transition(CLOSED)
+            return
+
+        self.window.append((failed, slow))
+        if self.state != CLOSED or len(self.window) < CIRCUIT_MIN_CALLS:
+            return
+
+        error_rate = sum(1 for item in self.window if item[0]) / len(self.window)
+        slow_rate = sum(1 for item in self.window if item[1]) / len(self.window)
+        if error_rate >= CIRCUIT_ERROR_RATE:
+            self._trip(f"tasa de errores {error_rate:.0%} (último: {error})")
+        elif slow_rate >= CIRCUIT_SLOW_CALL_RATE:
+            self._trip(f"tasa de llamadas lentas {slow_rate:.0%} (> {CIRCUIT_SLOW_CALL_MS} ms)")
+
+    def record_cancelled(self, latency_ms: float, probe: ProbeToken = None):
+        """Llamada cancelada por quien la hizo (p. ej. deadline de datos de mercado).
+
+        Si ya llevaba más que el umbral de lentitud cuenta como lenta; si no, solo libera la prueba.
+        """
+        if latency_ms >= CIRCUIT_SLOW_CALL_MS:
+            self.record(False, latency_ms, 'cancelada por deadline', probe)
+        else:
+            self.release(probe)
+
+    def _trip(self, reason: str):
+        self.opened_at = time.monotonic()
+        self.last_reason = reason
+        self.stats['trips'] += 1
+        self._transition(OPEN)
+        self.logger.warning(
+            f"Circuito abierto para {self.exchange_id}/{self.endpoint} por {self.open_seconds:.0f}s: {reason}"
+        )
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        self.state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state], exchange=self.exchange_id, endpoint=self.endpoint)
+        CIRCUIT_TRANSITIONS.inc(exchange=self.exchange_id, endpoint=self.endpoint, state=state)
+        if state == CLOSED:
+            self.logger.info(f"Circuito cerrado para {self.exchange_id}/{self.endpoint}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'state': self.state,
+            'retry_in_s': self.retry_in() if self.state == OPEN else 0.0,
+            'open_seconds': self.open_seconds,
+            'last_reason': self.last_reason
+        }
+
+class CircuitBreakerRegistry:
+    """Circuitos por (exchange, clase de endpoint), creados al primer uso."""
+
+    def __init__(self):
+        self.breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+    def get(self, exchange_id: str, endpoint: str) -> CircuitBreaker:
+        key = (exchange_id, endpoint)
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(exchange_id, endpoint)
+        return breaker
+
+    def get_block_reason(self, exchange_id: str, endpoints: Iterable[str]) -> Optional[str]:
+        """Motivo por el que un exchange no puede usarse ahora (algún circuito abierto), o None.
+
+        No consume la prueba del semi-abierto: un circuito abierto con el tiempo vencido
+        se considera disponible para que la oportunidad haga la llamada de prueba.
+        """
+        for endpoint in endpoints:
+            breaker = self.breakers.get((exchange_id, endpoint))
+            if breaker is None:
+                continue
+            if breaker.state == OPEN and breaker.retry_in() > 0:
+                return f"circuito {endpoint} abierto ({breaker.last_reason}; reintento en {breaker.retry_in():.0f}s)"
+            if breaker.state == HALF_OPEN and breaker.probe_in_flight:
+                return f"circuito {endpoint} en prueba"
+        return None
+
+    def get_stats(self) -> Dict[str, Dict[str, Dict]]:
+        stats: Dict[str, Dict[str, Dict]] = {}
+        for (exchange_id, endpoint), breaker in self.breakers.items():
+            stats.setdefault(exchange_id, {})[endpoint] = breaker.get_stats()
+        return stats
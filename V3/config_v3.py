@@ -22,6 +22,8 @@ SEBO_API_BASE_URL = "http://localhost:3000/api"  # API base de Sebo
 MIN_PROFIT_PERCENTAGE = 0.6  # Porcentaje mínimo de ganancia para realizar una operación
 MIN_PROFIT_USDT = 0.01  # Ganancia mínima absoluta en USDT
 MIN_OPERATIONAL_USDT = 10.0  # Balance mínimo para operar
+DEPTH_ORDER_BOOK_LIMIT = 20  # Niveles L2 usados para simular el llenado de cada pata
+DEPTH_CANDIDATE_SIZES = 16  # Tamaños de inversión evaluados por oportunidad
 
 # Parámetros de la IA
 AI_MODEL_PATH = "models/arbitrage_model.pkl"
@@ -36,24 +38,195 @@ DEFAULT_STOP_LOSS_PERCENTAGE_GLOBAL = 50.0  # Stop loss global
 DEFAULT_STOP_LOSS_PERCENTAGE_OPERATION = 50.0  # Stop loss por operación
 DEFAULT_TAKE_PROFIT_PERCENTAGE_OPERATION = None  # Take profit por operación
 
+# Configuración de concurrencia de operaciones
+MAX_CONCURRENT_OPERATIONS = 5  # Máximo de oportunidades procesándose en paralelo
+
+# Configuración del scheduler de oportunidades (ráfagas de spot-arb de Sebo cada ~5 s)
+SCHEDULER_BURST_WINDOW = 0.3  # Segundos desde el primer evento para cerrar la ráfaga
+SCHEDULER_TOP_K = 5  # Mejores candidatos despachados por ciclo
+SCHEDULER_WORKERS = MAX_CONCURRENT_OPERATIONS  # Workers que procesan candidatos en paralelo
+SCHEDULER_CYCLE_DEADLINE = 4.5  # Segundos tras cerrar la ráfaga para empezar un candidato
+
+# Configuración del servicio de inferencia del modelo de IA
+INFERENCE_WORKERS = 1  # Hilos dedicados a predicciones (fuera del event loop)
+INFERENCE_BATCH_WINDOW_MS = 5  # Ventana para agrupar solicitudes en un micro-batch
+INFERENCE_MAX_BATCH_SIZE = 32  # Máximo de solicitudes por micro-batch
+INFERENCE_MAX_PENDING = 256  # Solicitudes en cola antes de rechazar (backpressure)
+INFERENCE_LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+# Configuración del tracing de latencia por etapa (Sebo -> decisión -> UI)
+TRACING_ENABLED = True
+TRACING_SAMPLE_RATE = 1.0  # Fracción de oportunidades trazadas
+TRACING_LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+TRACING_RECENT_TRACES = 100  # Trazas completas guardadas para inspección
+
+# Configuración del endpoint de métricas (formato de texto de Prometheus, solo local)
+METRICS_ENABLED = True
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+METRICS_LATENCY_BUCKETS_S = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+METRICS_LOOP_LAG_INTERVAL = 0.5  # Segundos entre mediciones del lag del event loop
+
+# Configuración del watchdog del event loop (detecta llamadas bloqueantes)
+LOOP_WATCHDOG_ENABLED = True
+LOOP_WATCHDOG_INTERVAL = 0.05  # Segundos entre latidos del loop
+LOOP_WATCHDOG_THRESHOLD_MS = 100  # Bloqueo mínimo para muestrear la pila
+LOOP_WATCHDOG_MAX_OFFENDERS = 50  # Ubicaciones distintas guardadas
+LOOP_WATCHDOG_STACK_DEPTH = 12  # Frames guardados por muestra
+
 # Configuración de logging
 LOG_LEVEL = "INFO"
 LOG_FILE_PATH = "logs/v3_operations.log"
 CSV_LOG_PATH = "logs/v3_operation_logs.csv"
 
+# Configuración del escritor asíncrono de logs de operaciones
+LOG_WRITER_FLUSH_ROWS = 500  # Filas acumuladas que disparan un flush
+LOG_WRITER_FLUSH_INTERVAL = 1.0  # Segundos máximos que una fila espera en memoria
+LOG_WRITER_MAX_QUEUE = 100000  # Filas en memoria antes de descartar (nunca bloquea al trading)
+LOG_WRITER_FSYNC_POLICY = "interval"  # "none", "batch" (tras cada flush) o "interval"
+LOG_WRITER_FSYNC_INTERVAL = 5.0  # Segundos entre fsync con la política "interval"
+LOG_WRITER_ROTATE_MAX_BYTES = 50 * 1024 * 1024  # Tamaño máximo antes de rotar; 0 desactiva
+LOG_WRITER_ROTATE_BACKUPS = 10  # Archivos rotados a conservar (.1 ... .N)
+
+# Configuración del almacén columnar de operaciones (Parquet particionado por día)
+OPERATION_STORE_DIR = "data/operations"
+OPERATION_STORE_MAX_PARTS = 32  # Archivos de un mismo nivel que se compactan en uno del nivel siguiente
+
 # Configuración de simulación
 SIMULATION_MODE = False  # True para modo simulación, False para trading real
 SIMULATION_DELAY = 0.1  # Delay en segundos para simular tiempo de ejecución
 
+# Configuración del exchange simulado (paper) para pruebas offline de ejecución y carga
+PAPER_EXCHANGE_ENABLED = False  # True: ExchangeManager usa PaperExchange en vez de CCXT (sin red ni fondos reales)
+PAPER_EXCHANGE_URL = None  # "http://127.0.0.1:8790": usar un servidor paper_exchange.py compartido en vez del in-process
+PAPER_DATA_DIR = "data/paper"  # Snapshots propios del modo paper (no pisan los de los exchanges reales)
+PAPER_SEED = 42
+PAPER_SYMBOLS = {  # Símbolo -> precio de referencia inicial
+    "BTC/USDT": 65000.0, "ETH/USDT": 3200.0, "BNB/USDT": 580.0,
+    "SOL/USDT": 150.0, "XRP/USDT": 0.55, "DOGE/USDT": 0.12
+}
+PAPER_INITIAL_BALANCES = {"USDT": 100000.0}  # Saldo inicial por exchange
+PAPER_INITIAL_INVENTORY_USDT = 20000.0  # Inventario inicial de cada activo base por exchange, valorado en USDT
+PAPER_TAKER_FEE = 0.001  # Comisión de las órdenes de mercado (cobrada en la moneda quote)
+PAPER_MIN_ORDER_USDT = 5.0
+PAPER_PRICE_TICK_S = 1.0  # Cada tick se mueve el precio de referencia y se regeneran los order books
+PAPER_PRICE_VOLATILITY = 0.0005  # Desvío del paseo aleatorio por tick
+PAPER_PRICE_DISPERSION = 0.01  # Desvío máximo (±) del precio de cada exchange respecto a la referencia
+PAPER_SPREAD = 0.0005  # Spread bid/ask relativo
+PAPER_BOOK_LEVELS = 20
+PAPER_BOOK_STEP = 0.0002  # Distancia relativa entre niveles
+PAPER_BOOK_LEVEL_USDT = 2000.0  # Liquidez media por nivel
+PAPER_RATE_LIMIT_MS = 5  # rateLimit publicado; bajo para que el scheduler no limite las pruebas de carga
+# Redes de retiro: fee en la moneda y tiempo de acreditación del depósito
+PAPER_NETWORKS = {
+    "USDT": {"TRC20": {"fee": 1.0, "delay_s": 60}, "BSC": {"fee": 0.8, "delay_s": 30}, "ERC20": {"fee": 4.0, "delay_s": 300}},
+    "BTC": {"BTC": {"fee": 0.0002, "delay_s": 1800}, "BSC": {"fee": 0.00002, "delay_s": 30}},
+    "ETH": {"ERC20": {"fee": 0.002, "delay_s": 300}, "BSC": {"fee": 0.0001, "delay_s": 30}},
+    "BNB": {"BSC": {"fee": 0.0005, "delay_s": 30}}
+}
+PAPER_DEFAULT_WITHDRAW_FEE_USDT = 0.5  # Monedas sin redes declaradas: una red propia con esta fee
+PAPER_DEFAULT_WITHDRAW_DELAY_S = 60
+# Escala de los tiempos de acreditación: 0 acredita al instante (la venta usa el inventario del destino igual)
+PAPER_WITHDRAWAL_DELAY_SCALE = 0.0
+# Perfil de latencia y fallos inyectados
+PAPER_LATENCY_MS = {"orders": 40, "withdrawals": 80, "prices": 25, "metadata": 60}  # Media por carril
+PAPER_LATENCY_JITTER = 0.5  # ± fracción uniforme sobre la media
+PAPER_FAILURE_RATE = 0.0  # Probabilidad de ExchangeNotAvailable por llamada
+PAPER_TIMEOUT_RATE = 0.0  # Probabilidad de RequestTimeout (tras esperar el timeout de la instancia)
+PAPER_EXCHANGE_PROFILES = {}  # Overrides por exchange, p. ej. {"huobi": {"failure_rate": 0.3, "latency_scale": 4}}
+
 # Configuración de persistencia
 TRADING_STATE_FILE = "data/trading_state.json"
 BALANCE_CACHE_FILE = "data/balance_cache.json"
+CHECKPOINT_DEBOUNCE_S = 1.0  # Ventana para agrupar escrituras de los archivos de estado
+CHECKPOINT_FSYNC = True  # fsync antes del rename (durabilidad ante cortes)
 
 # Configuración de red y timeouts
 REQUEST_TIMEOUT = 30  # Timeout para requests HTTP en segundos
+MARKET_DATA_CALL_TIMEOUT = 5.0  # Deadline por sub-llamada de datos de mercado en segundos
 WEBSOCKET_RECONNECT_DELAY = 5  # Delay para reconexión de WebSocket
 MAX_RECONNECT_ATTEMPTS = 10  # Máximo número de intentos de reconexión
 
+# Configuración de circuit breakers por (exchange, clase de endpoint)
+CIRCUIT_BREAKER_ENABLED = True
+CIRCUIT_WINDOW_SIZE = 20  # Últimas llamadas consideradas
+CIRCUIT_MIN_CALLS = 5  # Llamadas mínimas en la ventana antes de poder abrir
+CIRCUIT_ERROR_RATE = 0.5  # Fracción de errores de red/disponibilidad que abre el circuito
+CIRCUIT_SLOW_CALL_MS = 5000  # Una llamada más lenta que esto cuenta como lenta
+CIRCUIT_SLOW_CALL_RATE = 0.5  # Fracción de llamadas lentas que abre el circuito
+CIRCUIT_OPEN_SECONDS = 15  # Tiempo abierto antes de probar (se duplica si el probe falla)
+CIRCUIT_MAX_OPEN_SECONDS = 300
+
+# Configuración del pool HTTP compartido (CCXT y REST de Sebo)
+HTTP_POOL_LIMIT = 200  # Conexiones totales
+HTTP_POOL_LIMIT_PER_HOST = 20  # Conexiones por host (API de cada exchange)
+HTTP_KEEPALIVE_TIMEOUT = 75  # Segundos; mayor que EXCHANGE_HEALTH_PROBE_INTERVAL para que el probe las mantenga vivas
+HTTP_DNS_CACHE_TTL = 300  # Segundos de cache de resolución DNS
+
+# Configuración de cache de metadatos de mercado
+MARKET_CACHE_TTL = 3600  # Segundos antes de refrescar markets de un exchange en background
+MARKET_CACHE_REFRESH_CHECK_INTERVAL = 60  # Cada cuánto se revisan caches expirados
+MARKET_SNAPSHOT_ENABLED = True  # Arranque en caliente desde snapshots de markets en disco
+MARKET_SNAPSHOT_DIR = "data/market_snapshots"  # Un archivo por exchange
+EXCHANGE_HEALTH_PROBE_INTERVAL = 30  # Intervalo del probe periódico de salud de exchanges
+
+# Configuración del scheduler de requests por exchange (reemplaza el enableRateLimit serial de CCXT)
+REQUEST_SCHEDULER_ENABLED = True
+REQUEST_DEFAULT_RATE_LIMIT_MS = 100  # Si la instancia CCXT no publica rateLimit
+REQUEST_BUCKET_BURST_S = 1.0  # Capacidad del token bucket en segundos de tasa
+REQUEST_MAX_CONCURRENCY = 8  # Llamadas simultáneas por exchange
+# Fracción del bucket que cada carril debe dejar libre (las órdenes pueden usarlo todo)
+REQUEST_LANE_RESERVE = {"orders": 0.0, "withdrawals": 0.1, "prices": 0.25, "metadata": 0.5}
+# Slots de REQUEST_MAX_CONCURRENCY que cada carril deja libres (precios lentos no bloquean órdenes)
+REQUEST_LANE_SLOT_RESERVE = {"orders": 0, "withdrawals": 1, "prices": 2, "metadata": 3}
+# Costo por método en unidades de rateLimit (pesos publicados por los exchanges)
+REQUEST_METHOD_COSTS = {
+    "fetch_tickers": 20, "fetch_order_book": 2, "fetch_balance": 5, "fetch_currencies": 10,
+    "fetch_trading_fees": 5, "fetch_deposit_withdraw_fees": 10, "load_markets": 20
+}
+REQUEST_COST_OVERRIDES = {
+    "binance": {"fetch_tickers": 40, "fetch_order_book": 5, "fetch_balance": 10}
+}
+
+# Configuración del catálogo de tarifas de trading y redes de retiro
+FEE_CATALOGUE_SNAPSHOT_FILE = "data/fee_catalogue.json"
+FEE_CATALOGUE_REFRESH_INTERVAL = 6 * 3600  # Las tarifas cambian del orden de horas
+
+# Configuración del modo streaming de order books (WebSocket)
+STREAMING_MODE_ENABLED = False  # True para mantener order books del top 20 en memoria
+STREAM_ORDER_BOOK_DEPTH = 20  # Niveles L2 por lado a mantener
+STREAM_MAX_BOOK_AGE = 5.0  # Segundos; order books más viejos se consideran obsoletos
+STREAM_REPLAY_FILE = None  # Archivo de order books grabados para usar un feed local
+STREAM_REPLAY_INTERVAL = 0.1  # Pausa entre registros reproducidos sin timestamps crecientes (segundos)
+STREAM_RECORD_FILE = None  # Si se define, graba cada actualización recibida
+
+# Configuración del scanner de spreads sobre todo el universo de símbolos
+SCANNER_ENABLED = False  # True para escanear todos los pares además del top 20 de Sebo
+SCANNER_INTERVAL = 5.0  # Segundos entre ciclos; un ciclo dura lo que el fetch_tickers más lento
+SCANNER_FETCH_TIMEOUT = 10.0  # Timeout del fetch_tickers de cada exchange
+SCANNER_UNIVERSE_FILE = "../sebo/src/server/data/spot_usdt_coins.json"  # None: todos los pares del quote
+SCANNER_QUOTE_CURRENCY = "USDT"
+SCANNER_MIN_NET_PROFIT_PERCENTAGE = 0.6  # Ganancia neta mínima para reportar un spread
+SCANNER_SUBMIT_TOP_N = 5  # Mejores spreads enviados al scheduler por ciclo
+
+# Configuración del fan-out de mensajes a la UI
+UI_CLIENT_QUEUE_SIZE = 256  # Mensajes pendientes por cliente antes de aplicar la política de lentos
+UI_SLOW_CLIENT_POLICY = "drop"  # "drop" descarta el mensaje más viejo; "disconnect" cierra el cliente
+UI_CLIENT_SEND_TIMEOUT = 5.0  # Segundos máximos de un send antes de desconectar al cliente
+UI_CLIENT_MAX_LAG = 30.0  # Segundos con la cola llena antes de desconectar al cliente
+UI_COALESCED_MESSAGE_TYPES = ["spot_arb_data", "top20_data", "balance_update"]  # Solo se envía el último valor
+UI_TOP20_HISTORY_SIZE = 16  # Versiones del top 20 guardadas para calcular deltas; más atrás se envía snapshot
+
+# Configuración de serialización de mensajes ("json", "orjson" o "msgpack")
+UI_DEFAULT_SERIALIZER = "json"  # Cada cliente UI puede pedir otro con ?serializer=... o 'set_serializer'
+SEBO_SERIALIZER = "json"  # "msgpack" requiere que Sebo use socket.io-msgpack-parser
+PERSISTENCE_SERIALIZER = "json"  # Archivos de estado; siempre se guardan como JSON de texto
+SEBO_CAPTURE_TOP20_FILE = None  # Si se define, guarda cada top_20_data recibido (JSON lines) para benchmarks
+
+# Configuración de grabación del tráfico de Sebo (reproducible con sebo_replay_server.py)
+SEBO_RECORD_FILE = None  # Si se define, graba cada evento Socket.IO recibido de Sebo (append-only)
+SEBO_RECORD_FLUSH_INTERVAL = 0.5  # Segundos entre escrituras del buffer de grabación
+
 # Configuración de exchanges soportados
 SUPPORTED_EXCHANGES = [
     "binance", "okx", "kucoin", "bybit", "huobi", "gate", "mexc"
@@ -2,19 +2,43 @@
 
 import asyncio
 import logging
-import csv
+import json
 import os
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional, List
-from config_v3 import CSV_LOG_PATH, TRADING_STATE_FILE, BALANCE_CACHE_FILE
+import pyarrow.parquet as pq
+from config_v3 import CSV_LOG_PATH, TRADING_STATE_FILE, BALANCE_CACHE_FILE, PERSISTENCE_SERIALIZER
 from utils import save_json_file, load_json_file, get_current_timestamp, safe_float
+from log_writer import BufferedCSVWriter
+from operation_store import OperationStore
+from serialization import get_serializer
+from state_checkpoint import StateCheckpointer
+from tracing import TRACE_STAGES
+from metrics import registry
+
+LOG_WRITER_QUEUE_DEPTH = registry.gauge('v3_log_writer_queue_depth', 'Filas esperando escritura', ['file'])
+LOG_WRITER_ROWS = registry.counter('v3_log_writer_rows_total', 'Filas del escritor de logs por estado', ['file', 'state'])
 
 class DataPersistence:
     """Maneja la persistencia de datos para V3."""
     
     def __init__(self):
         self.logger = logging.getLogger('V3.DataPersistence')
+        self.serializer = get_serializer(PERSISTENCE_SERIALIZER)
         self._ensure_directories()
+        
+        # Escritores en background por archivo CSV
+        self.csv_writers: Dict[str, BufferedCSVWriter] = {}
+        
+        # Almacén columnar de operaciones (alimentado por el escritor de CSV_LOG_PATH)
+        self.operation_store = OperationStore()
+        
+        # Archivos de estado: escrituras agrupadas y atómicas fuera del loop
+        self.checkpointer = StateCheckpointer(self.serializer)
+        self.checkpointer.register('trading_state', TRADING_STATE_FILE)
+        self.checkpointer.register('balance_cache', BALANCE_CACHE_FILE)
+        
+        registry.register_collector(self._collect_metrics)
     
     def _ensure_directories(self):
         """Asegura que los directorios necesarios existan."""
@@ -29,10 +53,69 @@ class DataPersistence:
                 os.makedirs(directory, exist_ok=True)
                 self.logger.debug(f"Directorio creado: {directory}")
     
+    async def initialize(self):
+        """Migra el historial CSV al almacén columnar la primera vez."""
+        try:
+            if self.operation_store.has_data():
+                return
+            
+            log_files = self._get_csv_writer(CSV_LOG_PATH).get_log_files()
+            if log_files:
+                imported = await asyncio.get_running_loop().run_in_executor(
+                    None, self.operation_store.import_csv, log_files
+                )
+                self.logger.info(f"Historial CSV importado al almacén de operaciones: {imported} filas")
+                
+        except Exception as e:
+            self.logger.error(f"Error importando historial CSV: {e}")
+    
+    async def cleanup(self):
+        """Escribe el estado pendiente, vacía las colas de logs y cierra los archivos."""
+        try:
+            await self.checkpointer.flush()
+        except Exception as e:
+            self.logger.error(f"Error escribiendo archivos de estado pendientes: {e}")
+        
+        for csv_path, writer in list(self.csv_writers.items()):
+            try:
+                await writer.stop()
+                self.logger.debug(f"Log CSV cerrado: {csv_path} ({writer.stats['rows_written']} filas escritas)")
+            except Exception as e:
+                self.logger.error(f"Error cerrando log CSV {csv_path}: {e}")
+        self.csv_writers.clear()
+    
     # Logging de operaciones en CSV
     
+    def _get_csv_writer(self, csv_path: str) -> BufferedCSVWriter:
+        """Obtiene (o crea) el escritor en background de un archivo CSV."""
+        writer = self.csv_writers.get(csv_path)
+        if writer is None:
+            batch_sinks = [self.operation_store.append_rows] if csv_path == CSV_LOG_PATH else []
+            writer = BufferedCSVWriter(csv_path, batch_sinks=batch_sinks)
+            self.csv_writers[csv_path] = writer
+        return writer
+    
+    async def flush_logs(self):
+        """Espera a que las operaciones encoladas estén escritas en disco."""
+        for writer in list(self.csv_writers.values()):
+            await writer.flush()
+    
+    def get_log_writer_stats(self) -> Dict[str, Dict]:
+        """Retorna estadísticas de los escritores de logs."""
+        return {csv_path: writer.get_stats() for csv_path, writer in self.csv_writers.items()}
+    
+    def get_checkpoint_stats(self) -> Dict[str, Dict]:
+        """Retorna estadísticas de las escrituras de archivos de estado."""
+        return self.checkpointer.get_stats()
+    
+    def _collect_metrics(self):
+        for csv_path, stats in self.get_log_writer_stats().items():
+            LOG_WRITER_QUEUE_DEPTH.set(stats['queue_depth'], file=csv_path)
+            for state in ('enqueued', 'written', 'dropped'):
+                LOG_WRITER_ROWS.set(stats[f'rows_{state}'], file=csv_path, state=state)
+    
     async def log_operation_to_csv(self, operation_data: Dict, csv_path: str = None):
-        """Registra una operación en el archivo CSV."""
+        """Registra una operación en el archivo CSV (encola la fila; la escritura es en background)."""
         if csv_path is None:
             csv_path = CSV_LOG_PATH
         
@@ -40,21 +123,8 @@ class DataPersistence:
             # Preparar datos para CSV
             csv_data = self._prepare_csv_data(operation_data)
             
-            # Verificar si el archivo existe para escribir headers
-            file_exists = os.path.exists(csv_path)
-            
-            # Escribir al CSV
-            with open(csv_path, 'a', newline='', encoding='utf-8') as csvfile:
-                fieldnames = list(csv_data.keys())
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                # Escribir headers si es un archivo nuevo
-                if not file_exists:
-                    writer.writeheader()
-                
-                writer.writerow(csv_data)
-            
-            self.logger.debug(f"Operación registrada en CSV: {operation_data.get('symbol', 'N/A')}")
+            if self._get_csv_writer(csv_path).write_row(csv_data):
+                self.logger.debug(f"Operación encolada para CSV: {operation_data.get('symbol', 'N/A')}")
             
         except Exception as e:
             self.logger.error(f"Error registrando operación en CSV: {e}")
@@ -89,6 +159,17 @@ class DataPersistence:
         balance_config = operation_data.get('current_balance_config_v2', {})
         initial_balance = safe_float(balance_config.get('balance_usdt', 0))
         
+        # Latencias de las sub-llamadas de datos de mercado
+        market_timings = operation_data.get('market_data_timings_ms') or {}
+        
+        # Traza de punta a punta (desde el evento de Sebo hasta el broadcast a la UI)
+        trace = operation_data.get('trace') or {}
+        spans = trace.get('spans_ms') or {}
+        stage_timings = {
+            f"{stage}_span_ms": safe_float(spans.get(stage, 0))
+            for stage in TRACE_STAGES
+        }
+        
         return {
             'timestamp': timestamp,
             'symbol': symbol,
@@ -106,23 +187,34 @@ class DataPersistence:
             'analysis_id': operation_data.get('analysis_id', 'N/A'),
             'error_message': operation_data.get('error_message', ''),
             'ai_confidence': safe_float(operation_data.get('ai_confidence', 0)),
-            'execution_time_ms': safe_float(operation_data.get('execution_time_ms', 0))
+            'execution_time_ms': safe_float(operation_data.get('execution_time_ms', 0)),
+            'market_data_time_ms': safe_float(market_timings.get('total', 0)),
+            'buy_ticker_time_ms': safe_float(market_timings.get('buy_ticker', 0)),
+            'sell_ticker_time_ms': safe_float(market_timings.get('sell_ticker', 0)),
+            'buy_fees_time_ms': safe_float(market_timings.get('buy_fees', 0)),
+            'sell_fees_time_ms': safe_float(market_timings.get('sell_fees', 0)),
+            'withdrawal_info_time_ms': safe_float(market_timings.get('withdrawal_info', 0)),
+            'trace_id': trace.get('trace_id', ''),
+            'end_to_end_ms': safe_float(trace.get('end_to_end_ms', 0)),
+            **stage_timings,
+            'trace_spans': json.dumps(spans, separators=(',', ':')) if spans else ''
         }
     
     # Estado del trading
     
-    async def save_trading_state(self, state_data: Dict) -> bool:
-        """Guarda el estado actual del trading."""
+    async def save_trading_state(self, state_data: Dict, immediate: bool = False) -> bool:
+        """Guarda el estado actual del trading.
+        
+        Por defecto solo marca el estado para la próxima escritura agrupada;
+        immediate=True lo escribe ya (atómicamente) y espera a que termine.
+        """
         try:
             state_data['last_updated'] = get_current_timestamp()
-            success = save_json_file(state_data, TRADING_STATE_FILE)
-            
-            if success:
-                self.logger.debug("Estado de trading guardado")
-            else:
-                self.logger.error("Error guardando estado de trading")
+            self.checkpointer.mark_dirty('trading_state', state_data)
             
-            return success
+            if immediate:
+                return await self.checkpointer.flush('trading_state')
+            return True
             
         except Exception as e:
             self.logger.error(f"Error guardando estado de trading: {e}")
@@ -131,7 +223,7 @@ class DataPersistence:
     async def load_trading_state(self) -> Optional[Dict]:
         """Carga el estado del trading."""
         try:
-            state = load_json_file(TRADING_STATE_FILE)
+            state = self.checkpointer.get_pending('trading_state') or load_json_file(TRADING_STATE_FILE, self.serializer)
             
             if state:
                 self.logger.debug("Estado de trading cargado")
@@ -154,14 +246,8 @@ class DataPersistence:
                 'last_updated': get_current_timestamp()
             }
             
-            success = save_json_file(cache_data, BALANCE_CACHE_FILE)
-            
-            if success:
-                self.logger.debug("Cache de balances guardado")
-            else:
-                self.logger.error("Error guardando cache de balances")
-            
-            return success
+            self.checkpointer.mark_dirty('balance_cache', cache_data)
+            return True
             
         except Exception as e:
             self.logger.error(f"Error guardando cache de balances: {e}")
@@ -170,7 +256,7 @@ class DataPersistence:
     async def load_balance_cache(self) -> Optional[Dict]:
         """Carga el cache de balances."""
         try:
-            cache = load_json_file(BALANCE_CACHE_FILE)
+            cache = self.checkpointer.get_pending('balance_cache') or load_json_file(BALANCE_CACHE_FILE, self.serializer)
             
             if cache:
                 self.logger.debug("Cache de balances cargado")
@@ -200,7 +286,7 @@ class DataPersistence:
                 'count': len(training_data)
             }
             
-            success = save_json_file(data_to_save, filepath)
+            success = save_json_file(data_to_save, filepath, self.serializer)
             
             if success:
                 self.logger.info(f"Datos de entrenamiento guardados: {len(training_data)} registros")
@@ -219,7 +305,7 @@ class DataPersistence:
             filepath = "data/training_data.json"
         
         try:
-            data = load_json_file(filepath)
+            data = load_json_file(filepath, self.serializer)
             
             if data and 'training_data' in data:
                 training_data = data['training_data']
@@ -238,66 +324,18 @@ class DataPersistence:
     async def get_operation_statistics(self, days: int = 7) -> Dict[str, Any]:
         """Obtiene estadísticas de operaciones de los últimos días."""
         try:
-            if not os.path.exists(CSV_LOG_PATH):
-                return self._empty_statistics()
-            
-            stats = {
-                'total_operations': 0,
-                'successful_operations': 0,
-                'failed_operations': 0,
-                'total_profit_usdt': 0.0,
-                'total_investment_usdt': 0.0,
-                'average_profit_percentage': 0.0,
-                'symbols_traded': set(),
-                'exchanges_used': set(),
-                'success_rate': 0.0
-            }
-            
-            # Leer CSV y calcular estadísticas
-            with open(CSV_LOG_PATH, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                
-                for row in reader:
-                    stats['total_operations'] += 1
-                    
-                    # Determinar si fue exitosa
-                    decision = row.get('decision_outcome', '')
-                    if 'EJECUTADA' in decision:
-                        stats['successful_operations'] += 1
-                    else:
-                        stats['failed_operations'] += 1
-                    
-                    # Acumular profits e inversiones
-                    profit = safe_float(row.get('net_profit_usdt', 0))
-                    investment = safe_float(row.get('investment_usdt', 0))
-                    
-                    stats['total_profit_usdt'] += profit
-                    stats['total_investment_usdt'] += investment
-                    
-                    # Recopilar símbolos y exchanges
-                    symbol = row.get('symbol', '').strip()
-                    if symbol and symbol != 'N/A':
-                        stats['symbols_traded'].add(symbol)
-                    
-                    buy_ex = row.get('buy_exchange_id', '').strip()
-                    sell_ex = row.get('sell_exchange_id', '').strip()
-                    if buy_ex and buy_ex != 'N/A':
-                        stats['exchanges_used'].add(buy_ex)
-                    if sell_ex and sell_ex != 'N/A':
-                        stats['exchanges_used'].add(sell_ex)
-            
-            # Calcular métricas derivadas
-            if stats['total_operations'] > 0:
-                stats['success_rate'] = (stats['successful_operations'] / stats['total_operations']) * 100
+            # Incluir las operaciones aún en cola
+            await self.flush_logs()
             
-            if stats['total_investment_usdt'] > 0:
-                stats['average_profit_percentage'] = (stats['total_profit_usdt'] / stats['total_investment_usdt']) * 100
+            if not self.operation_store.has_data():
+                return self._empty_statistics()
             
-            # Convertir sets a listas para serialización
-            stats['symbols_traded'] = list(stats['symbols_traded'])
-            stats['exchanges_used'] = list(stats['exchanges_used'])
+            # Solo se leen las particiones del rango; los días completos usan agregados precalculados
+            stats = await asyncio.get_running_loop().run_in_executor(
+                None, self.operation_store.get_statistics, days
+            )
             
-            self.logger.debug(f"Estadísticas calculadas: {stats['total_operations']} operaciones")
+            self.logger.debug(f"Estadísticas calculadas: {stats['total_operations']} operaciones ({days} días)")
             return stats
             
         except Exception as e:
@@ -330,13 +368,30 @@ class DataPersistence:
         except Exception as e:
             self.logger.error(f"Error en limpieza de logs: {e}")
     
+    def _export_operations(self, export_path: str):
+        """Escribe todas las operaciones del almacén en export_path (.parquet, .json o CSV)."""
+        directory = os.path.dirname(export_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        if export_path.endswith('.parquet'):
+            pq.write_table(self.operation_store.read_table(), export_path)
+            return
+        
+        df = self.operation_store.read_frame()
+        if export_path.endswith('.json'):
+            df.to_json(export_path, orient='records', date_format='iso')
+        else:
+            df.to_csv(export_path, index=False)
+    
     async def export_data(self, export_path: str, data_type: str = "operations") -> bool:
         """Exporta datos a un archivo específico."""
         try:
-            if data_type == "operations" and os.path.exists(CSV_LOG_PATH):
-                # Copiar archivo CSV de operaciones
-                import shutil
-                shutil.copy2(CSV_LOG_PATH, export_path)
+            await self.flush_logs()
+            
+            if data_type == "operations" and self.operation_store.has_data():
+                # Exportar desde el almacén columnar; el formato se elige por extensión
+                await asyncio.get_running_loop().run_in_executor(None, self._export_operations, export_path)
                 self.logger.info(f"Datos de operaciones exportados a: {export_path}")
                 return True
             else:
@@ -2,33 +2,131 @@
 
 import asyncio
 import logging
+import os
+import time
 from typing import Dict, Any, Optional, Tuple, List
 import ccxt.async_support as ccxt
-from config_v3 import API_KEYS, SUPPORTED_EXCHANGES, PREFERRED_NETWORKS, REQUEST_TIMEOUT
+from config_v3 import (
+    API_KEYS, SUPPORTED_EXCHANGES, PREFERRED_NETWORKS, REQUEST_TIMEOUT,
+    MARKET_CACHE_TTL, MARKET_CACHE_REFRESH_CHECK_INTERVAL, EXCHANGE_HEALTH_PROBE_INTERVAL,
+    STREAMING_MODE_ENABLED, STREAM_REPLAY_FILE, STREAM_RECORD_FILE, REQUEST_SCHEDULER_ENABLED,
+    CIRCUIT_BREAKER_ENABLED, MARKET_SNAPSHOT_ENABLED, PAPER_EXCHANGE_ENABLED, PAPER_EXCHANGE_URL, PAPER_DATA_DIR
+)
 from utils import safe_float, find_cheapest_network, validate_exchange_id
+from fee_catalogue import FeeCatalogue
+from market_stream import MarketDataStream, CcxtProFeed, ReplayFeed
+from metrics import registry
+from request_scheduler import RequestScheduler, get_method_lane
+from circuit_breaker import CircuitBreakerRegistry
+from http_pool import http_pool
+from market_snapshot import MarketSnapshotStore
+from paper_exchange import PaperMarket, create_paper_exchange
+
+CCXT_LATENCY = registry.histogram(
+    'v3_ccxt_request_duration_seconds', 'Latencia de llamadas CCXT por exchange y método', ['exchange', 'method']
+)
+CCXT_ERRORS = registry.counter(
+    'v3_ccxt_request_errors_total', 'Llamadas CCXT fallidas por tipo de error', ['exchange', 'method', 'error']
+)
+EXCHANGE_HEALTHY = registry.gauge('v3_exchange_healthy', 'Resultado del último probe de salud (1 = sano)', ['exchange'])
+EXCHANGE_PROBE_LATENCY = registry.gauge(
+    'v3_exchange_probe_latency_seconds', 'Latencia del último probe de salud', ['exchange']
+)
 
 class ExchangeManager:
     """Maneja las interacciones con exchanges usando CCXT."""
     
-    def __init__(self):
+    def __init__(self, paper_market: PaperMarket = None):
         self.logger = logging.getLogger('V3.ExchangeManager')
         self.ccxt_instances: Dict[str, ccxt.Exchange] = {}
         self.exchange_info_cache: Dict[str, Dict] = {}
+        
+        # Exchanges simulados en lugar de CCXT (in-process o en el servidor de PAPER_EXCHANGE_URL)
+        if paper_market is None and PAPER_EXCHANGE_ENABLED and not PAPER_EXCHANGE_URL:
+            paper_market = PaperMarket()
+        self.paper_market = paper_market
+        self.paper_mode = paper_market is not None or PAPER_EXCHANGE_ENABLED
+        
+        # Cache de metadatos de mercado por exchange (markets, símbolos, mínimos, precisión)
+        self.market_cache: Dict[str, Dict] = {}
+        self._market_load_locks: Dict[str, asyncio.Lock] = {}
+        # En modo paper no hay nada que calentar: los markets se generan en memoria
+        self.market_snapshots = MarketSnapshotStore(
+            ccxt_version=getattr(ccxt, '__version__', None)
+        ) if MARKET_SNAPSHOT_ENABLED and not self.paper_mode else None
+        
+        # Tabla de salud por exchange, actualizada por el probe periódico
+        self.exchange_health: Dict[str, Dict] = {}
+        
+        # Catálogo de tarifas de trading y redes de retiro
+        self.fee_catalogue = FeeCatalogue(
+            self, snapshot_path=os.path.join(PAPER_DATA_DIR, 'fee_catalogue.json') if self.paper_mode else None
+        )
+        
+        # Stream opcional de order books en memoria
+        self.market_stream: Optional[MarketDataStream] = None
+        
+        self._background_tasks: List[asyncio.Task] = []
+        
+        # Scheduler con prioridad por exchange delante de todas las llamadas CCXT
+        self.request_scheduler = RequestScheduler() if REQUEST_SCHEDULER_ENABLED else None
+        
+        # Circuit breakers por (exchange, clase de endpoint): fallan rápido con el exchange degradado
+        self.circuit_breakers = CircuitBreakerRegistry() if CIRCUIT_BREAKER_ENABLED else None
+        
+        registry.register_collector(self._collect_metrics)
     
     async def initialize(self):
         """Inicializa las instancias de CCXT para exchanges soportados."""
         self.logger.info("Inicializando ExchangeManager...")
+        if self.paper_mode:
+            self.logger.warning(f"Modo paper: exchanges simulados {'en ' + PAPER_EXCHANGE_URL if PAPER_EXCHANGE_URL else 'en memoria'}")
         
-        for exchange_id in SUPPORTED_EXCHANGES:
-            try:
-                await self._create_exchange_instance(exchange_id)
-            except Exception as e:
-                self.logger.warning(f"No se pudo inicializar {exchange_id}: {e}")
+        results = await asyncio.gather(
+            *(self._create_exchange_instance(exchange_id) for exchange_id in SUPPORTED_EXCHANGES),
+            return_exceptions=True
+        )
+        for exchange_id, result in zip(SUPPORTED_EXCHANGES, results):
+            if isinstance(result, Exception):
+                self.logger.warning(f"No se pudo inicializar {exchange_id}: {result}")
+        
+        if self.market_snapshots:
+            await self._warm_start_markets()
         
         self.logger.info(f"ExchangeManager inicializado con {len(self.ccxt_instances)} exchanges")
+        
+        # El refresco en background carga enseguida los exchanges sin snapshot
+        self.start_background_tasks()
+        await self.fee_catalogue.initialize()
+        
+        if STREAMING_MODE_ENABLED:
+            feed = ReplayFeed(path=STREAM_REPLAY_FILE) if STREAM_REPLAY_FILE else CcxtProFeed()
+            self.enable_streaming(MarketDataStream(feed, record_path=STREAM_RECORD_FILE))
+    
+    def start_background_tasks(self):
+        """Lanza el refresco de metadatos de mercado y el probe de salud en background."""
+        if self._background_tasks:
+            return
+        
+        self._background_tasks = [
+            asyncio.create_task(self._market_refresh_loop()),
+            asyncio.create_task(self._health_probe_loop())
+        ]
     
     async def cleanup(self):
         """Limpia recursos de CCXT."""
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks = []
+        await self.fee_catalogue.cleanup()
+        
+        if self.market_stream:
+            await self.market_stream.stop()
+        
+        if self.request_scheduler:
+            await self.request_scheduler.stop()
+        
         self.logger.info("Cerrando instancias CCXT...")
         
         for exchange_id, instance in self.ccxt_instances.items():
@@ -40,6 +138,10 @@ class ExchangeManager:
                 self.logger.error(f"Error cerrando conexión CCXT para {exchange_id}: {e}")
         
         self.ccxt_instances.clear()
+        self.market_cache.clear()
+        
+        if self.paper_market:
+            self.paper_market.close()
         self.logger.info("Todas las instancias CCXT cerradas")
     
     async def _create_exchange_instance(self, exchange_id: str) -> Optional[ccxt.Exchange]:
@@ -48,15 +150,21 @@ class ExchangeManager:
             self.logger.error(f"Exchange no soportado: {exchange_id}")
             return None
         
+        if self.paper_mode:
+            return self._create_paper_instance(exchange_id)
+        
         try:
             # Obtener clase del exchange
             exchange_class = getattr(ccxt, exchange_id.lower())
             
             # Configuración básica
             config = {
-                'enableRateLimit': True,
+                # Con el scheduler activo el límite lo aplica él (CCXT serializaría todas las llamadas)
+                'enableRateLimit': not REQUEST_SCHEDULER_ENABLED,
                 'timeout': REQUEST_TIMEOUT * 1000,  # CCXT usa milisegundos
                 'sandbox': False,  # Cambiar a True para testing
+                # Sesión propia (cookies) sobre el conector compartido: CCXT no la cierra
+                'session': http_pool.get_session(f'ccxt.{exchange_id}'),
             }
             
             # Agregar API keys si están disponibles
@@ -80,6 +188,9 @@ class ExchangeManager:
             instance = exchange_class(config)
             self.ccxt_instances[exchange_id] = instance
             
+            if self.request_scheduler:
+                self.request_scheduler.register_exchange(exchange_id, getattr(instance, 'rateLimit', None))
+            
             self.logger.debug(f"Instancia CCXT creada para {exchange_id}")
             return instance
             
@@ -90,6 +201,97 @@ class ExchangeManager:
             self.logger.error(f"Error creando instancia CCXT para {exchange_id}: {e}")
             return None
     
+    def _create_paper_instance(self, exchange_id: str):
+        """Crea un exchange simulado con la misma interfaz que la instancia CCXT."""
+        instance = create_paper_exchange(exchange_id, self.paper_market)
+        self.ccxt_instances[exchange_id] = instance
+        
+        if self.request_scheduler:
+            self.request_scheduler.register_exchange(exchange_id, instance.rateLimit)
+        
+        self.logger.debug(f"Instancia paper creada para {exchange_id}")
+        return instance
+    
+    async def _ccxt_call(self, exchange_id: str, call, *args, **kwargs):
+        """Ejecuta una llamada CCXT (vía el scheduler de requests si está activo).
+        
+        Con el circuito del exchange/endpoint abierto lanza CircuitOpenError sin llamar al exchange.
+        """
+        method = getattr(call, '__name__', 'unknown')
+        breaker = self.circuit_breakers.get(exchange_id, get_method_lane(method)) if self.circuit_breakers else None
+        probe = breaker.before_call() if breaker else None
+        
+        if self.request_scheduler:
+            # El token va en los argumentos: una prueba nunca se agrupa con otra llamada en vuelo
+            try:
+                return await self.request_scheduler.submit(
+                    exchange_id, method, self._timed_ccxt_call, exchange_id, method, probe, call, *args, **kwargs
+                )
+            finally:
+                # Prueba que no salió de la cola (cancelada por stop() o por quien esperaba)
+                if probe is not None and not probe.started:
+                    breaker.release(probe)
+        return await self._timed_ccxt_call(exchange_id, method, probe, call, *args, **kwargs)
+    
+    async def _timed_ccxt_call(self, exchange_id: str, method: str, probe, call, *args, **kwargs):
+        """Llama a CCXT midiendo su latencia y errores por exchange y método."""
+        breaker = self.circuit_breakers.get(exchange_id, get_method_lane(method)) if self.circuit_breakers else None
+        if probe is not None:
+            probe.started = True
+        start = time.perf_counter()
+        try:
+            result = await call(*args, **kwargs)
+            if breaker:
+                breaker.record(False, (time.perf_counter() - start) * 1000, probe=probe)
+            return result
+        except asyncio.CancelledError:
+            if breaker:
+                breaker.record_cancelled((time.perf_counter() - start) * 1000, probe)
+            raise
+        except Exception as e:
+            CCXT_ERRORS.inc(exchange=exchange_id, method=method, error=type(e).__name__)
+            if breaker:
+                # Solo fallas de red/disponibilidad abren el circuito (no fondos insuficientes, símbolo inválido...)
+                unavailable = isinstance(e, (ccxt.NetworkError, asyncio.TimeoutError))
+                breaker.record(unavailable, (time.perf_counter() - start) * 1000, type(e).__name__, probe)
+            raise
+        finally:
+            CCXT_LATENCY.observe(time.perf_counter() - start, exchange=exchange_id, method=method)
+    
+    def get_circuit_block_reason(self, exchange_id: str, endpoints: Tuple[str, ...] = ('prices', 'orders', 'withdrawals')) -> Optional[str]:
+        """Motivo por el que un exchange está cortado por sus circuit breakers (None si está disponible)."""
+        if not self.circuit_breakers:
+            return None
+        return self.circuit_breakers.get_block_reason(exchange_id, endpoints)
+    
+    def get_circuit_breaker_stats(self) -> Optional[Dict[str, Dict]]:
+        """Retorna el estado de los circuit breakers por exchange y endpoint."""
+        return self.circuit_breakers.get_stats() if self.circuit_breakers else None
+    
+    def get_market_cache_stats(self) -> Dict[str, Any]:
+        """Símbolos y antigüedad de los markets cacheados, y estadísticas de los snapshots."""
+        now = time.time()
+        return {
+            'exchanges': {
+                exchange_id: {'symbols': len(entry['symbols']), 'age_s': now - entry['loaded_at']}
+                for exchange_id, entry in self.market_cache.items()
+            },
+            'snapshots': self.market_snapshots.get_stats() if self.market_snapshots else None
+        }
+    
+    def get_paper_exchange_stats(self) -> Optional[Dict[str, Any]]:
+        """Órdenes, retiros, fallos inyectados y valuación del mercado simulado (None fuera del modo paper)."""
+        return self.paper_market.get_stats() if self.paper_market else None
+    
+    def get_request_scheduler_stats(self) -> Optional[Dict[str, Dict]]:
+        """Retorna el estado del scheduler de requests por exchange."""
+        return self.request_scheduler.get_stats() if self.request_scheduler else None
+    
+    def _collect_metrics(self):
+        for exchange_id, health in self.exchange_health.items():
+            EXCHANGE_HEALTHY.set(1 if health.get('healthy') else 0, exchange=exchange_id)
+            EXCHANGE_PROBE_LATENCY.set(health.get('latency_ms', 0) / 1000, exchange=exchange_id)
+    
     async def get_exchange_instance(self, exchange_id: str) -> Optional[ccxt.Exchange]:
         """Obtiene una instancia CCXT, creándola si no existe."""
         if exchange_id not in self.ccxt_instances:
@@ -97,6 +299,18 @@ class ExchangeManager:
         
         return self.ccxt_instances.get(exchange_id)
     
+    # Modo streaming
+    
+    def enable_streaming(self, market_stream: MarketDataStream):
+        """Activa el modo streaming; precios y order books se sirven desde memoria."""
+        self.market_stream = market_stream
+        self.logger.info(f"Modo streaming de order books activado ({type(market_stream.feed).__name__})")
+    
+    async def update_stream_subscriptions(self, top20_data: List[Dict]):
+        """Sincroniza las suscripciones del stream con el top 20 de Sebo."""
+        if self.market_stream:
+            await self.market_stream.update_subscriptions(top20_data)
+    
     # Métodos para obtener precios de mercado
     
     async def get_ticker(self, exchange_id: str, symbol: str) -> Optional[Dict]:
@@ -106,7 +320,7 @@ class ExchangeManager:
             return None
         
         try:
-            ticker = await exchange.fetch_ticker(symbol)
+            ticker = await self._ccxt_call(exchange_id, exchange.fetch_ticker, symbol)
             self.logger.debug(f"Ticker obtenido: {symbol}@{exchange_id}")
             return ticker
         except ccxt.NetworkError as e:
@@ -118,8 +332,37 @@ class ExchangeManager:
         
         return None
     
+    async def get_tickers(self, exchange_id: str, symbols: List[str] = None) -> Optional[Dict[str, Dict]]:
+        """Obtiene los tickers de un exchange en una sola llamada (fetch_tickers)."""
+        exchange = await self.get_exchange_instance(exchange_id)
+        if not exchange:
+            return None
+        
+        if not exchange.has.get('fetchTickers'):
+            self.logger.debug(f"{exchange_id} no soporta fetch_tickers")
+            return None
+        
+        try:
+            await self._ensure_market_metadata(exchange_id)
+            tickers = await self._ccxt_call(exchange_id, exchange.fetch_tickers, symbols)
+            self.logger.debug(f"Tickers obtenidos de {exchange_id}: {len(tickers)}")
+            return tickers
+        except ccxt.NetworkError as e:
+            self.logger.error(f"Error de red obteniendo tickers de {exchange_id}: {e}")
+        except ccxt.ExchangeError as e:
+            self.logger.error(f"Error de exchange obteniendo tickers de {exchange_id}: {e}")
+        except Exception as e:
+            self.logger.error(f"Error genérico obteniendo tickers de {exchange_id}: {e}")
+        
+        return None
+    
     async def get_current_prices(self, exchange_id: str, symbol: str) -> Tuple[Optional[float], Optional[float]]:
         """Obtiene los precios ask (compra) y bid (venta) actuales."""
+        if self.market_stream:
+            ask_price, bid_price = self.market_stream.get_top_of_book(exchange_id, symbol)
+            if ask_price and bid_price:
+                return ask_price, bid_price
+        
         ticker = await self.get_ticker(exchange_id, symbol)
         
         if ticker:
@@ -131,12 +374,17 @@ class ExchangeManager:
     
     async def get_order_book(self, exchange_id: str, symbol: str, limit: int = 5) -> Optional[Dict]:
         """Obtiene el order book de un símbolo."""
+        if self.market_stream:
+            order_book = self.market_stream.get_order_book(exchange_id, symbol, limit)
+            if order_book:
+                return order_book
+        
         exchange = await self.get_exchange_instance(exchange_id)
         if not exchange:
             return None
         
         try:
-            order_book = await exchange.fetch_order_book(symbol, limit)
+            order_book = await self._ccxt_call(exchange_id, exchange.fetch_order_book, symbol, limit)
             self.logger.debug(f"Order book obtenido: {symbol}@{exchange_id}")
             return order_book
         except Exception as e:
@@ -152,7 +400,7 @@ class ExchangeManager:
             return None
         
         try:
-            balance = await exchange.fetch_balance()
+            balance = await self._ccxt_call(exchange_id, exchange.fetch_balance)
             self.logger.debug(f"Balance obtenido para {exchange_id}")
             return balance
         except ccxt.AuthenticationError as e:
@@ -180,7 +428,7 @@ class ExchangeManager:
                 return None
             
             # Crear orden de compra por valor en USDT (quoteOrderQty)
-            order = await exchange.create_market_buy_order(symbol, None, None, amount_usdt)
+            order = await self._ccxt_call(exchange_id, exchange.create_market_buy_order, symbol, None, None, amount_usdt)
             
             self.logger.info(f"Orden de compra creada: {symbol}@{exchange_id} por {amount_usdt} USDT")
             return order
@@ -212,7 +460,7 @@ class ExchangeManager:
                 return None
             
             # Crear orden de venta
-            order = await exchange.create_market_sell_order(symbol, amount)
+            order = await self._ccxt_call(exchange_id, exchange.create_market_sell_order, symbol, amount)
             
             self.logger.info(f"Orden de venta creada: {amount} {symbol}@{exchange_id}")
             return order
@@ -254,7 +502,7 @@ class ExchangeManager:
                 params['tag'] = tag
             
             # Realizar retiro
-            withdrawal = await exchange.withdraw(currency, amount, address, tag, params)
+            withdrawal = await self._ccxt_call(exchange_id, exchange.withdraw, currency, amount, address, tag, params)
             
             self.logger.info(f"Retiro iniciado: {amount} {currency} desde {exchange_id}")
             return withdrawal
@@ -272,15 +520,19 @@ class ExchangeManager:
     
     async def get_trading_fees(self, exchange_id: str, symbol: str = None) -> Optional[Dict]:
         """Obtiene las tarifas de trading de un exchange."""
+        cached_fees = self.fee_catalogue.get_trading_fees(exchange_id, symbol)
+        if cached_fees:
+            return cached_fees
+        
         exchange = await self.get_exchange_instance(exchange_id)
         if not exchange:
             return None
         
         try:
             if symbol:
-                fees = await exchange.fetch_trading_fees([symbol])
+                fees = await self._ccxt_call(exchange_id, exchange.fetch_trading_fees, [symbol])
             else:
-                fees = await exchange.fetch_trading_fees()
+                fees = await self._ccxt_call(exchange_id, exchange.fetch_trading_fees)
             
             self.logger.debug(f"Tarifas de trading obtenidas para {exchange_id}")
             return fees
@@ -291,19 +543,23 @@ class ExchangeManager:
     
     async def get_withdrawal_fees(self, exchange_id: str, currency: str = None) -> Optional[Dict]:
         """Obtiene las tarifas de retiro de un exchange."""
+        cached_fees = self.fee_catalogue.get_withdrawal_fees(exchange_id, currency)
+        if cached_fees:
+            return cached_fees
+        
         exchange = await self.get_exchange_instance(exchange_id)
         if not exchange:
             return None
         
         try:
             # Algunos exchanges requieren cargar markets primero
-            if not exchange.markets:
-                await exchange.load_markets()
+            if not await self._ensure_market_metadata(exchange_id):
+                return None
             
             if hasattr(exchange, 'fetch_deposit_withdraw_fees'):
-                fees = await exchange.fetch_deposit_withdraw_fees([currency] if currency else None)
+                fees = await self._ccxt_call(exchange_id, exchange.fetch_deposit_withdraw_fees, [currency] if currency else None)
             elif hasattr(exchange, 'fetch_currencies'):
-                currencies = await exchange.fetch_currencies()
+                currencies = await self._ccxt_call(exchange_id, exchange.fetch_currencies)
                 fees = {curr: info.get('fees', {}) for curr, info in currencies.items()}
             else:
                 # Fallback: usar información estática de markets
@@ -320,6 +576,27 @@ class ExchangeManager:
             self.logger.error(f"Error obteniendo tarifas de retiro {exchange_id}: {e}")
             return None
     
+    async def find_cheapest_network(
+        self, 
+        exchange_id: str, 
+        currency: str, 
+        preferred_networks: List[str] = None
+    ) -> Optional[Dict]:
+        """Encuentra la red de retiro más barata, consultando el catálogo de tarifas."""
+        if preferred_networks is None:
+            preferred_networks = PREFERRED_NETWORKS.get(currency, [])
+        
+        if self.fee_catalogue.has_exchange(exchange_id):
+            return self.fee_catalogue.find_cheapest_network(exchange_id, currency, preferred_networks)
+        
+        # Catálogo aún sin datos para el exchange: consultar la red
+        withdrawal_fees = await self.get_withdrawal_fees(exchange_id, currency) or {}
+        networks = withdrawal_fees.get(currency, {}).get('networks', [])
+        if isinstance(networks, dict):
+            networks = list(networks.values())
+        
+        return find_cheapest_network(networks, preferred_networks)
+    
     async def get_deposit_address(self, exchange_id: str, currency: str, network: str = None) -> Optional[Dict]:
         """Obtiene la dirección de depósito para una moneda."""
         exchange = await self.get_exchange_instance(exchange_id)
@@ -331,7 +608,7 @@ class ExchangeManager:
             if network:
                 params['network'] = network
             
-            address_info = await exchange.fetch_deposit_address(currency, params)
+            address_info = await self._ccxt_call(exchange_id, exchange.fetch_deposit_address, currency, params)
             
             self.logger.debug(f"Dirección de depósito obtenida: {currency}@{exchange_id}")
             return address_info
@@ -340,44 +617,251 @@ class ExchangeManager:
             self.logger.error(f"Error obteniendo dirección de depósito {currency}@{exchange_id}: {e}")
             return None
     
-    # Métodos de utilidad
+    # Cache de metadatos de mercado
     
-    async def check_symbol_exists(self, exchange_id: str, symbol: str) -> bool:
-        """Verifica si un símbolo existe en un exchange."""
+    async def _load_market_metadata(self, exchange_id: str, reload: bool = False) -> Optional[Dict]:
+        """Carga los markets de un exchange y reconstruye su entrada en el cache."""
         exchange = await self.get_exchange_instance(exchange_id)
         if not exchange:
-            return False
+            return None
         
-        try:
-            if not exchange.markets:
-                await exchange.load_markets()
+        lock = self._market_load_locks.setdefault(exchange_id, asyncio.Lock())
+        async with lock:
+            # Otra corrutina pudo haberlo cargado mientras esperábamos el lock
+            cached = self.market_cache.get(exchange_id)
+            if cached and not reload:
+                return cached
+            
+            start = time.monotonic()
+            try:
+                markets = await self._ccxt_call(exchange_id, exchange.load_markets, reload)
+            except Exception as e:
+                self._update_health(exchange_id, False, (time.monotonic() - start) * 1000, str(e))
+                self.logger.error(f"Error cargando markets de {exchange_id}: {e}")
+                return None
             
-            return symbol in exchange.markets
+            self._update_health(exchange_id, True, (time.monotonic() - start) * 1000)
+            previous = self.market_cache.get(exchange_id)
+            if previous and reload:
+                entry = self._diff_apply_markets(exchange_id, previous, markets or {})
+            else:
+                entry = self._build_market_cache_entry(markets or {})
+            self.market_cache[exchange_id] = entry
+            
+            if self.market_snapshots:
+                await self.market_snapshots.save_async(
+                    exchange_id, entry['markets'], getattr(exchange, 'currencies', None), entry['loaded_at']
+                )
+            
+            self.logger.debug(f"Metadatos de mercado cacheados para {exchange_id}: {len(entry['symbols'])} símbolos")
+            return entry
+    
+    @staticmethod
+    def _index_market(symbol: str, market: Dict, min_amounts: Dict, precision: Dict):
+        limits = market.get('limits') or {}
+        min_amount = (limits.get('amount') or {}).get('min')
+        min_amounts[symbol] = safe_float(min_amount) if min_amount else None
+        precision[symbol] = market.get('precision') or {}
+    
+    def _build_market_cache_entry(self, markets: Dict[str, Dict]) -> Dict:
+        """Construye los índices de lookup a partir de los markets de CCXT."""
+        min_amounts = {}
+        precision = {}
+        
+        for symbol, market in markets.items():
+            self._index_market(symbol, market, min_amounts, precision)
+        
+        return {
+            'markets': markets,
+            'symbols': frozenset(markets.keys()),
+            'min_amounts': min_amounts,
+            'precision': precision,
+            'loaded_at': time.time()
+        }
+    
+    def _diff_apply_markets(self, exchange_id: str, previous: Dict, markets: Dict[str, Dict]) -> Dict:
+        """Aplica solo los markets agregados, quitados o modificados sobre la entrada anterior.
+        
+        Se arma una entrada nueva (copiando los índices) para que quien tenga la anterior
+        siga viendo un estado consistente.
+        """
+        old_markets = previous['markets']
+        added = [symbol for symbol in markets if symbol not in old_markets]
+        removed = [symbol for symbol in old_markets if symbol not in markets]
+        changed = [
+            symbol for symbol, market in markets.items()
+            if symbol in old_markets and market != old_markets[symbol]
+        ]
+        
+        min_amounts = previous['min_amounts']
+        precision = previous['precision']
+        if added or removed or changed:
+            min_amounts = dict(min_amounts)
+            precision = dict(precision)
+            for symbol in removed:
+                min_amounts.pop(symbol, None)
+                precision.pop(symbol, None)
+            for symbol in added + changed:
+                self._index_market(symbol, markets[symbol], min_amounts, precision)
             
+            self.logger.info(
+                f"Markets de {exchange_id} actualizados: +{len(added)} -{len(removed)} ~{len(changed)}"
+            )
+        
+        return {
+            'markets': markets,
+            'symbols': frozenset(markets.keys()) if added or removed else previous['symbols'],
+            'min_amounts': min_amounts,
+            'precision': precision,
+            'loaded_at': time.time()
+        }
+    
+    async def _warm_start_markets(self) -> int:
+        """Aplica los snapshots en disco a las instancias CCXT (sin load_markets por red)."""
+        start = time.perf_counter()
+        snapshots = await self.market_snapshots.load_all(list(self.ccxt_instances.keys()))
+        
+        for exchange_id, snapshot in snapshots.items():
+            exchange = self.ccxt_instances.get(exchange_id)
+            try:
+                exchange.set_markets(snapshot['markets'], snapshot.get('currencies') or None)
+                entry = self._build_market_cache_entry(exchange.markets or {})
+                # Conserva la antigüedad real: el refresco en background decide cuándo recargar
+                entry['loaded_at'] = safe_float(snapshot.get('loaded_at'))
+                self.market_cache[exchange_id] = entry
+            except Exception as e:
+                self.logger.error(f"Error aplicando snapshot de markets de {exchange_id}: {e}")
+        
+        self.logger.info(
+            f"Arranque en caliente: markets de {len(self.market_cache)}/{len(self.ccxt_instances)} exchanges "
+            f"desde snapshot en {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        return len(self.market_cache)
+    
+    async def _ensure_market_metadata(self, exchange_id: str) -> Optional[Dict]:
+        """Retorna el cache de un exchange; solo accede a la red si nunca se cargó."""
+        cached = self.market_cache.get(exchange_id)
+        if cached:
+            return cached
+        
+        return await self._load_market_metadata(exchange_id)
+    
+    async def _market_refresh_loop(self):
+        """Refresca en background los caches ausentes o expirados según MARKET_CACHE_TTL."""
+        while True:
+            try:
+                now = time.time()
+                expired = [
+                    exchange_id for exchange_id in list(self.ccxt_instances.keys())
+                    if exchange_id not in self.market_cache
+                    or now - self.market_cache[exchange_id]['loaded_at'] >= MARKET_CACHE_TTL
+                ]
+                
+                if expired:
+                    self.logger.debug(f"Refrescando metadatos de mercado: {expired}")
+                    await asyncio.gather(
+                        *(self._load_market_metadata(exchange_id, reload=True) for exchange_id in expired),
+                        return_exceptions=True
+                    )
+                
+                await asyncio.sleep(MARKET_CACHE_REFRESH_CHECK_INTERVAL)
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error en refresco de metadatos de mercado: {e}")
+                await asyncio.sleep(MARKET_CACHE_REFRESH_CHECK_INTERVAL)
+    
+    # Salud de exchanges
+    
+    def _update_health(self, exchange_id: str, healthy: bool, latency_ms: float, error: str = None):
+        """Actualiza la tabla de salud de un exchange."""
+        previous = self.exchange_health.get(exchange_id, {})
+        
+        self.exchange_health[exchange_id] = {
+            'healthy': healthy,
+            'last_check': time.time(),
+            'latency_ms': latency_ms,
+            'error': error,
+            'consecutive_failures': 0 if healthy else previous.get('consecutive_failures', 0) + 1
+        }
+        
+        if previous and previous.get('healthy') != healthy:
+            state = "disponible" if healthy else "no disponible"
+            self.logger.warning(f"Exchange {exchange_id} ahora {state}")
+    
+    async def _probe_exchange(self, exchange_id: str) -> bool:
+        """Realiza una llamada ligera para comprobar la salud de un exchange."""
+        exchange = self.ccxt_instances.get(exchange_id)
+        if not exchange:
+            return False
+        
+        start = time.monotonic()
+        try:
+            if exchange.has.get('fetchTime'):
+                await self._ccxt_call(exchange_id, exchange.fetch_time)
+            else:
+                await self._ccxt_call(exchange_id, exchange.fetch_status)
+            self._update_health(exchange_id, True, (time.monotonic() - start) * 1000)
+            return True
         except Exception as e:
-            self.logger.error(f"Error verificando símbolo {symbol}@{exchange_id}: {e}")
+            self._update_health(exchange_id, False, (time.monotonic() - start) * 1000, str(e))
+            self.logger.debug(f"Probe de salud fallido para {exchange_id}: {e}")
+            return False
+    
+    async def _health_probe_loop(self):
+        """Actualiza periódicamente la tabla de salud de todos los exchanges activos."""
+        while True:
+            try:
+                await asyncio.gather(
+                    *(self._probe_exchange(exchange_id) for exchange_id in list(self.ccxt_instances.keys())),
+                    return_exceptions=True
+                )
+                await asyncio.sleep(EXCHANGE_HEALTH_PROBE_INTERVAL)
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error en probe de salud de exchanges: {e}")
+                await asyncio.sleep(EXCHANGE_HEALTH_PROBE_INTERVAL)
+    
+    def is_exchange_healthy(self, exchange_id: str) -> Optional[bool]:
+        """Retorna la salud de un exchange según el último probe, o None si es desconocida o vieja."""
+        health = self.exchange_health.get(exchange_id)
+        if not health or time.time() - health['last_check'] > EXCHANGE_HEALTH_PROBE_INTERVAL * 3:
+            return None
+        
+        return health['healthy']
+    
+    def get_exchange_health(self) -> Dict[str, Dict]:
+        """Retorna la tabla de salud de los exchanges."""
+        return {exchange_id: health.copy() for exchange_id, health in self.exchange_health.items()}
+    
+    # Métodos de utilidad
+    
+    async def check_symbol_exists(self, exchange_id: str, symbol: str) -> bool:
+        """Verifica si un símbolo existe en un exchange (lookup O(1) sobre el cache)."""
+        market_info = await self._ensure_market_metadata(exchange_id)
+        if not market_info:
             return False
+        
+        return symbol in market_info['symbols']
     
     async def get_minimum_order_amount(self, exchange_id: str, symbol: str) -> Optional[float]:
         """Obtiene el monto mínimo de orden para un símbolo."""
-        exchange = await self.get_exchange_instance(exchange_id)
-        if not exchange:
+        market_info = await self._ensure_market_metadata(exchange_id)
+        if not market_info:
             return None
         
-        try:
-            if not exchange.markets:
-                await exchange.load_markets()
-            
-            market = exchange.markets.get(symbol)
-            if market and 'limits' in market:
-                min_amount = market['limits'].get('amount', {}).get('min')
-                return safe_float(min_amount) if min_amount else None
-            
-            return None
-            
-        except Exception as e:
-            self.logger.error(f"Error obteniendo monto mínimo {symbol}@{exchange_id}: {e}")
+        return market_info['min_amounts'].get(symbol)
+    
+    async def get_market_precision(self, exchange_id: str, symbol: str) -> Optional[Dict]:
+        """Obtiene la precisión (amount/price) de un símbolo."""
+        market_info = await self._ensure_market_metadata(exchange_id)
+        if not market_info:
             return None
+        
+        return market_info['precision'].get(symbol)
     
     def get_supported_exchanges(self) -> List[str]:
         """Retorna la lista de exchanges soportados."""
@@ -388,18 +872,15 @@ class ExchangeManager:
         return list(self.ccxt_instances.keys())
     
     async def test_exchange_connection(self, exchange_id: str) -> bool:
-        """Prueba la conexión con un exchange."""
-        try:
-            exchange = await self.get_exchange_instance(exchange_id)
-            if not exchange:
-                return False
-            
-            # Intentar cargar markets como test básico
-            await exchange.load_markets()
-            self.logger.debug(f"Conexión exitosa con {exchange_id}")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Error probando conexión con {exchange_id}: {e}")
+        """Prueba la conexión con un exchange usando la tabla de salud si está vigente."""
+        healthy = self.is_exchange_healthy(exchange_id)
+        if healthy is not None and exchange_id in self.market_cache:
+            return healthy
+        
+        # Sin información reciente: cargar markets como test básico
+        market_info = await self._ensure_market_metadata(exchange_id)
+        if market_info is None:
             return False
-
+        
+        self.logger.debug(f"Conexión exitosa con {exchange_id}")
+        return self.exchange_health.get(exchange_id, {}).get('healthy', True)
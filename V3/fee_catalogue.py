@@ -0,0 +1,341 @@
+# Simos/V3/fee_catalogue.py
+
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Any, Optional, List, Tuple
+from config_v3 import (
+    SUPPORTED_EXCHANGES, FEE_CATALOGUE_SNAPSHOT_FILE, FEE_CATALOGUE_REFRESH_INTERVAL
+)
+from state_checkpoint import write_file_atomic
+from utils import safe_float, find_cheapest_network, load_json_file, get_current_timestamp
+
+FEE_CATALOGUE_SNAPSHOT_VERSION = 1
+
+class FeeCatalogue:
+    """Catálogo en memoria de tarifas de trading y redes de retiro por exchange."""
+
+    def __init__(self, exchange_manager, snapshot_path: str = None):
+        self.logger = logging.getLogger('V3.FeeCatalogue')
+        self.exchange_manager = exchange_manager
+        self.snapshot_path = snapshot_path or FEE_CATALOGUE_SNAPSHOT_FILE
+
+        # exchange_id -> symbol -> {'maker', 'taker'}
+        self.trading_fees: Dict[str, Dict[str, Dict]] = {}
+
+        # (exchange_id, currency, network) -> info de red normalizada
+        self.network_index: Dict[Tuple[str, str, str], Dict] = {}
+        # (exchange_id, currency) -> redes conocidas, para listar sin recorrer el índice
+        self.currency_networks: Dict[Tuple[str, str], List[str]] = {}
+
+        # exchange_id -> timestamp de la última carga exitosa
+        self.loaded_at: Dict[str, float] = {}
+
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def initialize(self):
+        """Carga el snapshot en disco y programa la carga/refresco masivo en background."""
+        self.load_snapshot()
+
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def cleanup(self):
+        """Detiene el refresco programado y persiste el snapshot."""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+        if self.loaded_at:
+            await self.save_snapshot()
+
+    # Carga masiva
+
+    async def refresh_all(self, exchange_ids: List[str] = None) -> int:
+        """Carga en paralelo las tarifas de todos los exchanges indicados."""
+        exchange_ids = exchange_ids or SUPPORTED_EXCHANGES
+
+        results = await asyncio.gather(
+            *(self.refresh_exchange(exchange_id) for exchange_id in exchange_ids),
+            return_exceptions=True
+        )
+        refreshed = sum(1 for result in results if result is True)
+
+        self.logger.info(f"Catálogo de tarifas actualizado: {refreshed}/{len(exchange_ids)} exchanges")
+        if refreshed:
+            await self.save_snapshot()
+
+        return refreshed
+
+    async def refresh_exchange(self, exchange_id: str) -> bool:
+        """Carga todas las tarifas de trading y de redes de retiro de un exchange."""
+        exchange = await self.exchange_manager.get_exchange_instance(exchange_id)
+        if not exchange:
+            return False
+
+        try:
+            # Algunos exchanges requieren cargar markets primero
+            market_info = await self.exchange_manager._ensure_market_metadata(exchange_id)
+
+            trading_fees = {}
+            if exchange.has.get('fetchTradingFees'):
+                try:
+                    raw_fees = await self.exchange_manager._ccxt_call(exchange_id, exchange.fetch_trading_fees)
+                    trading_fees = self._normalize_trading_fees(raw_fees)
+                except Exception as e:
+                    self.logger.warning(f"fetch_trading_fees falló en {exchange_id}: {e}")
+
+            # Fallback: tarifas estáticas declaradas en los markets
+            if not trading_fees and market_info:
+                trading_fees = self._normalize_trading_fees(market_info['markets'])
+
+            networks = {}
+            if exchange.has.get('fetchCurrencies'):
+                try:
+                    currencies = await self.exchange_manager._ccxt_call(exchange_id, exchange.fetch_currencies)
+                    networks = self._normalize_currency_networks(currencies or {})
+                except Exception as e:
+                    self.logger.warning(f"fetch_currencies falló en {exchange_id}: {e}")
+
+            # fetch_deposit_withdraw_fees suele ser más preciso en el monto de la fee
+            if exchange.has.get('fetchDepositWithdrawFees'):
+                try:
+                    raw_network_fees = await self.exchange_manager._ccxt_call(exchange_id, exchange.fetch_deposit_withdraw_fees)
+                    self._merge_withdraw_fees(networks, raw_network_fees or {})
+                except Exception as e:
+                    self.logger.warning(f"fetch_deposit_withdraw_fees falló en {exchange_id}: {e}")
+
+            if not trading_fees and not networks:
+                return False
+
+            self._apply_exchange(exchange_id, trading_fees, networks, time.time())
+            self.logger.debug(
+                f"Tarifas cargadas para {exchange_id}: {len(trading_fees)} símbolos, {len(networks)} monedas"
+            )
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Error cargando tarifas de {exchange_id}: {e}")
+            return False
+
+    async def _refresh_loop(self):
+        """Refresca el catálogo según FEE_CATALOGUE_REFRESH_INTERVAL."""
+        while True:
+            try:
+                now = time.time()
+                stale = [
+                    exchange_id for exchange_id in SUPPORTED_EXCHANGES
+                    if now - self.loaded_at.get(exchange_id, 0) >= FEE_CATALOGUE_REFRESH_INTERVAL
+                ]
+
+                if stale:
+                    await self.refresh_all(stale)
+
+                # Dormir hasta que expire la entrada más antigua
+                oldest = min((self.loaded_at.get(ex, 0) for ex in SUPPORTED_EXCHANGES), default=now)
+                wait = FEE_CATALOGUE_REFRESH_INTERVAL - (time.time() - oldest)
+                await asyncio.sleep(max(wait, 60))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error en refresco del catálogo de tarifas: {e}")
+                await asyncio.sleep(60)
+
+    # Normalización
+
+    def _normalize_trading_fees(self, raw_fees: Dict) -> Dict[str, Dict]:
+        """Reduce la respuesta de CCXT (o los markets) a maker/taker por símbolo."""
+        trading_fees = {}
+
+        for symbol, info in raw_fees.items():
+            if not isinstance(info, dict):
+                continue
+            if info.get('taker') is None and info.get('maker') is None:
+                continue
+
+            trading_fees[symbol] = {
+                'maker': safe_float(info.get('maker')),
+                'taker': safe_float(info.get('taker'))
+            }
+
+        return trading_fees
+
+    def _normalize_currency_networks(self, currencies: Dict) -> Dict[str, Dict[str, Dict]]:
+        """Convierte fetch_currencies en currency -> network -> info."""
+        networks = {}
+
+        for currency, currency_info in currencies.items():
+            if not isinstance(currency_info, dict):
+                continue
+
+            for network_id, network_info in (currency_info.get('networks') or {}).items():
+                if not isinstance(network_info, dict):
+                    continue
+
+                network = network_info.get('network') or network_id
+                networks.setdefault(currency, {})[network] = {
+                    'network': network,
+                    'fee': safe_float(network_info.get('fee'), float('inf')),
+                    # CCXT deja None cuando el exchange no informa el estado
+                    'active': network_info.get('active') is not False,
+                    'withdraw': network_info.get('withdraw') is not False,
+                    'deposit': network_info.get('deposit') is not False
+                }
+
+        return networks
+
+    def _merge_withdraw_fees(self, networks: Dict[str, Dict[str, Dict]], raw_network_fees: Dict):
+        """Combina fetch_deposit_withdraw_fees sobre las redes ya normalizadas."""
+        for currency, fee_info in raw_network_fees.items():
+            if not isinstance(fee_info, dict):
+                continue
+
+            for network, network_fee in (fee_info.get('networks') or {}).items():
+                fee = safe_float((network_fee.get('withdraw') or {}).get('fee'), None)
+                if fee is None:
+                    continue
+
+                entry = networks.setdefault(currency, {}).setdefault(network, {
+                    'network': network,
+                    'active': True,
+                    'withdraw': True,
+                    'deposit': True
+                })
+                entry['fee'] = fee
+
+    def _apply_exchange(self, exchange_id: str, trading_fees: Dict, networks: Dict, loaded_at: float):
+        """Reemplaza las entradas de un exchange en los índices en memoria."""
+        for key in [key for key in self.network_index if key[0] == exchange_id]:
+            del self.network_index[key]
+        for key in [key for key in self.currency_networks if key[0] == exchange_id]:
+            del self.currency_networks[key]
+
+        for currency, currency_networks in networks.items():
+            for network, info in currency_networks.items():
+                self.network_index[(exchange_id, currency, network)] = info
+            self.currency_networks[(exchange_id, currency)] = list(currency_networks.keys())
+
+        self.trading_fees[exchange_id] = trading_fees
+        self.loaded_at[exchange_id] = loaded_at
+
+    # Consultas
+
+    def has_exchange(self, exchange_id: str) -> bool:
+        """Indica si el catálogo tiene datos para un exchange."""
+        return exchange_id in self.loaded_at
+
+    def get_trading_fees(self, exchange_id: str, symbol: str = None) -> Optional[Dict]:
+        """Retorna tarifas de trading con la misma forma que fetch_trading_fees."""
+        fees = self.trading_fees.get(exchange_id)
+        if fees is None:
+            return None
+
+        if symbol:
+            symbol_fees = fees.get(symbol)
+            return {symbol: symbol_fees} if symbol_fees else None
+
+        return fees
+
+    def get_networks(self, exchange_id: str, currency: str) -> List[Dict]:
+        """Retorna las redes conocidas de una moneda en un exchange."""
+        return [
+            self.network_index[(exchange_id, currency, network)]
+            for network in self.currency_networks.get((exchange_id, currency), [])
+        ]
+
+    def get_network_fee(self, exchange_id: str, currency: str, network: str) -> Optional[Dict]:
+        """Lookup O(1) de la información de una red."""
+        return self.network_index.get((exchange_id, currency, network))
+
+    def get_withdrawal_fees(self, exchange_id: str, currency: str = None) -> Optional[Dict]:
+        """Retorna las redes de retiro como {currency: {'networks': [...]}}."""
+        if not self.has_exchange(exchange_id):
+            return None
+
+        if currency:
+            networks = self.get_networks(exchange_id, currency)
+            return {currency: {'networks': networks}} if networks else None
+
+        return {
+            curr: {'networks': self.get_networks(exchange_id, curr)}
+            for ex, curr in self.currency_networks if ex == exchange_id
+        }
+
+    def find_cheapest_network(
+        self,
+        exchange_id: str,
+        currency: str,
+        preferred_networks: List[str] = None
+    ) -> Optional[Dict]:
+        """Encuentra la red de retiro más barata para una moneda en un exchange."""
+        return find_cheapest_network(self.get_networks(exchange_id, currency), preferred_networks)
+
+    # Snapshot en disco
+
+    async def save_snapshot(self) -> bool:
+        """Persiste el catálogo para arranques en caliente.
+
+        Se serializa en el loop (el catálogo no cambia mientras tanto) y el archivo se escribe desde un executor.
+        """
+        exchanges = {}
+        for exchange_id, loaded_at in self.loaded_at.items():
+            networks = {}
+            for (ex, currency), network_names in self.currency_networks.items():
+                if ex == exchange_id:
+                    networks[currency] = {
+                        network: self.network_index[(ex, currency, network)] for network in network_names
+                    }
+
+            exchanges[exchange_id] = {
+                'loaded_at': loaded_at,
+                'trading_fees': self.trading_fees.get(exchange_id, {}),
+                'networks': networks
+            }
+
+        try:
+            payload = json.dumps({
+                'version': FEE_CATALOGUE_SNAPSHOT_VERSION,
+                'saved_at': get_current_timestamp(),
+                'exchanges': exchanges
+            }, indent=2, default=str).encode('utf-8')
+
+            await asyncio.get_running_loop().run_in_executor(
+                None, write_file_atomic, self.snapshot_path, payload, False
+            )
+            return True
+        except Exception as e:
+            self.logger.error(f"Error guardando snapshot de tarifas: {e}")
+            return False
+
+    def load_snapshot(self) -> int:
+        """Carga el snapshot en disco; retorna el número de exchanges restaurados."""
+        snapshot = load_json_file(self.snapshot_path)
+        if not snapshot:
+            return 0
+
+        if snapshot.get('version') != FEE_CATALOGUE_SNAPSHOT_VERSION:
+            self.logger.warning(f"Snapshot de tarifas con versión incompatible: {snapshot.get('version')}")
+            return 0
+
+        for exchange_id, data in (snapshot.get('exchanges') or {}).items():
+            self._apply_exchange(
+                exchange_id,
+                data.get('trading_fees', {}),
+                data.get('networks', {}),
+                safe_float(data.get('loaded_at'))
+            )
+
+        self.logger.info(f"Catálogo de tarifas restaurado desde snapshot: {len(self.loaded_at)} exchanges")
+        return len(self.loaded_at)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna un resumen del catálogo."""
+        return {
+            'exchanges': len(self.loaded_at),
+            'symbols_with_fees': sum(len(fees) for fees in self.trading_fees.values()),
+            'networks_indexed': len(self.network_index),
+            'loaded_at': dict(self.loaded_at)
+        }
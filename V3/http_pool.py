@@ -0,0 +1,153 @@
+# Simos/V3/http_pool.py
+
+import logging
+import time
+from types import SimpleNamespace
+from typing import Dict, Any, Optional
+import aiohttp
+from config_v3 import HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_KEEPALIVE_TIMEOUT, HTTP_DNS_CACHE_TTL
+from metrics import registry
+
+HTTP_REQUESTS = registry.counter('v3_http_requests_total', 'Requests HTTP por host', ['host'])
+HTTP_CONNECTIONS = registry.counter(
+    'v3_http_connections_total', 'Conexiones HTTP nuevas o reutilizadas por host', ['host', 'kind']
+)
+HTTP_CONNECT_LATENCY = registry.histogram(
+    'v3_http_connect_seconds', 'Tiempo de abrir una conexión nueva (DNS + TCP + TLS)', ['host']
+)
+HTTP_QUEUED = registry.counter('v3_http_pool_queued_total', 'Requests que esperaron conexión libre', ['host'])
+
+class HttpPool:
+    """Conector aiohttp compartido por todas las sesiones HTTP del proceso.
+
+    Un solo TCPConnector con límite por host, keep-alive y cache DNS: las instancias
+    CCXT y las llamadas REST a Sebo reutilizan las mismas conexiones ya abiertas en
+    vez de pagar DNS + TCP + TLS en cada sesión. aiohttp ya activa TCP_NODELAY en
+    cada conexión. Las estadísticas de reutilización salen de un TraceConfig.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('V3.HttpPool')
+        self.connector: Optional[aiohttp.TCPConnector] = None
+        self.sessions: Dict[str, aiohttp.ClientSession] = {}
+        self.host_stats: Dict[str, Dict[str, Any]] = {}
+        self.trace_config = self._build_trace_config()
+
+    def _get_connector(self) -> aiohttp.TCPConnector:
+        # Se crea perezosamente: el conector necesita el event loop en ejecución
+        if self.connector is None or self.connector.closed:
+            self.connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                use_dns_cache=True,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                enable_cleanup_closed=True
+            )
+        return self.connector
+
+    def get_session(self, name: str = 'default', **session_kwargs) -> aiohttp.ClientSession:
+        """Sesión con nombre sobre el conector compartido (cerrarla no cierra el pool)."""
+        session = self.sessions.get(name)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=self._get_connector(),
+                connector_owner=False,
+                trace_configs=[self.trace_config],
+                **session_kwargs
+            )
+            self.sessions[name] = session
+        return session
+
+    async def close(self):
+        """Cierra todas las sesiones y el conector compartido."""
+        for session in self.sessions.values():
+            if not session.closed:
+                await session.close()
+        self.sessions.clear()
+
+        if self.connector and not self.connector.closed:
+            await self.connector.close()
+        self.connector = None
+
+    # Estadísticas de reutilización (TraceConfig)
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=self._trace_context)
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_connection_queued_start.append(self._on_connection_queued)
+        trace_config.on_connection_create_start.append(self._on_connection_create_start)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+        trace_config.on_dns_cache_hit.append(self._on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(self._on_dns_cache_miss)
+        return trace_config
+
+    @staticmethod
+    def _trace_context(trace_request_ctx=None):
+        return SimpleNamespace(host='unknown', connect_start=0.0, trace_request_ctx=trace_request_ctx)
+
+    def _host(self, host: str) -> Dict[str, Any]:
+        stats = self.host_stats.get(host)
+        if stats is None:
+            stats = self.host_stats[host] = {
+                'requests': 0,
+                'connections_created': 0,
+                'connections_reused': 0,
+                'queued': 0,
+                'connect_ms_total': 0.0,
+                'dns_cache_hits': 0,
+                'dns_cache_misses': 0
+            }
+        return stats
+
+    async def _on_request_start(self, session, context, params):
+        context.host = params.url.host or 'unknown'
+        self._host(context.host)['requests'] += 1
+        HTTP_REQUESTS.inc(host=context.host)
+
+    async def _on_connection_queued(self, session, context, params):
+        self._host(context.host)['queued'] += 1
+        HTTP_QUEUED.inc(host=context.host)
+
+    async def _on_connection_create_start(self, session, context, params):
+        context.connect_start = time.perf_counter()
+
+    async def _on_connection_create_end(self, session, context, params):
+        connect_s = time.perf_counter() - context.connect_start
+        stats = self._host(context.host)
+        stats['connections_created'] += 1
+        stats['connect_ms_total'] += connect_s * 1000
+        HTTP_CONNECTIONS.inc(host=context.host, kind='created')
+        HTTP_CONNECT_LATENCY.observe(connect_s, host=context.host)
+
+    async def _on_connection_reuse(self, session, context, params):
+        self._host(context.host)['connections_reused'] += 1
+        HTTP_CONNECTIONS.inc(host=context.host, kind='reused')
+
+    async def _on_dns_cache_hit(self, session, context, params):
+        self._host(params.host)['dns_cache_hits'] += 1
+
+    async def _on_dns_cache_miss(self, session, context, params):
+        self._host(params.host)['dns_cache_misses'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Conexiones creadas vs. reutilizadas por host."""
+        hosts = {}
+        for host, stats in self.host_stats.items():
+            created = stats['connections_created']
+            reused = stats['connections_reused']
+            hosts[host] = {
+                **stats,
+                'reuse_ratio': reused / (created + reused) if created + reused else 0.0,
+                'avg_connect_ms': stats['connect_ms_total'] / created if created else 0.0
+            }
+        return {
+            'sessions': len(self.sessions),
+            'limit': HTTP_POOL_LIMIT,
+            'limit_per_host': HTTP_POOL_LIMIT_PER_HOST,
+            'hosts': hosts
+        }
+
+# Pool del proceso (compartido por ExchangeManager y SeboConnector)
+http_pool = HttpPool()
@@ -0,0 +1,221 @@
+# Simos/V3/inference_service.py
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from config_v3 import (
+    INFERENCE_WORKERS, INFERENCE_BATCH_WINDOW_MS, INFERENCE_MAX_BATCH_SIZE,
+    INFERENCE_MAX_PENDING
+)
+from metrics import registry, LatencyHistogram
+
+INFERENCE_LATENCY = registry.histogram(
+    'v3_inference_latency_seconds', 'Latencia del servicio de inferencia por fase', ['phase']
+)
+INFERENCE_REJECTED = registry.counter(
+    'v3_inference_rejected_total', 'Solicitudes de inferencia rechazadas por backpressure'
+)
+INFERENCE_BATCH_SIZE = registry.histogram(
+    'v3_inference_batch_size', 'Solicitudes por micro-batch', buckets=[1, 2, 4, 8, 16, 32, 64]
+)
+
+# (datos de la operación, future del solicitante, instante de encolado)
+InferenceRequest = Tuple[Dict, asyncio.Future, float]
+
+class InferenceService:
+    """Ejecuta las predicciones del modelo en un pool de hilos con micro-batching y backpressure."""
+
+    def __init__(
+        self,
+        ai_model,
+        workers: int = None,
+        batch_window_ms: float = None,
+        max_batch_size: int = None,
+        max_pending: int = None
+    ):
+        self.logger = logging.getLogger('V3.InferenceService')
+        self.ai_model = ai_model
+        self.workers = workers or INFERENCE_WORKERS
+        self.batch_window = (batch_window_ms if batch_window_ms is not None else INFERENCE_BATCH_WINDOW_MS) / 1000
+        self.max_batch_size = max_batch_size or INFERENCE_MAX_BATCH_SIZE
+        self.max_pending = max_pending or INFERENCE_MAX_PENDING
+
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.is_running = False
+        self._batcher_task: Optional[asyncio.Task] = None
+        self._worker_slots: Optional[asyncio.Semaphore] = None
+        self._inflight_batches: set = set()
+
+        self.stats = {
+            'requests': 0,
+            'batches': 0,
+            'rejected': 0,
+            'errors': 0
+        }
+        self.histograms = {
+            'queue_wait_ms': LatencyHistogram(),
+            'inference_ms': LatencyHistogram(),
+            'total_ms': LatencyHistogram()
+        }
+        self.batch_sizes = LatencyHistogram([1, 2, 4, 8, 16, 32, 64])
+
+    async def start(self):
+        """Inicia el pool de inferencia y el agrupador de solicitudes."""
+        if self.is_running:
+            return
+
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='V3-inference')
+        self.queue = asyncio.Queue(maxsize=self.max_pending)
+        self._worker_slots = asyncio.Semaphore(self.workers)
+        self._batcher_task = asyncio.create_task(self._batch_loop())
+        self.is_running = True
+
+        self.logger.info(
+            f"Servicio de inferencia iniciado ({self.workers} hilos, ventana {self.batch_window * 1000:.1f} ms, "
+            f"batch máx {self.max_batch_size})"
+        )
+
+    async def stop(self):
+        """Detiene el servicio; las solicitudes pendientes se resuelven como no ejecutables."""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+
+        if self._batcher_task:
+            self._batcher_task.cancel()
+            await asyncio.gather(self._batcher_task, return_exceptions=True)
+            self._batcher_task = None
+
+        # Esperar batches ya enviados al pool
+        if self._inflight_batches:
+            await asyncio.gather(*self._inflight_batches, return_exceptions=True)
+
+        while not self.queue.empty():
+            _, future, _ = self.queue.get_nowait()
+            if not future.done():
+                future.set_result(self._rejected_decision('Servicio de inferencia detenido'))
+
+        self.executor.shutdown(wait=False)
+        self.executor = None
+        self.logger.info("Servicio de inferencia detenido")
+
+    async def predict(self, operation_data: Dict) -> Dict:
+        """Encola una predicción y espera su resultado sin bloquear el event loop."""
+        loop = asyncio.get_running_loop()
+
+        if not self.is_running:
+            return await loop.run_in_executor(None, self.ai_model.predict, operation_data)
+
+        future = loop.create_future()
+        try:
+            self.queue.put_nowait((operation_data, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            # Backpressure: mejor descartar la oportunidad que acumular decisiones viejas
+            self.stats['rejected'] += 1
+            INFERENCE_REJECTED.inc()
+            self.logger.warning(f"Cola de inferencia llena ({self.max_pending}), oportunidad rechazada")
+            return self._rejected_decision('Servicio de inferencia saturado')
+
+        self.stats['requests'] += 1
+        return await future
+
+    async def _batch_loop(self):
+        """Agrupa las solicitudes que llegan dentro de la ventana y las envía al pool."""
+        loop = asyncio.get_running_loop()
+        batch: List[InferenceRequest] = []
+
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                deadline = loop.time() + self.batch_window
+
+                while len(batch) < self.max_batch_size:
+                    if not self.queue.empty():
+                        batch.append(self.queue.get_nowait())
+                        continue
+
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+                # Si todos los hilos están ocupados, las nuevas solicitudes siguen acumulándose en la cola
+                await self._worker_slots.acquire()
+                task = asyncio.create_task(self._run_batch(batch))
+                batch = []  # Desde aquí los futures los resuelve _run_batch
+                self._inflight_batches.add(task)
+                task.add_done_callback(self._inflight_batches.discard)
+
+        except asyncio.CancelledError:
+            # stop() solo vacía la cola: el batch ya sacado de ella se resuelve aquí
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_result(self._rejected_decision('Servicio de inferencia detenido'))
+            raise
+
+    async def _run_batch(self, batch: List[InferenceRequest]):
+        """Ejecuta un micro-batch en el pool y resuelve los futures."""
+        try:
+            dispatched_at = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                self.histograms['queue_wait_ms'].observe((dispatched_at - enqueued_at) * 1000)
+                INFERENCE_LATENCY.observe(dispatched_at - enqueued_at, phase='queue_wait')
+
+            rows = [operation_data for operation_data, _, _ in batch]
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(self.executor, self._predict_rows, rows)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.error(f"Error en batch de inferencia: {e}")
+                results = [self._rejected_decision(f'Error en inferencia: {e}')] * len(batch)
+
+            finished_at = time.perf_counter()
+            self.histograms['inference_ms'].observe((finished_at - dispatched_at) * 1000)
+            self.batch_sizes.observe(len(batch))
+            INFERENCE_LATENCY.observe(finished_at - dispatched_at, phase='inference')
+            INFERENCE_BATCH_SIZE.observe(len(batch))
+            self.stats['batches'] += 1
+
+            for (_, future, enqueued_at), result in zip(batch, results):
+                self.histograms['total_ms'].observe((finished_at - enqueued_at) * 1000)
+                INFERENCE_LATENCY.observe(finished_at - enqueued_at, phase='total')
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._worker_slots.release()
+
+    def _predict_rows(self, rows: List[Dict]) -> List[Dict]:
+        """Corre en el pool: una fila usa predict, varias usan la ruta vectorizada."""
+        if len(rows) == 1:
+            return [self.ai_model.predict(rows[0])]
+        return self.ai_model.predict_batch(rows).to_dict('records')
+
+    def _rejected_decision(self, reason: str) -> Dict:
+        """Decisión segura cuando no se pudo evaluar la oportunidad."""
+        return {
+            'should_execute': False,
+            'confidence': 0.0,
+            'predicted_profit_usdt': 0.0,
+            'success_probability': 0.0,
+            'high_risk_probability': 1.0,
+            'reason': reason,
+            'model_version': 'unavailable'
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores, profundidad de cola e histogramas de latencia."""
+        return {
+            **self.stats,
+            'is_running': self.is_running,
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'inflight_batches': len(self._inflight_batches),
+            'avg_batch_size': self.batch_sizes.sum_ms / self.batch_sizes.count if self.batch_sizes.count else 0.0,
+            'latency': {name: histogram.get_stats() for name, histogram in self.histograms.items()}
+        }
@@ -0,0 +1,336 @@
+# Simos/V3/log_writer.py
+
+import asyncio
+import csv
+import logging
+import os
+import time
+from typing import Dict, Any, List, Optional, Callable
+from config_v3 import (
+    LOG_WRITER_FLUSH_ROWS, LOG_WRITER_FLUSH_INTERVAL, LOG_WRITER_MAX_QUEUE,
+    LOG_WRITER_FSYNC_POLICY, LOG_WRITER_FSYNC_INTERVAL,
+    LOG_WRITER_ROTATE_MAX_BYTES, LOG_WRITER_ROTATE_BACKUPS
+)
+
+FSYNC_POLICIES = ("none", "batch", "interval")
+
+_STOP = object()  # Marcador de cierre encolado por stop()
+
+class BufferedCSVWriter:
+    """Escritor de CSV en background: encola filas y las escribe por lotes fuera del event loop."""
+
+    def __init__(
+        self,
+        path: str,
+        flush_rows: int = None,
+        flush_interval: float = None,
+        max_queue: int = None,
+        fsync_policy: str = None,
+        fsync_interval: float = None,
+        rotate_max_bytes: int = None,
+        rotate_backups: int = None,
+        batch_sinks: List[Callable[[List[Dict]], None]] = None
+    ):
+        self.logger = logging.getLogger('V3.BufferedCSVWriter')
+        self.path = path
+        self.flush_rows = flush_rows or LOG_WRITER_FLUSH_ROWS
+        self.flush_interval = flush_interval if flush_interval is not None else LOG_WRITER_FLUSH_INTERVAL
+        self.max_queue = max_queue or LOG_WRITER_MAX_QUEUE
+        self.fsync_policy = fsync_policy or LOG_WRITER_FSYNC_POLICY
+        self.fsync_interval = fsync_interval if fsync_interval is not None else LOG_WRITER_FSYNC_INTERVAL
+        self.rotate_max_bytes = rotate_max_bytes if rotate_max_bytes is not None else LOG_WRITER_ROTATE_MAX_BYTES
+        self.rotate_backups = rotate_backups if rotate_backups is not None else LOG_WRITER_ROTATE_BACKUPS
+        # Destinos adicionales que reciben cada lote en el hilo de escritura (p.ej. OperationStore)
+        self.batch_sinks = batch_sinks or []
+
+        if self.fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Política de fsync no soportada: {self.fsync_policy}")
+
+        self.queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._file = None
+        self._fieldnames: Optional[List[str]] = None  # Header del archivo abierto (None si está vacío)
+        self._last_fsync = 0.0
+
+        self.stats = {
+            'rows_enqueued': 0,
+            'rows_written': 0,
+            'rows_dropped': 0,
+            'flushes': 0,
+            'fsyncs': 0,
+            'rotations': 0,
+            'header_rotations': 0,
+            'errors': 0
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._writer_task is not None and not self._writer_task.done()
+
+    def start(self):
+        """Inicia la tarea de escritura en el event loop actual."""
+        if self.is_running:
+            return
+
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._writer_task = asyncio.create_task(self._writer_loop())
+
+    def write_row(self, row: Dict[str, Any]) -> bool:
+        """Encola una fila sin bloquear; retorna False si se descartó por cola llena."""
+        if not self.is_running:
+            self.start()
+
+        try:
+            self.queue.put_nowait(row)
+            self.stats['rows_enqueued'] += 1
+            return True
+        except asyncio.QueueFull:
+            self.stats['rows_dropped'] += 1
+            if self.stats['rows_dropped'] % 1000 == 1:
+                self.logger.warning(f"Cola de logs llena, filas descartadas: {self.stats['rows_dropped']}")
+            return False
+
+    async def flush(self):
+        """Espera a que todo lo encolado hasta ahora esté escrito (p.ej. antes de leer el archivo)."""
+        if not self.is_running:
+            return
+
+        done = asyncio.get_running_loop().create_future()
+        await self.queue.put(done)
+        await done
+
+    async def stop(self):
+        """Vacía la cola, escribe lo pendiente y cierra el archivo."""
+        if self.is_running:
+            await self.queue.put(_STOP)
+            await self._writer_task
+        self._writer_task = None
+
+        if self._file:
+            await asyncio.get_running_loop().run_in_executor(None, self._close_file)
+
+    def get_log_files(self) -> List[str]:
+        """Retorna los archivos rotados (del más viejo al más nuevo) seguidos del actual."""
+        files = [f"{self.path}.{index}" for index in range(self.rotate_backups, 0, -1)]
+        files.append(self.path)
+        return [path for path in files if os.path.exists(path)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores del escritor."""
+        return {
+            **self.stats,
+            'path': self.path,
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'fsync_policy': self.fsync_policy
+        }
+
+    # Tarea de escritura
+
+    async def _writer_loop(self):
+        """Acumula filas hasta flush_rows o flush_interval y las escribe por lote."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            item = await self.queue.get()
+            deadline = loop.time() + self.flush_interval
+            rows, waiters, stopping = [], [], False
+
+            while True:
+                # Los marcadores de flush/stop respetan el orden de llegada de las filas
+                if item is _STOP:
+                    stopping = True
+                    break
+                if isinstance(item, asyncio.Future):
+                    waiters.append(item)
+                    break
+
+                rows.append(item)
+                if len(rows) >= self.flush_rows:
+                    break
+
+                if not self.queue.empty():
+                    item = self.queue.get_nowait()
+                    continue
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            if rows:
+                await self._flush_rows(rows)
+
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(True)
+
+            if stopping:
+                return
+
+    async def _flush_rows(self, rows: List[Dict]):
+        """Escribe un lote en un hilo del executor."""
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_rows, rows)
+            self.stats['rows_written'] += len(rows)
+            self.stats['flushes'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.logger.error(f"Error escribiendo {len(rows)} filas en {self.path}: {e}")
+
+        for sink in self.batch_sinks:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, sink, rows)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.error(f"Error enviando {len(rows)} filas a {getattr(sink, '__qualname__', sink)}: {e}")
+
+    # I/O bloqueante (se ejecuta en el executor)
+
+    def _open_file(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', newline='', encoding='utf-8')
+        self._fieldnames = self._read_header() if self._file.tell() > 0 else None
+
+    def _read_header(self) -> Optional[List[str]]:
+        """Lee la primera fila de un archivo existente."""
+        with open(self.path, 'r', newline='', encoding='utf-8') as existing:
+            return next(csv.reader(existing), None)
+
+    def _close_file(self):
+        if self._file:
+            self._file.flush()
+            if self.fsync_policy != "none":
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        """Rota path -> path.1 -> ... -> path.N, descartando el más viejo."""
+        self._close_file()
+
+        for index in range(self.rotate_backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+
+        if self.rotate_backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+        self.stats['rotations'] += 1
+        self._open_file()
+
+    def _write_rows(self, rows: List[Dict]):
+        if self._file is None:
+            self._open_file()
+
+        fieldnames = list(rows[0].keys())
+
+        if self.rotate_max_bytes and self._file.tell() >= self.rotate_max_bytes:
+            self._rotate()
+        elif self._fieldnames is not None and self._fieldnames != fieldnames:
+            # Columnas distintas bajo el header viejo romperían la lectura: se empieza un archivo nuevo
+            self.logger.warning(f"Header de {self.path} no coincide con las columnas actuales, rotando archivo")
+            self.stats['header_rotations'] += 1
+            self._rotate()
+
+        writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction='ignore')
+
+        # Escribir headers si es un archivo nuevo
+        if self._file.tell() == 0:
+            writer.writeheader()
+            self._fieldnames = fieldnames
+
+        writer.writerows(rows)
+        self._file.flush()
+
+        now = time.monotonic()
+        if self.fsync_policy == "batch" or (
+            self.fsync_policy == "interval" and now - self._last_fsync >= self.fsync_interval
+        ):
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+            self.stats['fsyncs'] += 1
+
+class BufferedLineWriter:
+    """Append de líneas de texto (JSON lines) sin tocar el disco en el event loop.
+
+    write_line solo agrega al buffer; una tarea escribe lo acumulado desde un executor
+    cada flush_interval segundos. Para grabaciones y capturas, no para el log de operaciones.
+    """
+
+    def __init__(self, path: str, flush_interval: float = None, max_buffered: int = None):
+        self.logger = logging.getLogger('V3.BufferedLineWriter')
+        self.path = path
+        self.flush_interval = flush_interval if flush_interval is not None else LOG_WRITER_FLUSH_INTERVAL
+        self.max_buffered = max_buffered or LOG_WRITER_MAX_QUEUE
+
+        self._buffer: List[str] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        self.stats = {
+            'lines_written': 0,
+            'lines_dropped': 0,
+            'bytes_written': 0,
+            'flushes': 0,
+            'errors': 0
+        }
+
+    def write_line(self, line: str) -> bool:
+        """Encola una línea (sin salto final); retorna False si se descartó por buffer lleno."""
+        if len(self._buffer) >= self.max_buffered:
+            self.stats['lines_dropped'] += 1
+            return False
+
+        self._buffer.append(line)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        return True
+
+    async def flush(self):
+        """Escribe el buffer al archivo desde un executor."""
+        async with self._lock:
+            if not self._buffer:
+                return
+
+            lines, self._buffer = self._buffer, []
+            try:
+                written = await asyncio.get_running_loop().run_in_executor(None, self._append_lines, lines)
+                self.stats['lines_written'] += len(lines)
+                self.stats['bytes_written'] += written
+                self.stats['flushes'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.error(f"Error escribiendo {len(lines)} líneas en {self.path}: {e}")
+
+    async def stop(self):
+        """Detiene la tarea de flush y escribe lo pendiente."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'path': self.path, 'buffered': len(self._buffer)}
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _append_lines(self, lines: List[str]) -> int:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = '\n'.join(lines) + '\n'
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(data)
+        return len(data.encode('utf-8'))
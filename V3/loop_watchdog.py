@@ -0,0 +1,200 @@
+# Simos/V3/loop_watchdog.py
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Any, Optional
+from config_v3 import (
+    LOOP_WATCHDOG_INTERVAL, LOOP_WATCHDOG_THRESHOLD_MS, LOOP_WATCHDOG_MAX_OFFENDERS,
+    LOOP_WATCHDOG_STACK_DEPTH, TRACING_LATENCY_BUCKETS_MS
+)
+from metrics import registry, LatencyHistogram, LOOP_LAG, LOOP_LAG_LAST
+
+LOOP_BLOCKED = registry.counter('v3_loop_blocked_total', 'Bloqueos del event loop por ubicación', ['location'])
+LOOP_BLOCKED_SECONDS = registry.counter(
+    'v3_loop_blocked_seconds_total', 'Tiempo bloqueado del event loop por ubicación', ['location']
+)
+
+_V3_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class LoopWatchdog:
+    """Mide el lag del event loop y muestrea la pila de lo que lo bloquea.
+
+    Un latido en el loop actualiza una marca de tiempo cada LOOP_WATCHDOG_INTERVAL;
+    un hilo aparte revisa esa marca y, si lleva más de LOOP_WATCHDOG_THRESHOLD_MS
+    sin actualizarse, toma la pila del hilo del loop (sys._current_frames). Al
+    volver el latido se conoce la duración real del bloqueo y se acumula por
+    ubicación de código (la función de V3 más interna de la pila).
+    """
+
+    def __init__(self, interval: float = None, threshold_ms: float = None):
+        self.logger = logging.getLogger('V3.LoopWatchdog')
+        self.interval = interval or LOOP_WATCHDOG_INTERVAL
+        self.threshold_ms = threshold_ms or LOOP_WATCHDOG_THRESHOLD_MS
+
+        self.lag_histogram = LatencyHistogram(TRACING_LATENCY_BUCKETS_MS)
+        self.offenders: Dict[str, Dict[str, Any]] = {}
+
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._beat_seq = 0
+        self._pending_sample: Optional[Dict[str, Any]] = None
+        self._sample_lock = threading.Lock()
+
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._monitor_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.is_running = False
+
+        self.stats = {
+            'blocks_detected': 0,
+            'blocked_ms_total': 0.0,
+            'max_lag_ms': 0.0
+        }
+
+    async def start(self):
+        """Inicia el latido en el loop actual y el hilo monitor."""
+        if self.is_running:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop_event.clear()
+
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._monitor_thread = threading.Thread(target=self._monitor, name='v3-loop-watchdog', daemon=True)
+        self._monitor_thread.start()
+
+        self.is_running = True
+        self.logger.info(
+            f"Watchdog del event loop activo (intervalo {self.interval * 1000:.0f} ms, "
+            f"umbral {self.threshold_ms:.0f} ms)"
+        )
+
+    async def stop(self):
+        """Detiene el latido y el hilo monitor."""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        self._stop_event.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+
+        if self._monitor_thread:
+            await asyncio.get_running_loop().run_in_executor(None, self._monitor_thread.join, 1.0)
+            self._monitor_thread = None
+
+        self.logger.info(f"Watchdog detenido: {self.stats['blocks_detected']} bloqueos detectados")
+
+    async def _heartbeat(self):
+        """Duerme un intervalo fijo; el retraso al despertar es el lag del loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+
+            with self._sample_lock:
+                self._last_beat = time.monotonic()
+                self._beat_seq += 1
+                sample, self._pending_sample = self._pending_sample, None
+
+            lag_ms = lag * 1000
+            self.lag_histogram.observe(lag_ms)
+            self.stats['max_lag_ms'] = max(self.stats['max_lag_ms'], lag_ms)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(lag)
+
+            if sample is not None:
+                self._record_block(sample, lag_ms)
+
+    def _monitor(self):
+        """Hilo monitor: muestrea la pila del loop una vez por bloqueo."""
+        sampled_seq = -1
+        while not self._stop_event.wait(self.interval):
+            with self._sample_lock:
+                stalled_ms = (time.monotonic() - self._last_beat) * 1000 - self.interval * 1000
+                beat_seq = self._beat_seq
+
+            if stalled_ms < self.threshold_ms or beat_seq == sampled_seq:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            stack = traceback.extract_stack(frame, limit=LOOP_WATCHDOG_STACK_DEPTH * 4)
+            sample = {
+                'location': self._find_location(stack),
+                'blocking_frame': self._format_frame(stack[-1]) if stack else None,
+                'stack': [self._format_frame(entry) for entry in stack[-LOOP_WATCHDOG_STACK_DEPTH:]]
+            }
+            with self._sample_lock:
+                # Si el latido volvió mientras se muestreaba, el bloqueo ya terminó
+                if self._beat_seq == beat_seq:
+                    self._pending_sample = sample
+                    sampled_seq = beat_seq
+
+    def _record_block(self, sample: Dict[str, Any], blocked_ms: float):
+        location = sample['location']
+        offender = self.offenders.get(location)
+        if offender is None:
+            if len(self.offenders) >= LOOP_WATCHDOG_MAX_OFFENDERS:
+                # Descartar al de menor tiempo acumulado para acotar memoria
+                weakest = min(self.offenders, key=lambda key: self.offenders[key]['total_ms'])
+                del self.offenders[weakest]
+            offender = self.offenders[location] = {
+                'location': location,
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0
+            }
+
+        offender['count'] += 1
+        offender['total_ms'] += blocked_ms
+        if blocked_ms >= offender['max_ms']:
+            offender['max_ms'] = blocked_ms
+            offender['blocking_frame'] = sample['blocking_frame']
+            offender['stack'] = sample['stack']
+
+        self.stats['blocks_detected'] += 1
+        self.stats['blocked_ms_total'] += blocked_ms
+        LOOP_BLOCKED.inc(location=location)
+        LOOP_BLOCKED_SECONDS.inc(blocked_ms / 1000, location=location)
+
+        self.logger.warning(
+            f"Event loop bloqueado {blocked_ms:.0f} ms en {location} "
+            f"(frame más interno: {sample['blocking_frame']})"
+        )
+
+    @staticmethod
+    def _format_frame(entry: traceback.FrameSummary) -> str:
+        filename = entry.filename
+        if filename.startswith(_V3_DIR):
+            filename = os.path.relpath(filename, _V3_DIR)
+        return f"{filename}:{entry.lineno} en {entry.name}"
+
+    def _find_location(self, stack: traceback.StackSummary) -> str:
+        """Frame de V3 más interno (el código nuestro que hizo la llamada bloqueante)."""
+        for entry in reversed(stack):
+            if entry.filename.startswith(_V3_DIR) and entry.filename != __file__:
+                return self._format_frame(entry)
+        return self._format_frame(stack[-1]) if stack else 'desconocido'
+
+    def get_stats(self, top: int = 10) -> Dict[str, Any]:
+        """Lag del loop y principales ubicaciones bloqueantes ordenadas por tiempo total."""
+        offenders = sorted(self.offenders.values(), key=lambda item: item['total_ms'], reverse=True)
+        return {
+            **self.stats,
+            'running': self.is_running,
+            'threshold_ms': self.threshold_ms,
+            'lag': self.lag_histogram.get_stats(),
+            'offenders': [dict(item) for item in offenders[:top]]
+        }
@@ -7,7 +7,10 @@ import sys
 from typing import Dict, Any
 
 # Importar módulos de V3
-from config_v3 import LOG_LEVEL, LOG_FILE_PATH
+from config_v3 import (
+    LOG_LEVEL, LOG_FILE_PATH, SCANNER_ENABLED, SCANNER_SUBMIT_TOP_N, METRICS_ENABLED,
+    LOOP_WATCHDOG_ENABLED
+)
 from utils import setup_logging
 from sebo_connector import SeboConnector
 from ui_broadcaster import UIBroadcaster
@@ -16,11 +19,17 @@ from data_persistence import DataPersistence
 from trading_logic import TradingLogic
 from ai_model import ArbitrageAIModel
 from simulation_engine import SimulationEngine
+from opportunity_scheduler import OpportunityScheduler
+from spread_scanner import SpreadScanner, to_sebo_opportunity
+from tracing import tracer, current_trace
+from metrics import MetricsServer
+from loop_watchdog import LoopWatchdog
+from http_pool import http_pool
 
 class CryptoArbitrageV3:
     """Aplicación principal de arbitraje de criptomonedas V3."""
     
-    def __init__(self):
+    def __init__(self, exchange_manager: ExchangeManager = None):
         # Configurar logging
         self.logger = setup_logging(LOG_LEVEL, LOG_FILE_PATH)
         self.logger.info("Iniciando Crypto Arbitrage V3")
@@ -28,11 +37,17 @@ class CryptoArbitrageV3:
         # Inicializar componentes
         self.sebo_connector = SeboConnector()
         self.ui_broadcaster = UIBroadcaster()
-        self.exchange_manager = ExchangeManager()
+        self.exchange_manager = exchange_manager or ExchangeManager()
         self.data_persistence = DataPersistence()
         self.ai_model = ArbitrageAIModel()
         self.trading_logic = TradingLogic(self.exchange_manager, self.data_persistence, self.ai_model)
         self.simulation_engine = SimulationEngine(self.ai_model, self.data_persistence)
+        self.opportunity_scheduler = OpportunityScheduler(self._process_arbitrage_opportunity)
+        self.spread_scanner = SpreadScanner(
+            self.exchange_manager, results_callback=self._on_scanner_results
+        ) if SCANNER_ENABLED else None
+        self.loop_watchdog = LoopWatchdog() if LOOP_WATCHDOG_ENABLED else None
+        self.metrics_server = MetricsServer(loop_lag_probe=not LOOP_WATCHDOG_ENABLED) if METRICS_ENABLED else None
         
         # Estado de la aplicación
         self.is_running = False
@@ -63,10 +78,23 @@ class CryptoArbitrageV3:
         try:
             self.logger.info("Inicializando componentes...")
             
+            # El watchdog primero, para medir también los bloqueos del arranque
+            if self.loop_watchdog:
+                await self.loop_watchdog.start()
+            
             # Inicializar en orden de dependencias
+            await self.data_persistence.initialize()
             await self.sebo_connector.initialize()
             await self.exchange_manager.initialize()
             await self.trading_logic.initialize()
+            await self.ai_model.start_inference_service()
+            await self.opportunity_scheduler.start()
+            if self.spread_scanner:
+                await self.spread_scanner.start()
+            
+            # Endpoint de métricas (local, no depende de Sebo ni de los exchanges)
+            if self.metrics_server:
+                await self.metrics_server.start()
             
             # Iniciar servidor UI
             await self.ui_broadcaster.start_server()
@@ -136,9 +164,19 @@ class CryptoArbitrageV3:
             # Cerrar componentes en orden inverso
             await self.ui_broadcaster.stop_server()
             await self.sebo_connector.disconnect_from_sebo()
+            if self.spread_scanner:
+                await self.spread_scanner.stop()
+            await self.opportunity_scheduler.stop()
             await self.trading_logic.cleanup()
+            await self.ai_model.stop_inference_service()
+            await self.data_persistence.cleanup()
             await self.exchange_manager.cleanup()
             await self.sebo_connector.cleanup()
+            await http_pool.close()
+            if self.metrics_server:
+                await self.metrics_server.stop()
+            if self.loop_watchdog:
+                await self.loop_watchdog.stop()
             
             self.logger.info("Shutdown completado")
             
@@ -196,10 +234,9 @@ class CryptoArbitrageV3:
     async def _on_spot_arb_data(self, data: Dict):
         """Maneja datos de arbitraje spot recibidos de Sebo."""
         try:
-            # Si el trading está activo, procesar la oportunidad
+            # Si el trading está activo, encolar la oportunidad en la ráfaga actual
             if self.trading_logic.is_trading_active():
-                # Procesar en background para no bloquear
-                asyncio.create_task(self._process_arbitrage_opportunity(data))
+                self.opportunity_scheduler.submit(data)
             
             # Enviar datos a UI para visualización
             await self.ui_broadcaster.broadcast_message({
@@ -211,12 +248,22 @@ class CryptoArbitrageV3:
             self.logger.error(f"Error procesando spot-arb data: {e}")
     
     async def _process_arbitrage_opportunity(self, data: Dict):
-        """Procesa una oportunidad de arbitraje en background."""
+        """Procesa una oportunidad de arbitraje despachada por el scheduler."""
         try:
-            result = await self.trading_logic.process_arbitrage_opportunity(data)
+            result = await self.trading_logic.process_arbitrage_opportunity(data, defer_log=True)
+            operation_log_data = result.pop('operation_log_data', None)
             
             # Enviar resultado a UI
-            await self.ui_broadcaster.broadcast_operation_result(result)
+            with tracer.span('broadcast'):
+                await self.ui_broadcaster.broadcast_operation_result(result)
+            
+            trace = current_trace()
+            tracer.finish(trace, result.get('decision_outcome'))
+            
+            # La fila se registra con la traza cerrada: todas las etapas y el end_to_end_ms final
+            if operation_log_data is not None:
+                operation_log_data['trace'] = trace.to_dict() if trace else None
+                await self.data_persistence.log_operation_to_csv(operation_log_data)
             
         except Exception as e:
             self.logger.error(f"Error procesando oportunidad de arbitraje: {e}")
@@ -233,9 +280,22 @@ class CryptoArbitrageV3:
         except Exception as e:
             self.logger.error(f"Error procesando balance update: {e}")
     
+    async def _on_scanner_results(self, results: list):
+        """Envía los mejores spreads del scanner al scheduler junto con los de Sebo."""
+        try:
+            if self.trading_logic.is_trading_active():
+                for result in results[:SCANNER_SUBMIT_TOP_N]:
+                    self.opportunity_scheduler.submit(to_sebo_opportunity(result))
+                    
+        except Exception as e:
+            self.logger.error(f"Error procesando resultados del scanner: {e}")
+    
     async def _on_top20_data(self, data: list):
         """Maneja datos del top 20 de Sebo."""
         try:
+            # Mantener los streams de order book alineados con el top 20
+            await self.exchange_manager.update_stream_subscriptions(data)
+            
             # Retransmitir a UI
             await self.ui_broadcaster.broadcast_top20_data(data)
             
@@ -282,6 +342,10 @@ class CryptoArbitrageV3:
                 await self._send_trading_stats()
             elif message_type == 'export_data':
                 await self._handle_data_export(payload)
+            elif message_type == 'get_latency_stats':
+                await self._send_latency_stats(payload)
+            elif message_type == 'get_loop_watchdog_stats':
+                await self._send_loop_watchdog_stats(payload)
             else:
                 self.logger.warning(f"Tipo de mensaje UI no reconocido: {message_type}")
                 
@@ -295,8 +359,21 @@ class CryptoArbitrageV3:
                 "sebo_connected": self.sebo_connector.is_connected,
                 "ui_clients": self.ui_broadcaster.get_connected_clients_count(),
                 "active_exchanges": self.exchange_manager.get_active_exchanges(),
+                "request_scheduler": self.exchange_manager.get_request_scheduler_stats(),
+                "circuit_breakers": self.exchange_manager.get_circuit_breaker_stats(),
+                "market_cache": self.exchange_manager.get_market_cache_stats(),
+                "paper_exchange": self.exchange_manager.get_paper_exchange_stats(),
                 "trading_active": self.trading_logic.is_trading_active(),
-                "current_operation": self.trading_logic.get_current_operation()
+                "active_operations": self.trading_logic.get_active_operations(),
+                "concurrency": self.trading_logic.get_concurrency_stats(),
+                "inference": self.ai_model.get_inference_stats(),
+                "scheduler": self.opportunity_scheduler.get_stats(),
+                "scanner": self.spread_scanner.get_stats() if self.spread_scanner else None,
+                "ui_broadcast": self.ui_broadcaster.get_broadcast_stats(),
+                "checkpoints": self.data_persistence.get_checkpoint_stats(),
+                "http_pool": http_pool.get_stats(),
+                "latency": tracer.get_stats(),
+                "loop_watchdog": self.loop_watchdog.get_stats(top=3) if self.loop_watchdog else None
             }
             
             await self.ui_broadcaster.broadcast_message({
@@ -307,6 +384,34 @@ class CryptoArbitrageV3:
         except Exception as e:
             self.logger.error(f"Error enviando estado del sistema: {e}")
     
+    async def _send_latency_stats(self, payload: Dict):
+        """Envía a la UI los histogramas de latencia por etapa y las trazas recientes."""
+        try:
+            await self.ui_broadcaster.broadcast_message({
+                "type": "latency_stats",
+                "payload": tracer.get_stats(
+                    include_buckets=bool(payload.get('include_buckets')),
+                    recent=int(payload.get('recent', 20))
+                )
+            })
+            
+        except Exception as e:
+            self.logger.error(f"Error enviando estadísticas de latencia: {e}")
+    
+    async def _send_loop_watchdog_stats(self, payload: Dict):
+        """Envía a la UI el lag del loop y las ubicaciones que más lo bloquean."""
+        try:
+            if not self.loop_watchdog:
+                return
+            
+            await self.ui_broadcaster.broadcast_message({
+                "type": "loop_watchdog_stats",
+                "payload": self.loop_watchdog.get_stats(top=int(payload.get('top', 10)))
+            })
+            
+        except Exception as e:
+            self.logger.error(f"Error enviando estadísticas del watchdog: {e}")
+    
     async def _send_trading_stats(self):
         """Envía las estadísticas de trading a la UI."""
         try:
@@ -0,0 +1,116 @@
+# Simos/V3/market_snapshot.py
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Any, List, Optional
+from config_v3 import MARKET_SNAPSHOT_DIR, PERSISTENCE_SERIALIZER
+from serialization import get_serializer
+from state_checkpoint import write_file_atomic
+
+MARKET_SNAPSHOT_VERSION = 1
+
+class MarketSnapshotStore:
+    """Snapshots versionados de markets/currencies de CCXT, un archivo por exchange.
+
+    Permiten arrancar sin load_markets: los markets guardados se aplican a la
+    instancia con set_markets y el refresco en background los reemplaza cuando
+    vence MARKET_CACHE_TTL. Lectura y escritura se hacen en un executor (los
+    archivos de los exchanges grandes pesan varios MB).
+    """
+
+    def __init__(self, base_dir: str = None, ccxt_version: str = None):
+        self.logger = logging.getLogger('V3.MarketSnapshotStore')
+        self.base_dir = base_dir or MARKET_SNAPSHOT_DIR
+        self.ccxt_version = ccxt_version
+
+        serializer = get_serializer(PERSISTENCE_SERIALIZER)
+        # Los snapshots son JSON de texto aunque la persistencia use msgpack
+        self.serializer = get_serializer('json') if serializer.binary else serializer
+
+        self.stats = {
+            'loaded': 0,
+            'saved': 0,
+            'rejected': 0,
+            'errors': 0,
+            'last_load_ms': 0.0
+        }
+
+    def _path(self, exchange_id: str) -> str:
+        return os.path.join(self.base_dir, f"{exchange_id}.json")
+
+    def load(self, exchange_id: str) -> Optional[Dict[str, Any]]:
+        """Lee el snapshot de un exchange (bloqueante); None si no existe o no es compatible."""
+        path = self._path(exchange_id)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'rb') as f:
+            snapshot = self.serializer.loads(f.read())
+
+        if snapshot.get('version') != MARKET_SNAPSHOT_VERSION or snapshot.get('exchange') != exchange_id:
+            self.logger.warning(f"Snapshot de markets incompatible para {exchange_id}: versión {snapshot.get('version')}")
+            self.stats['rejected'] += 1
+            return None
+
+        if self.ccxt_version and snapshot.get('ccxt_version') != self.ccxt_version:
+            # La estructura de markets puede cambiar entre versiones de CCXT: se usa, pero se refresca ya
+            self.logger.info(
+                f"Snapshot de {exchange_id} generado con CCXT {snapshot.get('ccxt_version')}; se refrescará"
+            )
+            snapshot['loaded_at'] = 0.0
+
+        return snapshot
+
+    def save(self, exchange_id: str, markets: Dict, currencies: Optional[Dict], loaded_at: float) -> int:
+        """Escribe el snapshot de un exchange de forma atómica (bloqueante)."""
+        snapshot = {
+            'version': MARKET_SNAPSHOT_VERSION,
+            'exchange': exchange_id,
+            'ccxt_version': self.ccxt_version,
+            'loaded_at': loaded_at,
+            'saved_at': time.time(),
+            'markets': markets,
+            'currencies': currencies or {}
+        }
+        return write_file_atomic(
+            self._path(exchange_id), self.serializer.dumps_text(snapshot).encode('utf-8'), fsync=False
+        )
+
+    async def load_all(self, exchange_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Lee en paralelo los snapshots de los exchanges indicados."""
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(None, self.load, exchange_id) for exchange_id in exchange_ids),
+            return_exceptions=True
+        )
+
+        snapshots = {}
+        for exchange_id, result in zip(exchange_ids, results):
+            if isinstance(result, Exception):
+                self.stats['errors'] += 1
+                self.logger.error(f"Error leyendo snapshot de markets de {exchange_id}: {result}")
+            elif result:
+                snapshots[exchange_id] = result
+
+        self.stats['loaded'] += len(snapshots)
+        self.stats['last_load_ms'] = (time.perf_counter() - start) * 1000
+        return snapshots
+
+    async def save_async(self, exchange_id: str, markets: Dict, currencies: Optional[Dict], loaded_at: float) -> bool:
+        """Escribe el snapshot desde un executor."""
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.save, exchange_id, markets, currencies, loaded_at
+            )
+            self.stats['saved'] += 1
+            return True
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.logger.error(f"Error guardando snapshot de markets de {exchange_id}: {e}")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'base_dir': self.base_dir}
@@ -0,0 +1,299 @@
+# Simos/V3/market_stream.py
+
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Any, Optional, List, Tuple, Set
+from config_v3 import STREAM_ORDER_BOOK_DEPTH, STREAM_MAX_BOOK_AGE, STREAM_REPLAY_INTERVAL, REQUEST_TIMEOUT
+from utils import safe_float
+from log_writer import BufferedLineWriter
+
+BookKey = Tuple[str, str]  # (exchange_id, symbol)
+
+class CcxtProFeed:
+    """Feed de order books en vivo vía WebSocket usando ccxt.pro."""
+
+    def __init__(self):
+        self.logger = logging.getLogger('V3.CcxtProFeed')
+        self.instances: Dict[str, Any] = {}
+
+    def _get_instance(self, exchange_id: str):
+        """Obtiene (o crea) la instancia ccxt.pro de un exchange."""
+        if exchange_id not in self.instances:
+            import ccxt.pro as ccxtpro
+            exchange_class = getattr(ccxtpro, exchange_id.lower())
+            self.instances[exchange_id] = exchange_class({
+                'enableRateLimit': True,
+                'timeout': REQUEST_TIMEOUT * 1000
+            })
+        return self.instances[exchange_id]
+
+    async def watch_order_book(self, exchange_id: str, symbol: str, limit: int) -> Dict:
+        """Espera la siguiente actualización del order book."""
+        return await self._get_instance(exchange_id).watch_order_book(symbol, limit)
+
+    async def unwatch_order_book(self, exchange_id: str, symbol: str):
+        """Cancela la suscripción en el exchange si la versión de ccxt lo soporta."""
+        instance = self.instances.get(exchange_id)
+        if instance and hasattr(instance, 'un_watch_order_book'):
+            try:
+                await instance.un_watch_order_book(symbol)
+            except Exception as e:
+                self.logger.debug(f"No se pudo cancelar suscripción {symbol}@{exchange_id}: {e}")
+
+    async def close(self):
+        """Cierra todas las conexiones WebSocket."""
+        for exchange_id, instance in self.instances.items():
+            try:
+                await instance.close()
+            except Exception as e:
+                self.logger.error(f"Error cerrando stream de {exchange_id}: {e}")
+        self.instances.clear()
+
+class ReplayFeed:
+    """Feed local que reproduce order books grabados (JSON lines), usable en tests y offline.
+
+    Sin interval fijo, cada registro se entrega tras el delta entre su timestamp y el
+    del anterior (o STREAM_REPLAY_INTERVAL si no hay timestamps crecientes, p. ej. al volver al inicio).
+    """
+
+    def __init__(self, records: List[Dict] = None, path: str = None, interval: float = None, loop: bool = True):
+        self.logger = logging.getLogger('V3.ReplayFeed')
+        self.interval = interval
+        self.loop = loop
+
+        if path:
+            records = (records or []) + self.load_records(path)
+
+        # Cola de reproducción por (exchange, símbolo)
+        self.records: Dict[BookKey, List[Dict]] = {}
+        for record in records or []:
+            key = (record['exchange_id'], record['symbol'])
+            self.records.setdefault(key, []).append(record)
+        self._positions: Dict[BookKey, int] = {}
+
+    @staticmethod
+    def load_records(path: str) -> List[Dict]:
+        """Lee un archivo de order books grabados, un JSON por línea."""
+        records = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+        return records
+
+    @staticmethod
+    def format_record(exchange_id: str, symbol: str, order_book: Dict, depth: int = None) -> str:
+        """Línea JSON de un order book para el archivo de grabación."""
+        record = {
+            'exchange_id': exchange_id,
+            'symbol': symbol,
+            'bids': [list(level[:2]) for level in order_book.get('bids', [])[:depth]],
+            'asks': [list(level[:2]) for level in order_book.get('asks', [])[:depth]],
+            'timestamp': order_book.get('timestamp')
+        }
+        return json.dumps(record)
+
+    def _replay_delay(self, books: List[Dict], position: int) -> float:
+        """Pausa antes de entregar el registro de la posición dada."""
+        if self.interval:
+            return self.interval
+        if position == 0:
+            return 0.0
+
+        current = books[position % len(books)].get('timestamp')
+        previous = books[(position - 1) % len(books)].get('timestamp')
+        if current and previous and current > previous:
+            return (current - previous) / 1000
+        return STREAM_REPLAY_INTERVAL
+
+    async def watch_order_book(self, exchange_id: str, symbol: str, limit: int) -> Dict:
+        """Retorna el siguiente order book grabado para el par."""
+        key = (exchange_id, symbol)
+        books = self.records.get(key)
+        position = self._positions.get(key, 0)
+
+        if not books or (position >= len(books) and not self.loop):
+            # Sin más datos: bloquear como lo haría un stream sin actualizaciones
+            await asyncio.Event().wait()
+
+        delay = self._replay_delay(books, position)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        record = books[position % len(books)]
+        self._positions[key] = position + 1
+
+        return {
+            'symbol': symbol,
+            'bids': record['bids'][:limit],
+            'asks': record['asks'][:limit],
+            'timestamp': record.get('timestamp')
+        }
+
+    async def unwatch_order_book(self, exchange_id: str, symbol: str):
+        """El feed local no mantiene suscripciones remotas."""
+        self._positions.pop((exchange_id, symbol), None)
+
+    async def close(self):
+        """El feed local no tiene conexiones que cerrar."""
+        return None
+
+class MarketDataStream:
+    """Mantiene en memoria top-of-book y profundidad L2 para los símbolos suscritos."""
+
+    def __init__(self, feed=None, depth: int = None, max_book_age: float = None, record_path: str = None):
+        self.logger = logging.getLogger('V3.MarketDataStream')
+        self.feed = feed or CcxtProFeed()
+        self.depth = depth or STREAM_ORDER_BOOK_DEPTH
+        self.max_book_age = max_book_age or STREAM_MAX_BOOK_AGE
+        self.record_path = record_path
+        # La grabación se acumula en memoria y se escribe desde un executor
+        self.recorder = BufferedLineWriter(record_path) if record_path else None
+
+        self.books: Dict[BookKey, Dict] = {}
+        self._watch_tasks: Dict[BookKey, asyncio.Task] = {}
+
+        self.stats = {
+            'updates': 0,
+            'errors': 0,
+            'subscribes': 0,
+            'unsubscribes': 0
+        }
+
+    # Suscripciones
+
+    async def update_subscriptions(self, top20_data: List[Dict]):
+        """Ajusta las suscripciones a los pares de exchanges del top 20 actual."""
+        desired: Set[BookKey] = set()
+        for item in top20_data or []:
+            symbol = item.get('symbol')
+            if not symbol:
+                continue
+            for exchange_key in ('exchange_min_id', 'exchange_max_id'):
+                exchange_id = item.get(exchange_key)
+                if exchange_id:
+                    desired.add((exchange_id, symbol))
+
+        current = set(self._watch_tasks.keys())
+
+        for exchange_id, symbol in desired - current:
+            self.subscribe(exchange_id, symbol)
+
+        removed = current - desired
+        if removed:
+            await asyncio.gather(*(self.unsubscribe(exchange_id, symbol) for exchange_id, symbol in removed))
+
+        if desired != current:
+            self.logger.info(
+                f"Suscripciones de order book: {len(desired)} activas "
+                f"(+{len(desired - current)} / -{len(removed)})"
+            )
+
+    def subscribe(self, exchange_id: str, symbol: str):
+        """Inicia el stream de un símbolo en un exchange."""
+        key = (exchange_id, symbol)
+        if key in self._watch_tasks:
+            return
+
+        self._watch_tasks[key] = asyncio.create_task(self._watch_loop(exchange_id, symbol))
+        self.stats['subscribes'] += 1
+
+    async def unsubscribe(self, exchange_id: str, symbol: str):
+        """Detiene el stream de un símbolo y descarta su order book."""
+        key = (exchange_id, symbol)
+        task = self._watch_tasks.pop(key, None)
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        self.books.pop(key, None)
+        await self.feed.unwatch_order_book(exchange_id, symbol)
+        self.stats['unsubscribes'] += 1
+
+    async def stop(self):
+        """Cancela todos los streams y cierra el feed."""
+        tasks = list(self._watch_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self._watch_tasks.clear()
+        self.books.clear()
+        await self.feed.close()
+        if self.recorder:
+            await self.recorder.stop()
+
+    async def _watch_loop(self, exchange_id: str, symbol: str):
+        """Recibe actualizaciones del feed y las guarda en memoria."""
+        key = (exchange_id, symbol)
+        backoff = 1.0
+
+        while True:
+            try:
+                order_book = await self.feed.watch_order_book(exchange_id, symbol, self.depth)
+                self.books[key] = {
+                    'symbol': symbol,
+                    'bids': order_book.get('bids', []),
+                    'asks': order_book.get('asks', []),
+                    'timestamp': order_book.get('timestamp'),
+                    'received_at': time.monotonic()
+                }
+                self.stats['updates'] += 1
+                backoff = 1.0
+
+                if self.recorder:
+                    self.recorder.write_line(ReplayFeed.format_record(exchange_id, symbol, order_book, self.depth))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.warning(f"Error en stream {symbol}@{exchange_id}: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    # Lecturas desde memoria
+
+    def _get_fresh_book(self, exchange_id: str, symbol: str) -> Optional[Dict]:
+        """Retorna el order book si existe y no supera la antigüedad máxima."""
+        book = self.books.get((exchange_id, symbol))
+        if not book or time.monotonic() - book['received_at'] > self.max_book_age:
+            return None
+        return book
+
+    def get_top_of_book(self, exchange_id: str, symbol: str) -> Tuple[Optional[float], Optional[float]]:
+        """Retorna (ask, bid) del mejor nivel, o (None, None) si no hay datos frescos."""
+        book = self._get_fresh_book(exchange_id, symbol)
+        if not book or not book['asks'] or not book['bids']:
+            return None, None
+
+        return safe_float(book['asks'][0][0]), safe_float(book['bids'][0][0])
+
+    def get_order_book(self, exchange_id: str, symbol: str, limit: int = None) -> Optional[Dict]:
+        """Retorna la profundidad L2 con la forma de fetch_order_book."""
+        book = self._get_fresh_book(exchange_id, symbol)
+        if not book:
+            return None
+
+        return {
+            'symbol': symbol,
+            'bids': book['bids'][:limit] if limit else book['bids'],
+            'asks': book['asks'][:limit] if limit else book['asks'],
+            'timestamp': book['timestamp']
+        }
+
+    def is_subscribed(self, exchange_id: str, symbol: str) -> bool:
+        """Indica si hay un stream activo para el par."""
+        return (exchange_id, symbol) in self._watch_tasks
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estadísticas del stream."""
+        return {
+            **self.stats,
+            'subscriptions': len(self._watch_tasks),
+            'books_in_memory': len(self.books),
+            'recording': self.recorder.get_stats() if self.recorder else None
+        }
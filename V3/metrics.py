@@ -0,0 +1,292 @@
+# Simos/V3/metrics.py
+
+import asyncio
+import bisect
+import logging
+import math
+import time
+import weakref
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from aiohttp import web
+from config_v3 import (
+    METRICS_HOST, METRICS_PORT, METRICS_LATENCY_BUCKETS_S, METRICS_LOOP_LAG_INTERVAL,
+    INFERENCE_LATENCY_BUCKETS_MS
+)
+
+LabelValues = Tuple[str, ...]
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class _Metric:
+    """Métrica con etiquetas; los valores se guardan por tupla de valores de etiqueta."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: List[str] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames or ())
+        self._values: Dict[LabelValues, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera etiquetas {self.labelnames}, recibió {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_text(self, key: LabelValues, extra: Dict[str, str] = None) -> str:
+        pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(self.labelnames, key)]
+        pairs += [f'{name}="{value}"' for name, value in (extra or {}).items()]
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def clear(self):
+        self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{self._label_text(key)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    """Contador monótono."""
+
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels):
+        """Para collectors que exportan un total ya acumulado por el componente."""
+        self._values[self._key(labels)] = float(value)
+
+class Gauge(_Metric):
+    """Valor instantáneo."""
+
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    """Histograma con buckets acumulativos (en segundos, como en Prometheus)."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: List[str] = None, buckets: List[float] = None):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = sorted(buckets or METRICS_LATENCY_BUCKETS_S)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # [conteos por bucket (+inf al final), suma, total]
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for key, (counts, total_sum, total_count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + [math.inf], counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{self._label_text(key, {'le': _format_value(bound)})} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {total_count}")
+        return lines
+
+class LatencyHistogram:
+    """Histograma de latencias con buckets fijos en milisegundos."""
+
+    def __init__(self, buckets_ms: List[float] = None):
+        self.buckets_ms = sorted(buckets_ms or INFERENCE_LATENCY_BUCKETS_MS)
+        self.counts = [0] * (len(self.buckets_ms) + 1)  # Último bucket: +inf
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float):
+        """Registra una observación."""
+        self.counts[bisect.bisect_left(self.buckets_ms, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, percentile: float) -> float:
+        """Estima un percentil como el límite superior del bucket que lo contiene."""
+        if not self.count:
+            return 0.0
+
+        target = self.count * percentile / 100
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return self.buckets_ms[index] if index < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna el resumen del histograma."""
+        buckets = {f"le_{bound}": count for bound, count in zip(self.buckets_ms, self.counts)}
+        buckets['le_inf'] = self.counts[-1]
+
+        return {
+            'count': self.count,
+            'avg_ms': self.sum_ms / self.count if self.count else 0.0,
+            'max_ms': self.max_ms,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'buckets': buckets
+        }
+
+class MetricsRegistry:
+    """Registro de métricas del proceso, renderizable en formato de texto de Prometheus."""
+
+    def __init__(self):
+        self.logger = logging.getLogger('V3.Metrics')
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Any] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            # Re-importar un módulo no debe duplicar la métrica
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: List[str] = None) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: List[str] = None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: List[str] = None, buckets: List[float] = None) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], None]):
+        """Registra una función llamada en cada scrape para actualizar gauges (profundidades de cola, etc.).
+
+        Los métodos de instancia se guardan con referencia débil para no mantener vivo al componente.
+        """
+        if hasattr(collector, '__self__'):
+            self._collectors.append(weakref.WeakMethod(collector))
+        else:
+            self._collectors.append(lambda: collector)
+
+    def collect(self):
+        """Ejecuta los collectors vivos."""
+        alive = []
+        for reference in self._collectors:
+            collector = reference()
+            if collector is None:
+                continue
+            alive.append(reference)
+            try:
+                collector()
+            except Exception as e:
+                self.logger.error(f"Error en collector de métricas {collector}: {e}")
+        self._collectors = alive
+
+    def render(self) -> str:
+        """Texto de exposición (versión 0.0.4)."""
+        self.collect()
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+# Registro del proceso (compartido por todos los módulos, como el tracer)
+registry = MetricsRegistry()
+
+LOOP_LAG = registry.histogram(
+    'v3_event_loop_lag_seconds', 'Retraso del event loop respecto al intervalo programado',
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+)
+LOOP_LAG_LAST = registry.gauge('v3_event_loop_lag_last_seconds', 'Último retraso medido del event loop')
+PROCESS_START = registry.gauge('v3_process_start_time_seconds', 'Epoch de arranque del proceso')
+
+class MetricsServer:
+    """Endpoint HTTP local (GET /metrics) y sonda de lag del event loop."""
+
+    def __init__(self, host: str = None, port: int = None, metrics_registry: MetricsRegistry = None,
+                 loop_lag_probe: bool = True):
+        self.logger = logging.getLogger('V3.MetricsServer')
+        self.host = host or METRICS_HOST
+        self.port = port if port is not None else METRICS_PORT
+        self.registry = metrics_registry or registry
+        # Con el watchdog del loop activo, él alimenta las métricas de lag
+        self.loop_lag_probe = loop_lag_probe
+
+        self.app = web.Application()
+        self.app.router.add_get('/metrics', self._handle_metrics)
+        self.runner: Optional[web.AppRunner] = None
+        self._lag_task: Optional[asyncio.Task] = None
+        self.is_running = False
+
+    async def start(self):
+        """Inicia el servidor HTTP y la sonda de lag."""
+        try:
+            self.runner = web.AppRunner(self.app, access_log=None)
+            await self.runner.setup()
+            await web.TCPSite(self.runner, self.host, self.port).start()
+
+            PROCESS_START.set(time.time())
+            if self.loop_lag_probe:
+                self._lag_task = asyncio.create_task(self._loop_lag_probe())
+            self.is_running = True
+            self.logger.info(f"Métricas disponibles en http://{self.host}:{self.port}/metrics")
+
+        except Exception as e:
+            self.logger.error(f"Error iniciando servidor de métricas: {e}")
+
+    async def stop(self):
+        """Detiene el servidor y la sonda."""
+        if self._lag_task:
+            self._lag_task.cancel()
+            await asyncio.gather(self._lag_task, return_exceptions=True)
+            self._lag_task = None
+
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+        self.is_running = False
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        body = self.registry.render()
+        return web.Response(text=body, content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Format': 'prometheus-0.0.4'})
+
+    async def _loop_lag_probe(self):
+        """Duerme un intervalo fijo y mide cuánto tarde despierta (lag del loop)."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + METRICS_LOOP_LAG_INTERVAL
+            await asyncio.sleep(METRICS_LOOP_LAG_INTERVAL)
+            lag = max(0.0, loop.time() - expected)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(lag)
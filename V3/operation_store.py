@@ -0,0 +1,332 @@
+# Simos/V3/operation_store.py
+
+import logging
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Iterable
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from config_v3 import OPERATION_STORE_DIR, OPERATION_STORE_MAX_PARTS
+from utils import save_json_file, load_json_file, safe_float
+
+OPERATION_STORE_INDEX_VERSION = 1
+INDEX_FILE_NAME = "_index.json"
+
+# Columnas de texto aunque algún lote las traiga numéricas (p.ej. analysis_id)
+TEXT_COLUMNS = {
+    'symbol', 'decision_outcome', 'buy_exchange_id', 'sell_exchange_id', 'analysis_id', 'error_message',
+    'trace_id', 'trace_spans'
+}
+
+class OperationStore:
+    """Almacén columnar (Parquet) de operaciones, particionado por día y con agregados precalculados."""
+
+    def __init__(self, base_dir: str = None):
+        self.logger = logging.getLogger('V3.OperationStore')
+        self.base_dir = base_dir or OPERATION_STORE_DIR
+        self.index_path = os.path.join(self.base_dir, INDEX_FILE_NAME)
+
+        # Las escrituras corren en hilos del executor; las lecturas en el event loop
+        self._lock = threading.RLock()
+        self.partitions: Dict[str, Dict] = {}
+        self._load_index()
+
+    # Índice
+
+    def _load_index(self):
+        """Carga el índice de particiones (rango de tiempo y agregados por día)."""
+        if not os.path.exists(self.index_path):
+            return
+
+        index = load_json_file(self.index_path)
+        if not index or index.get('version') != OPERATION_STORE_INDEX_VERSION:
+            self.logger.warning(f"Índice del almacén de operaciones inválido: {self.index_path}")
+            return
+
+        self.partitions = index.get('partitions', {})
+
+    def _save_index(self) -> bool:
+        os.makedirs(self.base_dir, exist_ok=True)
+        temp_path = f"{self.index_path}.tmp"
+        if save_json_file({'version': OPERATION_STORE_INDEX_VERSION, 'partitions': self.partitions}, temp_path):
+            os.replace(temp_path, self.index_path)
+            return True
+        return False
+
+    def _partition_dir(self, day: str) -> str:
+        return os.path.join(self.base_dir, f"date={day}")
+
+    def has_data(self) -> bool:
+        """Indica si el almacén tiene alguna operación."""
+        return bool(self.partitions)
+
+    # Escritura
+
+    def append_rows(self, rows: List[Dict[str, Any]]):
+        """Agrega un lote de filas de operación; escribe un archivo Parquet por día afectado."""
+        if not rows:
+            return
+
+        table = self._rows_to_table(rows)
+        days = pc.strftime(table['timestamp'], format='%Y-%m-%d')
+
+        with self._lock:
+            for day in pc.unique(days).to_pylist():
+                day_table = table.filter(pc.equal(days, day))
+                self._append_partition(day, day_table)
+            self._save_index()
+
+    def _rows_to_table(self, rows: List[Dict[str, Any]]) -> pa.Table:
+        """Convierte filas de log a tabla Arrow con timestamp tipado para filtrar por tiempo."""
+        frame = pd.DataFrame.from_records(rows)
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'], utc=True, errors='coerce', format='ISO8601')
+        frame = frame.dropna(subset=['timestamp'])
+
+        # Tipos estables entre archivos: texto como string y números como float64
+        for column in frame.columns:
+            if column == 'timestamp':
+                continue
+            if column not in TEXT_COLUMNS and pd.api.types.is_numeric_dtype(frame[column]) \
+                    and not pd.api.types.is_bool_dtype(frame[column]):
+                frame[column] = frame[column].astype('float64')
+            else:
+                frame[column] = frame[column].astype('string')
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        schema = pa.schema([
+            field.with_type(pa.string()) if pa.types.is_large_string(field.type) else field
+            for field in table.schema
+        ])
+        return table.cast(schema)
+
+    def _append_partition(self, day: str, table: pa.Table):
+        partition = self.partitions.setdefault(day, {'parts': [], 'next_part': 0, 'aggregates': _empty_aggregates()})
+
+        directory = self._partition_dir(day)
+        os.makedirs(directory, exist_ok=True)
+
+        file_name = f"part-{partition['next_part']:05d}.parquet"
+        pq.write_table(table, os.path.join(directory, file_name))
+
+        timestamps = table['timestamp']
+        partition['parts'].append({
+            'file': file_name,
+            'rows': table.num_rows,
+            'min_ts': pc.min(timestamps).as_py().isoformat(),
+            'max_ts': pc.max(timestamps).as_py().isoformat()
+        })
+        partition['next_part'] += 1
+        partition['aggregates'] = _merge_aggregates(partition['aggregates'], _table_aggregates(table))
+
+        self._compact_partition(day)
+
+    def _compact_partition(self, day: str):
+        """Compactación por niveles: OPERATION_STORE_MAX_PARTS archivos de un mismo nivel se unen en uno
+        del nivel siguiente; los archivos ya compactados de niveles superiores no se reescriben."""
+        partition = self.partitions[day]
+        while True:
+            levels = Counter(part.get('level', 0) for part in partition['parts'])
+            level = next((lvl for lvl in sorted(levels) if levels[lvl] >= OPERATION_STORE_MAX_PARTS), None)
+            if level is None or not self._merge_level(day, level):
+                return
+
+    def _merge_level(self, day: str, level: int) -> bool:
+        """Une los archivos de un nivel en uno del nivel siguiente; retorna False si no se pudo guardar el índice."""
+        partition = self.partitions[day]
+        directory = self._partition_dir(day)
+        merged = [part for part in partition['parts'] if part.get('level', 0) == level]
+        old_files = [os.path.join(directory, part['file']) for part in merged]
+
+        table = _concat_tables([pq.read_table(path) for path in old_files])
+        file_name = f"part-{partition['next_part']:05d}.parquet"
+        pq.write_table(table, os.path.join(directory, file_name))
+
+        partition['parts'] = [part for part in partition['parts'] if part.get('level', 0) != level]
+        partition['parts'].append({
+            'file': file_name,
+            'rows': table.num_rows,
+            'min_ts': min((part['min_ts'] for part in merged), key=datetime.fromisoformat),
+            'max_ts': max((part['max_ts'] for part in merged), key=datetime.fromisoformat),
+            'level': level + 1
+        })
+        partition['next_part'] += 1
+
+        # El índice en disco debe apuntar al archivo compactado antes de borrar los viejos
+        if not self._save_index():
+            self.logger.warning(f"No se pudo guardar el índice al compactar {day}; se conservan los archivos anteriores")
+            return False
+
+        for path in old_files:
+            os.remove(path)
+
+        self.logger.debug(f"Partición {day} compactada al nivel {level + 1}: {table.num_rows} filas")
+        return True
+
+    def import_csv(self, csv_paths: Iterable[str], chunk_size: int = 50000) -> int:
+        """Importa logs CSV existentes al almacén; retorna el número de filas importadas."""
+        imported = 0
+        for csv_path in csv_paths:
+            for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+                self.append_rows(chunk.to_dict('records'))
+                imported += len(chunk)
+        return imported
+
+    # Lectura
+
+    def _select_partitions(self, start: Optional[datetime], end: Optional[datetime]) -> List[str]:
+        start_day = start.strftime('%Y-%m-%d') if start else None
+        end_day = end.strftime('%Y-%m-%d') if end else None
+        return sorted(
+            day for day in self.partitions
+            if (start_day is None or day >= start_day) and (end_day is None or day <= end_day)
+        )
+
+    def _part_paths(self, day: str, start: Optional[datetime], end: Optional[datetime]) -> List[str]:
+        """Archivos de la partición cuyo rango [min_ts, max_ts] intersecta la ventana."""
+        paths = []
+        for part in self.partitions[day]['parts']:
+            if start and datetime.fromisoformat(part['max_ts']) < start:
+                continue
+            if end and datetime.fromisoformat(part['min_ts']) > end:
+                continue
+            paths.append(os.path.join(self._partition_dir(day), part['file']))
+        return paths
+
+    def read_table(
+        self,
+        start: datetime = None,
+        end: datetime = None,
+        columns: List[str] = None
+    ) -> pa.Table:
+        """Lee las operaciones de una ventana de tiempo leyendo solo las particiones necesarias."""
+        with self._lock:
+            paths = [
+                path
+                for day in self._select_partitions(start, end)
+                for path in self._part_paths(day, start, end)
+            ]
+
+            tables = [pq.read_table(path, columns=columns) for path in paths]
+
+        if not tables:
+            return pa.table({})
+
+        table = _concat_tables(tables)
+        if start is not None or end is not None:
+            timestamps = table['timestamp']
+            mask = None
+            if start is not None:
+                mask = pc.greater_equal(timestamps, pa.scalar(start, type=timestamps.type))
+            if end is not None:
+                end_mask = pc.less_equal(timestamps, pa.scalar(end, type=timestamps.type))
+                mask = end_mask if mask is None else pc.and_(mask, end_mask)
+            table = table.filter(mask)
+
+        return table.sort_by('timestamp')
+
+    def read_frame(self, start: datetime = None, end: datetime = None, columns: List[str] = None) -> pd.DataFrame:
+        """Igual que read_table pero como DataFrame."""
+        return self.read_table(start, end, columns).to_pandas()
+
+    def get_statistics(self, days: int = None) -> Dict[str, Any]:
+        """Estadísticas de los últimos días: agregados precalculados y solo el día de corte se lee."""
+        start = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+        aggregates = _empty_aggregates()
+
+        with self._lock:
+            for day in self._select_partitions(start, None):
+                partition = self.partitions[day]
+                partition_start = min(datetime.fromisoformat(part['min_ts']) for part in partition['parts'])
+
+                if start is None or partition_start >= start:
+                    aggregates = _merge_aggregates(aggregates, partition['aggregates'])
+                else:
+                    # Día de corte: solo aquí se leen filas, filtradas por tiempo
+                    boundary = self.read_table(start, _end_of_day(day), AGGREGATE_COLUMNS)
+                    aggregates = _merge_aggregates(aggregates, _table_aggregates(boundary))
+
+        return _finalize_statistics(aggregates)
+
+# Agregados por partición
+
+AGGREGATE_COLUMNS = [
+    'timestamp', 'decision_outcome', 'net_profit_usdt', 'investment_usdt',
+    'symbol', 'buy_exchange_id', 'sell_exchange_id'
+]
+
+def _empty_aggregates() -> Dict[str, Any]:
+    return {
+        'total_operations': 0,
+        'successful_operations': 0,
+        'failed_operations': 0,
+        'total_profit_usdt': 0.0,
+        'total_investment_usdt': 0.0,
+        'symbols_traded': [],
+        'exchanges_used': []
+    }
+
+def _string_values(table: pa.Table, column: str) -> List[str]:
+    if column not in table.column_names or table.num_rows == 0:
+        return []
+    values = pc.unique(table[column].cast(pa.string())).to_pylist()
+    return [value.strip() for value in values if value and value.strip() and value.strip() != 'N/A']
+
+def _column_sum(table: pa.Table, column: str) -> float:
+    if column not in table.column_names or table.num_rows == 0:
+        return 0.0
+    values = pc.cast(table[column], pa.float64(), safe=False)
+    return safe_float(pc.sum(values).as_py())
+
+def _table_aggregates(table: pa.Table) -> Dict[str, Any]:
+    """Calcula los agregados de estadísticas de una tabla de operaciones."""
+    total = table.num_rows
+    successful = 0
+    if total and 'decision_outcome' in table.column_names:
+        decisions = pc.fill_null(table['decision_outcome'].cast(pa.string()), '')
+        successful = pc.sum(pc.match_substring(decisions, 'EJECUTADA')).as_py() or 0
+
+    return {
+        'total_operations': total,
+        'successful_operations': successful,
+        'failed_operations': total - successful,
+        'total_profit_usdt': _column_sum(table, 'net_profit_usdt'),
+        'total_investment_usdt': _column_sum(table, 'investment_usdt'),
+        'symbols_traded': sorted(_string_values(table, 'symbol')),
+        'exchanges_used': sorted(set(_string_values(table, 'buy_exchange_id') + _string_values(table, 'sell_exchange_id')))
+    }
+
+def _merge_aggregates(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'total_operations': left['total_operations'] + right['total_operations'],
+        'successful_operations': left['successful_operations'] + right['successful_operations'],
+        'failed_operations': left['failed_operations'] + right['failed_operations'],
+        'total_profit_usdt': left['total_profit_usdt'] + right['total_profit_usdt'],
+        'total_investment_usdt': left['total_investment_usdt'] + right['total_investment_usdt'],
+        'symbols_traded': sorted(set(left['symbols_traded']) | set(right['symbols_traded'])),
+        'exchanges_used': sorted(set(left['exchanges_used']) | set(right['exchanges_used']))
+    }
+
+def _finalize_statistics(aggregates: Dict[str, Any]) -> Dict[str, Any]:
+    """Agrega las métricas derivadas con el formato de DataPersistence.get_operation_statistics."""
+    stats = {**aggregates, 'average_profit_percentage': 0.0, 'success_rate': 0.0}
+
+    if stats['total_operations'] > 0:
+        stats['success_rate'] = (stats['successful_operations'] / stats['total_operations']) * 100
+
+    if stats['total_investment_usdt'] > 0:
+        stats['average_profit_percentage'] = (stats['total_profit_usdt'] / stats['total_investment_usdt']) * 100
+
+    return stats
+
+def _end_of_day(day: str) -> datetime:
+    return datetime.strptime(day, '%Y-%m-%d').replace(tzinfo=timezone.utc) + timedelta(days=1, microseconds=-1)
+
+def _concat_tables(tables: List[pa.Table]) -> pa.Table:
+    """Concatena tablas tolerando columnas agregadas al log con el tiempo."""
+    if len(tables) == 1:
+        return tables[0]
+    return pa.concat_tables(tables, promote_options="permissive")
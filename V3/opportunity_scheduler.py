@@ -0,0 +1,269 @@
+# Simos/V3/opportunity_scheduler.py
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from config_v3 import (
+    SCHEDULER_BURST_WINDOW, SCHEDULER_TOP_K, SCHEDULER_WORKERS, SCHEDULER_CYCLE_DEADLINE,
+    DEFAULT_FIXED_INVESTMENT_USDT
+)
+from utils import safe_float, create_symbol_dict
+from tracing import Trace, tracer, current_trace, activate, deactivate
+from metrics import registry
+
+SCHEDULER_QUEUE_DEPTH = registry.gauge('v3_scheduler_queue_depth', 'Candidatos esperando worker')
+SCHEDULER_BURST_PENDING = registry.gauge('v3_scheduler_burst_pending', 'Eventos en la ráfaga en curso')
+SCHEDULER_IN_FLIGHT = registry.gauge('v3_scheduler_in_flight', 'Candidatos procesándose')
+SCHEDULER_EVENTS = registry.counter('v3_scheduler_events_total', 'Contadores del scheduler de oportunidades', ['kind'])
+
+DEFAULT_TAKER_FEE = 0.001
+
+def get_opportunity_key(opportunity_data: Dict) -> str:
+    """Clave de deduplicación: símbolo y par de exchanges."""
+    return (
+        f"{opportunity_data.get('symbol')}|{opportunity_data.get('exchange_min_id')}|"
+        f"{opportunity_data.get('exchange_max_id')}"
+    )
+
+def estimate_expected_net_profit(opportunity_data: Dict, investment_usdt: float = None) -> float:
+    """Estimación barata de la ganancia neta en USDT con los datos de Sebo (para ordenar candidatos)."""
+    investment = investment_usdt or DEFAULT_FIXED_INVESTMENT_USDT
+    symbol_dict = create_symbol_dict(opportunity_data)
+
+    buy_fees = symbol_dict['buy_exchange_fees'] or {}
+    sell_fees = symbol_dict['sell_exchange_fees'] or {}
+    buy_fee = safe_float(buy_fees.get('taker_fee'), DEFAULT_TAKER_FEE)
+    sell_fee = safe_float(sell_fees.get('taker_fee'), DEFAULT_TAKER_FEE)
+
+    net_percentage = symbol_dict['percentage_difference'] - (buy_fee + sell_fee) * 100
+    withdrawal_cost = safe_float(buy_fees.get('withdrawal_fee_asset')) * symbol_dict['sell_price_sebo']
+
+    return investment * net_percentage / 100 - withdrawal_cost
+
+class ScheduledOpportunity:
+    """Candidato despachado en un ciclo."""
+
+    __slots__ = ('key', 'data', 'cycle_id', 'expected_profit', 'received_at', 'deadline', 'trace')
+
+    def __init__(
+        self, key: str, data: Dict, cycle_id: int, expected_profit: float, received_at: float, deadline: float,
+        trace: Optional[Trace] = None
+    ):
+        self.key = key
+        self.data = data
+        self.cycle_id = cycle_id
+        self.expected_profit = expected_profit
+        self.received_at = received_at
+        self.deadline = deadline
+        self.trace = trace
+
+class OpportunityScheduler:
+    """Agrupa las ráfagas de spot-arb, deduplica, ordena y despacha el top-K a un pool acotado."""
+
+    def __init__(
+        self,
+        process_callback: Callable[[Dict], Awaitable[Any]],
+        workers: int = None,
+        top_k: int = None,
+        burst_window: float = None,
+        cycle_deadline: float = None,
+        rank_function: Callable[[Dict], float] = None
+    ):
+        self.logger = logging.getLogger('V3.OpportunityScheduler')
+        self.process_callback = process_callback
+        self.workers = workers or SCHEDULER_WORKERS
+        self.top_k = top_k or SCHEDULER_TOP_K
+        self.burst_window = burst_window if burst_window is not None else SCHEDULER_BURST_WINDOW
+        self.cycle_deadline = cycle_deadline if cycle_deadline is not None else SCHEDULER_CYCLE_DEADLINE
+        self.rank_function = rank_function or estimate_expected_net_profit
+
+        # Ráfaga en curso: clave -> (datos, instante de recepción, traza)
+        self._burst: Dict[str, tuple] = {}
+        self._burst_task: Optional[asyncio.Task] = None
+
+        self.ready_queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self.cycle_id = 0
+        self.in_flight = 0
+        self.is_running = False
+
+        self.stats = {
+            'received': 0,
+            'deduplicated': 0,
+            'cycles': 0,
+            'dispatched': 0,
+            'completed': 0,
+            'errors': 0,
+            'dropped_rank': 0,  # Fuera del top-K de su ciclo
+            'dropped_stale': 0,  # Reemplazados por la ráfaga siguiente sin haber empezado
+            'dropped_deadline': 0,  # Venció el deadline del ciclo antes de empezar
+            'last_cycle_size': 0,
+            'wait_ms_total': 0.0
+        }
+        registry.register_collector(self._collect_metrics)
+
+    async def start(self):
+        """Inicia el pool de workers."""
+        if self.is_running:
+            return
+
+        self.ready_queue = asyncio.Queue()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker_loop(worker_id)) for worker_id in range(self.workers)
+        ]
+        self.is_running = True
+        self.logger.info(f"Scheduler de oportunidades iniciado ({self.workers} workers, top-{self.top_k})")
+
+    async def stop(self):
+        """Descarta lo pendiente y espera a que terminen las operaciones ya iniciadas."""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+
+        if self._burst_task:
+            self._burst_task.cancel()
+            await asyncio.gather(self._burst_task, return_exceptions=True)
+            self._burst_task = None
+        for _, _, trace in self._burst.values():
+            tracer.finish(trace, 'DROPPED_STALE')
+        self._burst.clear()
+        self._drop_ready('dropped_stale')
+
+        # Los workers solo se cancelan mientras esperan en la cola; una operación
+        # en curso termina antes (no se interrumpen órdenes a medio ejecutar)
+        for _ in self._worker_tasks:
+            self.ready_queue.put_nowait(None)
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+        self.logger.info("Scheduler de oportunidades detenido")
+
+    def submit(self, opportunity_data: Dict):
+        """Registra un evento spot-arb en la ráfaga en curso (costo O(1), no bloquea)."""
+        if not self.is_running:
+            return
+
+        key = get_opportunity_key(opportunity_data)
+        self.stats['received'] += 1
+
+        # El evento más reciente de un par reemplaza al anterior. La traza viaja con
+        # el candidato porque los workers no heredan el contexto del evento
+        trace = current_trace() or tracer.start_trace(symbol=opportunity_data.get('symbol'), source='scheduler')
+        if key in self._burst:
+            self.stats['deduplicated'] += 1
+            replaced_trace = self._burst[key][2]
+            if replaced_trace is not trace:
+                tracer.finish(replaced_trace, 'DROPPED_DUPLICATE')
+        self._burst[key] = (opportunity_data, time.monotonic(), trace)
+
+        if self._burst_task is None:
+            self._burst_task = asyncio.create_task(self._close_burst_after_window())
+
+    async def _close_burst_after_window(self):
+        try:
+            await asyncio.sleep(self.burst_window)
+        finally:
+            self._burst_task = None
+        self._start_cycle()
+
+    def _start_cycle(self):
+        """Cierra la ráfaga: ordena por ganancia esperada y reemplaza la cola con el top-K."""
+        burst, self._burst = self._burst, {}
+        if not burst:
+            return
+
+        self.cycle_id += 1
+        self.stats['cycles'] += 1
+        self.stats['last_cycle_size'] = len(burst)
+
+        # Lo que quedó sin empezar del ciclo anterior ya es viejo
+        self._drop_ready('dropped_stale')
+
+        candidates = []
+        for key, (data, received_at, trace) in burst.items():
+            try:
+                expected_profit = self.rank_function(data)
+            except Exception as e:
+                self.logger.warning(f"No se pudo estimar ganancia de {key}: {e}")
+                expected_profit = float('-inf')
+            candidates.append((expected_profit, key, data, received_at, trace))
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        selected = candidates[:self.top_k]
+        self.stats['dropped_rank'] += len(candidates) - len(selected)
+        for candidate in candidates[self.top_k:]:
+            tracer.finish(candidate[4], 'DROPPED_RANK')
+
+        deadline = time.monotonic() + self.cycle_deadline
+        for expected_profit, key, data, received_at, trace in selected:
+            self.ready_queue.put_nowait(
+                ScheduledOpportunity(key, data, self.cycle_id, expected_profit, received_at, deadline, trace)
+            )
+
+        self.logger.debug(
+            f"Ciclo {self.cycle_id}: {len(burst)} candidatos, {len(selected)} despachados "
+            f"(mejor ganancia esperada {selected[0][0]:.4f} USDT)"
+        )
+
+    def _drop_ready(self, reason: str):
+        """Vacía la cola de candidatos pendientes contándolos como descartados."""
+        if not self.ready_queue:
+            return
+
+        while not self.ready_queue.empty():
+            item = self.ready_queue.get_nowait()
+            if item is not None:
+                self.stats[reason] += 1
+                tracer.finish(item.trace, reason.upper())
+
+    async def _worker_loop(self, worker_id: int):
+        """Toma candidatos de la cola y los procesa de a uno."""
+        while True:
+            item = await self.ready_queue.get()
+            if item is None:
+                return
+
+            now = time.monotonic()
+            if now > item.deadline:
+                self.stats['dropped_deadline'] += 1
+                tracer.finish(item.trace, 'DROPPED_DEADLINE')
+                continue
+
+            wait_ms = (now - item.received_at) * 1000
+            self.stats['dispatched'] += 1
+            self.stats['wait_ms_total'] += wait_ms
+            self.in_flight += 1
+            
+            tracer.record('queue_wait', wait_ms, item.trace)
+            token = activate(item.trace)
+            try:
+                await self.process_callback(item.data)
+                self.stats['completed'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.error(f"Worker {worker_id}: error procesando {item.key}: {e}")
+            finally:
+                deactivate(token)
+                self.in_flight -= 1
+
+    def _collect_metrics(self):
+        SCHEDULER_QUEUE_DEPTH.set(self.ready_queue.qsize() if self.ready_queue else 0)
+        SCHEDULER_BURST_PENDING.set(len(self._burst))
+        SCHEDULER_IN_FLIGHT.set(self.in_flight)
+        for kind in ('received', 'deduplicated', 'dispatched', 'completed', 'errors',
+                     'dropped_rank', 'dropped_stale', 'dropped_deadline'):
+            SCHEDULER_EVENTS.set(self.stats[kind], kind=kind)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna profundidad de cola, descartes y contadores del scheduler."""
+        dispatched = self.stats['dispatched']
+        return {
+            **{key: value for key, value in self.stats.items() if key != 'wait_ms_total'},
+            'cycle_id': self.cycle_id,
+            'burst_pending': len(self._burst),
+            'queue_depth': self.ready_queue.qsize() if self.ready_queue else 0,
+            'in_flight': self.in_flight,
+            'avg_wait_ms': self.stats['wait_ms_total'] / dispatched if dispatched else 0.0
+        }
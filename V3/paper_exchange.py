@@ -0,0 +1,804 @@
+#!/usr/bin/env python3
+# Simos/V3/paper_exchange.py
+
+"""
+Exchange simulado (paper) con el subconjunto de CCXT que usa ExchangeManager:
+tickers, order books, balances, órdenes de mercado que recorren el libro,
+direcciones de depósito y retiros con fee y demora por red, más latencia y
+fallos inyectables. Se activa con PAPER_EXCHANGE_ENABLED.
+
+También puede correr como servidor HTTP local compartido por varios procesos
+(PAPER_EXCHANGE_URL apunta a él):
+Uso: python paper_exchange.py [--host 127.0.0.1] [--port 8790] [--seed 42] [--failure-rate 0.0]
+"""
+
+import argparse
+import asyncio
+import itertools
+import logging
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+import aiohttp
+from aiohttp import web
+import ccxt.async_support as ccxt
+from config_v3 import (
+    PAPER_EXCHANGE_URL, PAPER_SEED, PAPER_SYMBOLS, PAPER_INITIAL_BALANCES, PAPER_INITIAL_INVENTORY_USDT,
+    PAPER_TAKER_FEE, PAPER_MIN_ORDER_USDT, PAPER_PRICE_TICK_S, PAPER_PRICE_VOLATILITY, PAPER_PRICE_DISPERSION,
+    PAPER_SPREAD, PAPER_BOOK_LEVELS, PAPER_BOOK_STEP, PAPER_BOOK_LEVEL_USDT, PAPER_RATE_LIMIT_MS,
+    PAPER_NETWORKS, PAPER_DEFAULT_WITHDRAW_FEE_USDT, PAPER_DEFAULT_WITHDRAW_DELAY_S, PAPER_WITHDRAWAL_DELAY_SCALE,
+    PAPER_LATENCY_MS, PAPER_LATENCY_JITTER, PAPER_FAILURE_RATE, PAPER_TIMEOUT_RATE, PAPER_EXCHANGE_PROFILES,
+    REQUEST_TIMEOUT
+)
+from request_scheduler import get_method_lane
+from http_pool import http_pool
+
+PAPER_HAS = {
+    'fetchTicker': True,
+    'fetchTickers': True,
+    'fetchOrderBook': True,
+    'fetchBalance': True,
+    'createMarketOrder': True,
+    'fetchDepositAddress': True,
+    'withdraw': True,
+    'fetchTradingFees': True,
+    'fetchCurrencies': True,
+    'fetchDepositWithdrawFees': True,
+    'fetchTime': True,
+    'fetchStatus': True
+}
+
+# Métodos expuestos por el servidor HTTP
+PAPER_API_METHODS = (
+    'load_markets', 'fetch_time', 'fetch_status', 'fetch_ticker', 'fetch_tickers', 'fetch_order_book',
+    'fetch_balance', 'create_order', 'create_market_buy_order', 'create_market_sell_order',
+    'fetch_deposit_address', 'withdraw', 'fetch_trading_fees', 'fetch_currencies', 'fetch_deposit_withdraw_fees'
+)
+
+def _iso8601(timestamp_ms: int) -> str:
+    return datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+def _default_profile() -> Dict[str, Any]:
+    return {
+        'latency_ms': dict(PAPER_LATENCY_MS),
+        'latency_scale': 1.0,
+        'jitter': PAPER_LATENCY_JITTER,
+        'failure_rate': PAPER_FAILURE_RATE,
+        'timeout_rate': PAPER_TIMEOUT_RATE
+    }
+
+class PaperMarket:
+    """Estado compartido por todos los exchanges simulados.
+
+    Un precio de referencia por símbolo con paseo aleatorio por tick; cada exchange
+    cotiza con un desvío propio (redibujado en cada tick) y un order book L2
+    sintético que las órdenes van consumiendo hasta el tick siguiente. Los balances
+    y las direcciones de depósito son comunes para que un retiro acredite en el
+    exchange destino, tras la demora de su red.
+    """
+
+    def __init__(self, seed: int = None, symbols: Dict[str, float] = None, profile: Dict[str, Any] = None):
+        self.logger = logging.getLogger('V3.PaperMarket')
+        self.seed = PAPER_SEED if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.reference = dict(symbols or PAPER_SYMBOLS)
+        self.initial_reference = dict(self.reference)
+        # Overrides del perfil de latencia/fallos para todos los exchanges (p. ej. desde la línea de comandos)
+        self.profile = profile or {}
+
+        self.tick = self._current_tick()
+        self.offsets: Dict[Tuple[str, str], float] = {}
+        self.books: Dict[Tuple[str, str], Dict[str, List[List[float]]]] = {}
+
+        self.balances: Dict[str, Dict[str, float]] = {}
+        self.deposit_addresses: Dict[str, Tuple[str, str]] = {}  # address -> (exchange_id, currency)
+        self.networks = self._build_networks()
+        self.pending_deposits: Dict[str, asyncio.TimerHandle] = {}
+
+        self.exchanges: Dict[str, 'PaperExchange'] = {}
+        self._ids = itertools.count(1)
+        self.stats = {
+            'orders': 0,
+            'partial_fills': 0,
+            'levels_walked': 0,
+            'rejected_orders': 0,
+            'volume_usdt': 0.0,
+            'fees_usdt': 0.0,
+            'withdrawals': 0,
+            'deposits_credited': 0
+        }
+
+    # Precios y order books
+
+    def _current_tick(self) -> int:
+        return int(time.monotonic() / PAPER_PRICE_TICK_S)
+
+    def _advance(self):
+        """Aplica los ticks transcurridos: paseo aleatorio de la referencia y libros nuevos."""
+        tick = self._current_tick()
+        if tick == self.tick:
+            return
+
+        # Más de 10 ticks sin consultas: alcanza con 10 pasos para descorrelacionar
+        for _ in range(min(tick - self.tick, 10)):
+            for symbol, price in self.reference.items():
+                self.reference[symbol] = price * (1 + self.rng.gauss(0, PAPER_PRICE_VOLATILITY))
+        self.tick = tick
+        self.offsets.clear()
+        self.books.clear()
+
+    def symbols(self) -> List[str]:
+        return list(self.reference.keys())
+
+    def currencies(self) -> List[str]:
+        codes = {'USDT'}
+        for symbol in self.reference:
+            codes.update(symbol.split('/'))
+        return sorted(codes)
+
+    def mid_price(self, exchange_id: str, symbol: str) -> float:
+        self._advance()
+        key = (exchange_id, symbol)
+        offset = self.offsets.get(key)
+        if offset is None:
+            offset = self.offsets[key] = self.rng.uniform(-PAPER_PRICE_DISPERSION, PAPER_PRICE_DISPERSION)
+        return self.reference[symbol] * (1 + offset)
+
+    def order_book(self, exchange_id: str, symbol: str) -> Dict[str, List[List[float]]]:
+        """Libro vigente del exchange (los niveles consumidos por órdenes no vuelven hasta el próximo tick)."""
+        if symbol not in self.reference:
+            raise ccxt.BadSymbol(f"{exchange_id} paper: símbolo desconocido {symbol}")
+
+        mid = self.mid_price(exchange_id, symbol)
+        key = (exchange_id, symbol)
+        book = self.books.get(key)
+        if book is None:
+            asks, bids = [], []
+            for level in range(PAPER_BOOK_LEVELS):
+                distance = PAPER_SPREAD / 2 + level * PAPER_BOOK_STEP
+                ask, bid = mid * (1 + distance), mid * (1 - distance)
+                asks.append([ask, PAPER_BOOK_LEVEL_USDT * self.rng.uniform(0.5, 1.5) / ask])
+                bids.append([bid, PAPER_BOOK_LEVEL_USDT * self.rng.uniform(0.5, 1.5) / bid])
+            book = self.books[key] = {'asks': asks, 'bids': bids}
+        return book
+
+    def top_of_book(self, exchange_id: str, symbol: str) -> Tuple[Optional[float], Optional[float]]:
+        book = self.order_book(exchange_id, symbol)
+        ask = book['asks'][0][0] if book['asks'] else None
+        bid = book['bids'][0][0] if book['bids'] else None
+        return ask, bid
+
+    @staticmethod
+    def _walk(levels: List[List[float]], amount: float = None, cost: float = None) -> Tuple[float, float, List[Tuple[int, float, float]]]:
+        """Recorre niveles hasta cubrir amount (o gastar cost) sin modificarlos."""
+        filled = spent = 0.0
+        fills = []
+        for index, (price, size) in enumerate(levels):
+            if amount is not None:
+                take = min(size, amount - filled)
+            else:
+                take = min(size, (cost - spent) / price)
+            if take <= 0:
+                break
+            fills.append((index, price, take))
+            filled += take
+            spent += take * price
+        return filled, spent, fills
+
+    @staticmethod
+    def _consume(levels: List[List[float]], fills: List[Tuple[int, float, float]]):
+        for index, _, take in fills:
+            levels[index][1] -= take
+        # Los niveles agotados salen del libro
+        levels[:] = [level for level in levels if level[1] > 1e-12]
+
+    # Balances
+
+    def account(self, exchange_id: str) -> Dict[str, float]:
+        """Balances libres de un exchange, sembrados al primer uso."""
+        account = self.balances.get(exchange_id)
+        if account is None:
+            account = self.balances[exchange_id] = {code: 0.0 for code in self.currencies()}
+            for code, amount in PAPER_INITIAL_BALANCES.items():
+                account[code] = float(amount)
+            for symbol, price in self.initial_reference.items():
+                account[symbol.split('/')[0]] += PAPER_INITIAL_INVENTORY_USDT / price
+        return account
+
+    def valuation_usdt(self) -> float:
+        """Valor de todos los balances al precio de referencia (sin los depósitos en tránsito)."""
+        prices = {symbol.split('/')[0]: price for symbol, price in self.reference.items()}
+        prices['USDT'] = 1.0
+        return sum(
+            amount * prices.get(code, 0.0)
+            for account in self.balances.values() for code, amount in account.items()
+        )
+
+    # Órdenes
+
+    def execute_market_order(self, exchange_id: str, symbol: str, side: str, amount: float = None, cost: float = None) -> Dict:
+        """Llena una orden de mercado contra el libro del exchange y ajusta los balances."""
+        base, quote = symbol.split('/')
+        book = self.order_book(exchange_id, symbol)
+        account = self.account(exchange_id)
+
+        if side == 'buy':
+            if amount is None and cost is None:
+                raise ccxt.ArgumentsRequired(f"{exchange_id} paper: la compra de mercado requiere amount o cost")
+            # Con cost, la comisión sale del mismo presupuesto: lo debitado en total es cost
+            budget = cost / (1 + PAPER_TAKER_FEE) if amount is None else None
+            filled, spent, fills = self._walk(book['asks'], amount=amount, cost=budget)
+            fee = spent * PAPER_TAKER_FEE
+            required_code, required = quote, spent + fee
+        elif side == 'sell':
+            if amount is None:
+                raise ccxt.ArgumentsRequired(f"{exchange_id} paper: la venta de mercado requiere amount")
+            filled, spent, fills = self._walk(book['bids'], amount=amount)
+            fee = spent * PAPER_TAKER_FEE
+            required_code, required = base, amount
+        else:
+            raise ccxt.InvalidOrder(f"{exchange_id} paper: lado inválido {side}")
+
+        if not fills:
+            self.stats['rejected_orders'] += 1
+            raise ccxt.InvalidOrder(f"{exchange_id} paper: sin liquidez para {side} {symbol}")
+        if spent < PAPER_MIN_ORDER_USDT:
+            self.stats['rejected_orders'] += 1
+            raise ccxt.InvalidOrder(f"{exchange_id} paper: costo {spent:.4f} menor al mínimo {PAPER_MIN_ORDER_USDT}")
+        if account.get(required_code, 0.0) < required - 1e-12:
+            self.stats['rejected_orders'] += 1
+            raise ccxt.InsufficientFunds(
+                f"{exchange_id} paper: saldo {required_code} insuficiente "
+                f"({account.get(required_code, 0.0):.8f} < {required:.8f})"
+            )
+
+        self._consume(book['asks'] if side == 'buy' else book['bids'], fills)
+        if side == 'buy':
+            account[quote] -= spent + fee
+            account[base] += filled
+        else:
+            account[base] -= filled
+            account[quote] += spent - fee
+
+        requested = amount if amount is not None else filled
+        remaining = max(requested - filled, 0.0) if amount is not None else 0.0
+        self.stats['orders'] += 1
+        self.stats['levels_walked'] += len(fills)
+        self.stats['partial_fills'] += int(remaining > 0)
+        self.stats['volume_usdt'] += spent
+        self.stats['fees_usdt'] += fee
+
+        timestamp = _now_ms()
+        order_id = str(next(self._ids))
+        return {
+            'id': order_id,
+            'clientOrderId': None,
+            'timestamp': timestamp,
+            'datetime': _iso8601(timestamp),
+            'lastTradeTimestamp': timestamp,
+            'symbol': symbol,
+            'type': 'market',
+            'side': side,
+            'price': spent / filled,
+            'average': spent / filled,
+            'amount': requested,
+            'filled': filled,
+            'remaining': remaining,
+            'cost': spent,
+            'status': 'closed',
+            'fee': {'cost': fee, 'currency': quote, 'rate': PAPER_TAKER_FEE},
+            'trades': [
+                {'id': f"{order_id}-{index}", 'order': order_id, 'symbol': symbol, 'side': side,
+                 'price': price, 'amount': take, 'cost': price * take, 'timestamp': timestamp}
+                for index, price, take in fills
+            ],
+            'info': {'paper': True}
+        }
+
+    # Redes, depósitos y retiros
+
+    def _build_networks(self) -> Dict[str, Dict[str, Dict]]:
+        networks = {code: {name: dict(info) for name, info in nets.items()} for code, nets in PAPER_NETWORKS.items()}
+        prices = {symbol.split('/')[0]: price for symbol, price in self.reference.items()}
+        for code in self.currencies():
+            if code not in networks:
+                networks[code] = {code: {
+                    'fee': PAPER_DEFAULT_WITHDRAW_FEE_USDT / prices.get(code, 1.0),
+                    'delay_s': PAPER_DEFAULT_WITHDRAW_DELAY_S
+                }}
+        return networks
+
+    def deposit_address(self, exchange_id: str, currency: str, network: str = None) -> Dict:
+        if currency not in self.networks:
+            raise ccxt.BadRequest(f"{exchange_id} paper: moneda desconocida {currency}")
+
+        address = f"paper-{exchange_id}-{currency.lower()}"
+        self.deposit_addresses[address] = (exchange_id, currency)
+        return {
+            'currency': currency,
+            'address': address,
+            'tag': None,
+            'network': network or next(iter(self.networks[currency])),
+            'info': {'paper': True}
+        }
+
+    def withdraw(self, exchange_id: str, currency: str, amount: float, address: str, network: str = None) -> Dict:
+        """Debita el retiro y acredita amount - fee en el exchange dueño de la dirección tras la demora de la red."""
+        destination = self.deposit_addresses.get(address)
+        if destination is None or destination[1] != currency:
+            raise ccxt.InvalidAddress(f"{exchange_id} paper: dirección {address} no válida para {currency}")
+
+        networks = self.networks.get(currency, {})
+        if network is None:
+            network = min(networks, key=lambda name: networks[name]['fee'])
+        info = networks.get(network)
+        if info is None:
+            raise ccxt.BadRequest(f"{exchange_id} paper: red {network} no soportada para {currency}")
+
+        fee = info['fee']
+        if amount <= fee:
+            raise ccxt.BadRequest(f"{exchange_id} paper: el monto {amount} no cubre la fee de red {fee}")
+
+        account = self.account(exchange_id)
+        if account.get(currency, 0.0) < amount - 1e-12:
+            raise ccxt.InsufficientFunds(
+                f"{exchange_id} paper: saldo {currency} insuficiente para retirar ({account.get(currency, 0.0):.8f} < {amount:.8f})"
+            )
+
+        account[currency] -= amount
+        self.stats['withdrawals'] += 1
+
+        timestamp = _now_ms()
+        transaction = {
+            'id': f"w{next(self._ids)}",
+            'txid': f"0xpaper{timestamp:x}",
+            'timestamp': timestamp,
+            'datetime': _iso8601(timestamp),
+            'network': network,
+            'address': address,
+            'addressTo': address,
+            'tag': None,
+            'type': 'withdrawal',
+            'amount': amount,
+            'currency': currency,
+            'status': 'pending',
+            'fee': {'currency': currency, 'cost': fee},
+            'info': {'paper': True, 'to_exchange': destination[0]}
+        }
+
+        delay = info.get('delay_s', 0) * PAPER_WITHDRAWAL_DELAY_SCALE
+        if delay <= 0:
+            self._credit_deposit(transaction['id'], destination[0], currency, amount - fee)
+            transaction['status'] = 'ok'
+        else:
+            self.pending_deposits[transaction['id']] = asyncio.get_running_loop().call_later(
+                delay, self._credit_deposit, transaction['id'], destination[0], currency, amount - fee
+            )
+        return transaction
+
+    def _credit_deposit(self, transaction_id: str, exchange_id: str, currency: str, amount: float):
+        self.pending_deposits.pop(transaction_id, None)
+        account = self.account(exchange_id)
+        account[currency] = account.get(currency, 0.0) + amount
+        self.stats['deposits_credited'] += 1
+
+    def close(self):
+        """Cancela los depósitos en tránsito (sus fondos quedan fuera de los balances)."""
+        for handle in self.pending_deposits.values():
+            handle.cancel()
+        self.pending_deposits.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'pending_deposits': len(self.pending_deposits),
+            'valuation_usdt': self.valuation_usdt(),
+            'exchanges': {exchange_id: exchange.stats for exchange_id, exchange in self.exchanges.items()}
+        }
+
+class _PaperExchangeBase:
+    """Atributos de instancia CCXT que lee ExchangeManager (has, rateLimit, markets, currencies)."""
+
+    def __init__(self, exchange_id: str):
+        self.id = exchange_id
+        self.has = dict(PAPER_HAS)
+        self.rateLimit = PAPER_RATE_LIMIT_MS
+        self.timeout = REQUEST_TIMEOUT * 1000  # ms, como en CCXT
+        self.markets: Dict[str, Dict] = {}
+        self.symbols: List[str] = []
+        self.currencies: Dict[str, Dict] = {}
+
+    def set_markets(self, markets: Dict[str, Dict], currencies: Dict[str, Dict] = None):
+        self.markets = markets
+        self.symbols = sorted(markets.keys())
+        if currencies is not None:
+            self.currencies = currencies
+        return self.markets
+
+    async def close(self):
+        pass
+
+class PaperExchange(_PaperExchangeBase):
+    """Exchange simulado sobre un PaperMarket, con la firma de los métodos de CCXT.
+
+    Cada llamada espera la latencia del carril del método (el mismo de
+    request_scheduler) y puede fallar con ExchangeNotAvailable o RequestTimeout
+    según el perfil: PAPER_* global, overrides del PaperMarket y luego
+    PAPER_EXCHANGE_PROFILES del exchange. set_profile lo cambia en caliente.
+    """
+
+    def __init__(self, exchange_id: str, market: PaperMarket):
+        super().__init__(exchange_id)
+        self.logger = logging.getLogger('V3.PaperExchange')
+        self.market = market
+        self.rng = random.Random(f"{market.seed}:{exchange_id}")
+        self.profile = _default_profile()
+        self.set_profile(**market.profile)
+        self.set_profile(**PAPER_EXCHANGE_PROFILES.get(exchange_id, {}))
+
+        self.stats = {'calls': 0, 'injected_failures': 0, 'injected_timeouts': 0}
+        market.exchanges[exchange_id] = self
+
+    def set_profile(self, **overrides):
+        """Ajusta latencia (latency_ms por carril, latency_scale, jitter) y tasas de fallo."""
+        for key, value in overrides.items():
+            if key == 'latency_ms':
+                self.profile['latency_ms'].update(value)
+            else:
+                self.profile[key] = value
+
+    async def _simulate_call(self, method: str):
+        self.stats['calls'] += 1
+        profile = self.profile
+
+        latency_ms = profile['latency_ms'].get(get_method_lane(method), 0) * profile['latency_scale']
+        if latency_ms > 0:
+            jitter = profile['jitter']
+            await asyncio.sleep(latency_ms * self.rng.uniform(1 - jitter, 1 + jitter) / 1000)
+
+        roll = self.rng.random()
+        if roll < profile['timeout_rate']:
+            self.stats['injected_timeouts'] += 1
+            await asyncio.sleep(self.timeout / 1000)
+            raise ccxt.RequestTimeout(f"{self.id} paper: timeout inyectado en {method}")
+        if roll < profile['timeout_rate'] + profile['failure_rate']:
+            self.stats['injected_failures'] += 1
+            raise ccxt.ExchangeNotAvailable(f"{self.id} paper: fallo inyectado en {method}")
+
+    # Metadatos
+
+    async def load_markets(self, reload: bool = False) -> Dict[str, Dict]:
+        if self.markets and not reload:
+            return self.markets
+        await self._simulate_call('load_markets')
+        return self.set_markets(self._build_markets(), self._build_currencies())
+
+    def _build_markets(self) -> Dict[str, Dict]:
+        markets = {}
+        for symbol, price in self.market.reference.items():
+            base, quote = symbol.split('/')
+            markets[symbol] = {
+                'id': f"{base}{quote}",
+                'symbol': symbol,
+                'base': base,
+                'quote': quote,
+                'baseId': base,
+                'quoteId': quote,
+                'active': True,
+                'type': 'spot',
+                'spot': True,
+                # Solo hay órdenes de mercado: maker = taker
+                'taker': PAPER_TAKER_FEE,
+                'maker': PAPER_TAKER_FEE,
+                'precision': {'amount': 1e-8, 'price': 1e-8},
+                'limits': {
+                    'amount': {'min': PAPER_MIN_ORDER_USDT / price, 'max': None},
+                    'cost': {'min': PAPER_MIN_ORDER_USDT, 'max': None}
+                },
+                'info': {'paper': True}
+            }
+        return markets
+
+    def _build_currencies(self) -> Dict[str, Dict]:
+        currencies = {}
+        for code, networks in self.market.networks.items():
+            currencies[code] = {
+                'id': code,
+                'code': code,
+                'name': code,
+                'active': True,
+                'deposit': True,
+                'withdraw': True,
+                'fee': min(info['fee'] for info in networks.values()),
+                'precision': 1e-8,
+                'networks': {
+                    name: {
+                        'id': name,
+                        'network': name,
+                        'active': True,
+                        'deposit': True,
+                        'withdraw': True,
+                        'fee': info['fee'],
+                        'precision': 1e-8,
+                        'limits': {'withdraw': {'min': info['fee'] * 2, 'max': None}},
+                        'info': {'delay_s': info.get('delay_s', 0)}
+                    }
+                    for name, info in networks.items()
+                },
+                'info': {'paper': True}
+            }
+        return currencies
+
+    async def fetch_time(self) -> int:
+        await self._simulate_call('fetch_time')
+        return _now_ms()
+
+    async def fetch_status(self) -> Dict:
+        await self._simulate_call('fetch_status')
+        return {'status': 'ok', 'updated': _now_ms(), 'eta': None, 'url': None, 'info': {'paper': True}}
+
+    async def fetch_trading_fees(self, symbols: List[str] = None, params: Dict = None) -> Dict[str, Dict]:
+        await self._simulate_call('fetch_trading_fees')
+        return {
+            symbol: {'symbol': symbol, 'maker': PAPER_TAKER_FEE, 'taker': PAPER_TAKER_FEE,
+                     'percentage': True, 'tierBased': False, 'info': {}}
+            for symbol in (symbols or self.market.symbols())
+        }
+
+    async def fetch_currencies(self, params: Dict = None) -> Dict[str, Dict]:
+        await self._simulate_call('fetch_currencies')
+        return self._build_currencies()
+
+    async def fetch_deposit_withdraw_fees(self, codes: List[str] = None, params: Dict = None) -> Dict[str, Dict]:
+        await self._simulate_call('fetch_deposit_withdraw_fees')
+        fees = {}
+        for code, networks in self.market.networks.items():
+            if codes and code not in codes:
+                continue
+            fees[code] = {
+                'withdraw': {'fee': min(info['fee'] for info in networks.values()), 'percentage': False},
+                'deposit': {'fee': 0.0, 'percentage': False},
+                'networks': {
+                    name: {
+                        'withdraw': {'fee': info['fee'], 'percentage': False},
+                        'deposit': {'fee': 0.0, 'percentage': False}
+                    }
+                    for name, info in networks.items()
+                },
+                'info': {}
+            }
+        return fees
+
+    # Precios
+
+    def _ticker(self, symbol: str) -> Dict:
+        book = self.market.order_book(self.id, symbol)
+        timestamp = _now_ms()
+        bid, bid_volume = book['bids'][0] if book['bids'] else (None, None)
+        ask, ask_volume = book['asks'][0] if book['asks'] else (None, None)
+        last = self.market.mid_price(self.id, symbol)
+        return {
+            'symbol': symbol,
+            'timestamp': timestamp,
+            'datetime': _iso8601(timestamp),
+            'bid': bid,
+            'bidVolume': bid_volume,
+            'ask': ask,
+            'askVolume': ask_volume,
+            'last': last,
+            'close': last,
+            'info': {'paper': True}
+        }
+
+    async def fetch_ticker(self, symbol: str, params: Dict = None) -> Dict:
+        await self._simulate_call('fetch_ticker')
+        return self._ticker(symbol)
+
+    async def fetch_tickers(self, symbols: List[str] = None, params: Dict = None) -> Dict[str, Dict]:
+        await self._simulate_call('fetch_tickers')
+        return {
+            symbol: self._ticker(symbol)
+            for symbol in (symbols or self.market.symbols()) if symbol in self.market.reference
+        }
+
+    async def fetch_order_book(self, symbol: str, limit: int = None, params: Dict = None) -> Dict:
+        await self._simulate_call('fetch_order_book')
+        book = self.market.order_book(self.id, symbol)
+        timestamp = _now_ms()
+        return {
+            'symbol': symbol,
+            'bids': [list(level) for level in book['bids'][:limit]],
+            'asks': [list(level) for level in book['asks'][:limit]],
+            'timestamp': timestamp,
+            'datetime': _iso8601(timestamp),
+            'nonce': self.market.tick
+        }
+
+    # Trading
+
+    async def fetch_balance(self, params: Dict = None) -> Dict:
+        await self._simulate_call('fetch_balance')
+        account = self.market.account(self.id)
+        balance = {'info': {'paper': True}, 'free': {}, 'used': {}, 'total': {}}
+        for code, amount in account.items():
+            balance[code] = {'free': amount, 'used': 0.0, 'total': amount}
+            balance['free'][code] = amount
+            balance['used'][code] = 0.0
+            balance['total'][code] = amount
+        return balance
+
+    async def create_order(self, symbol: str, type: str, side: str, amount: float = None, price: float = None, params: Dict = None) -> Dict:
+        await self._simulate_call('create_order')
+        return self._create_market_order(symbol, type, side, amount, params)
+
+    async def create_market_buy_order(self, symbol: str, amount: float = None, price: Any = None, cost: float = None, params: Dict = None) -> Dict:
+        """Compra de mercado por cantidad, o por costo en quote (cost o params['cost'] / 'quoteOrderQty')."""
+        await self._simulate_call('create_market_buy_order')
+        if isinstance(price, dict):
+            # Firma de CCXT: (symbol, amount, params)
+            params = price
+        params = params or {}
+        if cost is None:
+            cost = params.get('cost', params.get('quoteOrderQty'))
+        return self.market.execute_market_order(self.id, symbol, 'buy', amount=amount if cost is None else None, cost=cost)
+
+    async def create_market_sell_order(self, symbol: str, amount: float, params: Dict = None) -> Dict:
+        await self._simulate_call('create_market_sell_order')
+        return self._create_market_order(symbol, 'market', 'sell', amount, params)
+
+    def _create_market_order(self, symbol: str, type: str, side: str, amount: float, params: Dict = None) -> Dict:
+        if type != 'market':
+            raise ccxt.NotSupported(f"{self.id} paper: solo órdenes de mercado")
+        cost = (params or {}).get('cost')
+        return self.market.execute_market_order(self.id, symbol, side, amount=amount if cost is None else None, cost=cost)
+
+    # Depósitos y retiros
+
+    async def fetch_deposit_address(self, code: str, params: Dict = None) -> Dict:
+        await self._simulate_call('fetch_deposit_address')
+        return self.market.deposit_address(self.id, code, (params or {}).get('network'))
+
+    async def withdraw(self, code: str, amount: float, address: str, tag: str = None, params: Dict = None) -> Dict:
+        await self._simulate_call('withdraw')
+        return self.market.withdraw(self.id, code, amount, address, (params or {}).get('network'))
+
+class RemotePaperExchange(_PaperExchangeBase):
+    """Cliente de un PaperExchangeServer: mismos métodos, ejecutados en el servidor (estado compartido)."""
+
+    def __init__(self, exchange_id: str, url: str):
+        super().__init__(exchange_id)
+        self.url = url.rstrip('/')
+        for method in PAPER_API_METHODS:
+            if method != 'load_markets':
+                setattr(self, method, self._remote_method(method))
+
+    def _remote_method(self, method: str):
+        async def call(*args, **kwargs):
+            return await self._request(method, args, kwargs)
+        # ExchangeManager clasifica las llamadas por __name__ (carril del scheduler y circuit breaker)
+        call.__name__ = method
+        return call
+
+    async def _request(self, method: str, args: tuple, kwargs: dict) -> Any:
+        session = http_pool.get_session('paper_exchange')
+        try:
+            async with session.post(
+                f"{self.url}/{self.id}/{method}",
+                json={'args': list(args), 'kwargs': kwargs},
+                timeout=aiohttp.ClientTimeout(total=self.timeout / 1000)
+            ) as response:
+                body = await response.json()
+        except asyncio.TimeoutError:
+            raise ccxt.RequestTimeout(f"{self.id} paper: timeout llamando a {self.url}")
+        except aiohttp.ClientError as e:
+            raise ccxt.NetworkError(f"{self.id} paper: {e}")
+
+        error = body.get('error')
+        if error:
+            error_class = getattr(ccxt, error.get('type', ''), None)
+            if not (isinstance(error_class, type) and issubclass(error_class, ccxt.BaseError)):
+                error_class = ccxt.ExchangeError
+            raise error_class(error.get('message', ''))
+        return body.get('result')
+
+    async def load_markets(self, reload: bool = False) -> Dict[str, Dict]:
+        if self.markets and not reload:
+            return self.markets
+        markets = await self._request('load_markets', (reload,), {})
+        currencies = await self._request('fetch_currencies', (), {})
+        return self.set_markets(markets, currencies)
+
+def create_paper_exchange(exchange_id: str, market: PaperMarket = None):
+    """Instancia paper para ExchangeManager: remota si PAPER_EXCHANGE_URL está definido."""
+    if PAPER_EXCHANGE_URL:
+        return RemotePaperExchange(exchange_id, PAPER_EXCHANGE_URL)
+    return PaperExchange(exchange_id, market)
+
+class PaperExchangeServer:
+    """Expone un PaperMarket por HTTP: POST /{exchange_id}/{método} con {'args': [...], 'kwargs': {...}}."""
+
+    def __init__(self, market: PaperMarket):
+        self.logger = logging.getLogger('V3.PaperExchangeServer')
+        self.market = market
+        self.exchanges: Dict[str, PaperExchange] = {}
+        self.app = web.Application()
+        self.app.router.add_post('/{exchange_id}/{method}', self._handle)
+        self.app.router.add_get('/stats', self._handle_stats)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        exchange_id = request.match_info['exchange_id']
+        method = request.match_info['method']
+        if method not in PAPER_API_METHODS:
+            return web.json_response(
+                {'error': {'type': 'NotSupported', 'message': f"Método no soportado: {method}"}}, status=404
+            )
+
+        exchange = self.exchanges.get(exchange_id)
+        if exchange is None:
+            exchange = self.exchanges[exchange_id] = PaperExchange(exchange_id, self.market)
+
+        try:
+            body = await request.json() if request.can_read_body else {}
+            result = await getattr(exchange, method)(*body.get('args', []), **body.get('kwargs', {}))
+            return web.json_response({'result': result})
+        except ccxt.BaseError as e:
+            return web.json_response({'error': {'type': type(e).__name__, 'message': str(e)}}, status=400)
+        except Exception as e:
+            self.logger.error(f"Error en {exchange_id}.{method}: {e}")
+            return web.json_response({'error': {'type': 'ExchangeError', 'message': str(e)}}, status=500)
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.market.get_stats())
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor HTTP local de exchanges simulados (paper)')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8790, help='Puerto (default: 8790)')
+    parser.add_argument('--seed', type=int, default=PAPER_SEED, help=f'Semilla de precios y fallos (default: {PAPER_SEED})')
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                       help='Multiplicador de PAPER_LATENCY_MS (0 = sin latencia)')
+    parser.add_argument('--failure-rate', type=float, default=PAPER_FAILURE_RATE,
+                       help='Probabilidad de ExchangeNotAvailable por llamada')
+    parser.add_argument('--timeout-rate', type=float, default=PAPER_TIMEOUT_RATE,
+                       help='Probabilidad de RequestTimeout por llamada')
+    parser.add_argument('--log-level', type=str, default='INFO',
+                       choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                       help='Nivel de logging (default: INFO)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('V3.PaperExchangeServer')
+
+    market = PaperMarket(seed=args.seed, profile={
+        'latency_scale': args.latency_scale,
+        'failure_rate': args.failure_rate,
+        'timeout_rate': args.timeout_rate
+    })
+
+    async def run():
+        server = PaperExchangeServer(market)
+        runner = web.AppRunner(server.app)
+        await runner.setup()
+        await web.TCPSite(runner, args.host, args.port).start()
+        logger.info(f"Exchange paper escuchando en http://{args.host}:{args.port} ({len(market.symbols())} símbolos)")
+
+        try:
+            await asyncio.Event().wait()
+        finally:
+            market.close()
+            await runner.cleanup()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# Simos/V3/paper_load_test.py
+
+"""
+Prueba de carga y correctitud offline: ciclos completos de TradingLogic
+(validación, datos de mercado, decisión, transferencias, compra y venta)
+contra exchanges simulados (paper_exchange.py), sin red ni fondos reales.
+Uso: python paper_load_test.py [--cycles 2000] [--concurrency 8] [--latency-scale 0] [--failure-rate 0.05]
+     python paper_load_test.py --via-scheduler [--burst 20]  (recorrido en vivo: Sebo -> scheduler -> TradingLogic)
+
+Las oportunidades se arman como las de Sebo a partir de los order books simulados
+(compra en el ask más bajo, venta en el bid más alto). Todo lo que escribe V3
+(estado, logs CSV, snapshots) queda en --workdir.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from config_v3 import SIMULATION_MODE, SUPPORTED_EXCHANGES, PAPER_SEED, PAPER_FAILURE_RATE, PAPER_TIMEOUT_RATE
+from paper_exchange import PaperMarket
+from exchange_manager import ExchangeManager
+from data_persistence import DataPersistence
+from trading_logic import TradingLogic
+from ai_model import ArbitrageAIModel
+from http_pool import http_pool
+from main_v3 import CryptoArbitrageV3
+from tracing import tracer
+
+def build_opportunity(market, symbol, exchanges):
+    """Item con el formato de top_20_data para el mejor spread actual del símbolo."""
+    quotes = {exchange_id: market.top_of_book(exchange_id, symbol) for exchange_id in exchanges}
+    buy_exchange = min(quotes, key=lambda exchange_id: quotes[exchange_id][0] or float('inf'))
+    sell_exchange = max(
+        (exchange_id for exchange_id in quotes if exchange_id != buy_exchange),
+        key=lambda exchange_id: quotes[exchange_id][1] or 0.0
+    )
+    buy_price = quotes[buy_exchange][0]
+    sell_price = quotes[sell_exchange][1]
+    return {
+        'analysis_id': f"{random.getrandbits(96):024x}",
+        'symbol': symbol,
+        'symbol_name': symbol.split('/')[0],
+        'exchange_min_id': buy_exchange,
+        'exchange_max_id': sell_exchange,
+        'price_at_exMin_to_buy_asset': buy_price,
+        'price_at_exMax_to_sell_asset': sell_price,
+        'percentage_difference': f"{(sell_price - buy_price) / buy_price * 100:.2f}%",
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+    }
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+async def run_load_test(args):
+    market = PaperMarket(seed=args.seed, profile={
+        'latency_scale': args.latency_scale,
+        'failure_rate': args.failure_rate,
+        'timeout_rate': args.timeout_rate
+    })
+    exchanges = args.exchanges.split(',') if args.exchanges else SUPPORTED_EXCHANGES
+
+    exchange_manager = ExchangeManager(paper_market=market)
+    data_persistence = DataPersistence()
+    trading_logic = TradingLogic(exchange_manager, data_persistence, ArbitrageAIModel())
+    trading_logic.max_concurrent_operations = args.concurrency
+
+    await exchange_manager.initialize()
+    await data_persistence.initialize()
+    await trading_logic.initialize()
+    # El catálogo de tarifas se carga en background; la primera oportunidad lo necesita completo
+    await exchange_manager.fee_catalogue.refresh_all(exchanges)
+    await trading_logic.start_trading()
+
+    for exchange_id in exchanges:
+        market.account(exchange_id)
+    initial_valuation = market.valuation_usdt()
+
+    outcomes = Counter()
+    cycle_ms = []
+    reported_profit = 0.0
+    remaining = iter(range(args.cycles))
+    rng = random.Random(args.seed)
+    symbols = market.symbols()
+
+    async def worker():
+        nonlocal reported_profit
+        for _ in remaining:
+            opportunity = build_opportunity(market, rng.choice(symbols), exchanges)
+            start = time.perf_counter()
+            result = await trading_logic.process_arbitrage_opportunity(opportunity)
+            cycle_ms.append((time.perf_counter() - start) * 1000)
+            outcomes[result.get('decision_outcome', 'UNKNOWN')] += 1
+            if result.get('success'):
+                reported_profit += result.get('net_profit_usdt', 0.0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    await trading_logic.stop_trading()
+    await trading_logic.cleanup()
+    await data_persistence.cleanup()
+    stats = market.get_stats()
+    negative = [
+        f"{exchange_id}:{code}={amount:.8f}"
+        for exchange_id, account in market.balances.items()
+        for code, amount in account.items() if amount < -1e-9
+    ]
+    await exchange_manager.cleanup()
+    await http_pool.close()
+
+    executed = sum(count for outcome, count in outcomes.items() if outcome.startswith('EXECUTED'))
+    print(f"\nCiclos: {args.cycles} en {elapsed:.2f}s ({args.cycles / elapsed * 60:.0f} ciclos/min, "
+          f"{executed / elapsed * 60:.0f} ejecuciones/min)")
+    print(f"Latencia por ciclo: p50 {percentile(cycle_ms, 0.5):.1f} ms, p95 {percentile(cycle_ms, 0.95):.1f} ms, "
+          f"máx {max(cycle_ms, default=0.0):.1f} ms")
+
+    print(f"\n{'Resultado':<28} {'Ciclos':>8}")
+    for outcome, count in outcomes.most_common():
+        print(f"{outcome:<28} {count:>8}")
+
+    print(f"\nÓrdenes: {stats['orders']} ({stats['partial_fills']} parciales, {stats['rejected_orders']} rechazadas, "
+          f"{stats['levels_walked'] / max(stats['orders'], 1):.1f} niveles por orden)")
+    print(f"Retiros: {stats['withdrawals']} ({stats['deposits_credited']} acreditados, "
+          f"{stats['pending_deposits']} en tránsito al cerrar)")
+    print(f"Volumen: {stats['volume_usdt']:.2f} USDT, comisiones de trading {stats['fees_usdt']:.2f} USDT")
+    failures = sum(exchange['injected_failures'] for exchange in stats['exchanges'].values())
+    timeouts = sum(exchange['injected_timeouts'] for exchange in stats['exchanges'].values())
+    calls = sum(exchange['calls'] for exchange in stats['exchanges'].values())
+    print(f"Llamadas a exchanges: {calls} ({failures} fallos y {timeouts} timeouts inyectados)")
+
+    # La ganancia reportada usa el costo bruto de la venta; los balances incluyen comisiones y fees de red
+    print(f"\nGanancia reportada por TradingLogic: {reported_profit:.4f} USDT")
+    print(f"Variación de la valuación de balances: {stats['valuation_usdt'] - initial_valuation:.4f} USDT "
+          f"(incluye el movimiento de precios de referencia)")
+    print(f"Balances negativos: {', '.join(negative) if negative else 'ninguno'}")
+    print(f"Directorio de trabajo: {os.getcwd()}")
+
+    return 1 if negative else 0
+
+async def run_pipeline_test(args):
+    """Mismo camino que en vivo: handler de spot-arb de Sebo, ráfagas del OpportunityScheduler,
+    TradingLogic y broadcast/registro en main_v3. Falla si ninguna oportunidad llega a despacharse.
+    """
+    market = PaperMarket(seed=args.seed, profile={
+        'latency_scale': args.latency_scale,
+        'failure_rate': args.failure_rate,
+        'timeout_rate': args.timeout_rate
+    })
+    exchanges = args.exchanges.split(',') if args.exchanges else SUPPORTED_EXCHANGES
+
+    os.makedirs('logs', exist_ok=True)  # setup_logging abre LOG_FILE_PATH
+    app = CryptoArbitrageV3(exchange_manager=ExchangeManager(paper_market=market))
+    logging.getLogger('V3').setLevel(getattr(logging, args.log_level))
+
+    # Sin servidor UI, Sebo ni métricas: solo los componentes del recorrido de una oportunidad
+    await app.data_persistence.initialize()
+    await app.exchange_manager.initialize()
+    await app.trading_logic.initialize()
+    await app.ai_model.start_inference_service()
+    await app.opportunity_scheduler.start()
+    await app.exchange_manager.fee_catalogue.refresh_all(exchanges)
+    await app.trading_logic.start_trading()
+
+    scheduler = app.opportunity_scheduler
+    rng = random.Random(args.seed)
+    symbols = market.symbols()
+
+    start = time.perf_counter()
+    for sent in range(0, args.cycles, args.burst):
+        for _ in range(min(args.burst, args.cycles - sent)):
+            await app.sebo_connector._on_spot_arb_data(build_opportunity(market, rng.choice(symbols), exchanges))
+        await asyncio.sleep(scheduler.burst_window)
+
+    while scheduler._burst or scheduler.in_flight or (scheduler.ready_queue and not scheduler.ready_queue.empty()):
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+
+    scheduler_stats = scheduler.get_stats()
+    trading_stats = app.trading_logic.get_trading_stats()
+    end_to_end = tracer.get_stats()['stages'].get('end_to_end', {})
+
+    await app.trading_logic.stop_trading()
+    await scheduler.stop()
+    await app.trading_logic.cleanup()
+    await app.ai_model.stop_inference_service()
+    await app.data_persistence.cleanup()
+    negative = [
+        f"{exchange_id}:{code}={amount:.8f}"
+        for exchange_id, account in market.balances.items()
+        for code, amount in account.items() if amount < -1e-9
+    ]
+    await app.exchange_manager.cleanup()
+    await http_pool.close()
+
+    print(f"\nEventos spot-arb: {scheduler_stats['received']} en {elapsed:.2f}s "
+          f"({scheduler_stats['deduplicated']} deduplicados, {scheduler_stats['cycles']} ráfagas)")
+    print(f"Despachados: {scheduler_stats['dispatched']}, completados: {scheduler_stats['completed']}, "
+          f"errores: {scheduler_stats['errors']}")
+    print(f"Descartados: rank {scheduler_stats['dropped_rank']}, viejos {scheduler_stats['dropped_stale']}, "
+          f"deadline {scheduler_stats['dropped_deadline']}")
+    print(f"Espera en cola: {scheduler_stats['avg_wait_ms']:.1f} ms promedio")
+    print(f"Trazas de punta a punta: {end_to_end.get('count', 0)} "
+          f"(p50 {end_to_end.get('p50_ms', 0.0):.1f} ms, p95 {end_to_end.get('p95_ms', 0.0):.1f} ms)")
+    print(f"Operaciones: {trading_stats['operations_count']} ({trading_stats['successful_operations']} exitosas, "
+          f"ganancia {trading_stats['total_profit_usdt']:.4f} USDT)")
+    print(f"Balances negativos: {', '.join(negative) if negative else 'ninguno'}")
+    print(f"Directorio de trabajo: {os.getcwd()}")
+
+    if not scheduler_stats['dispatched']:
+        print("Ninguna oportunidad llegó a TradingLogic")
+        return 1
+    return 1 if negative else 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Ciclos completos de ejecución contra exchanges simulados')
+    parser.add_argument('--cycles', type=int, default=2000, help='Oportunidades a procesar (default: 2000)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                       help='Oportunidades en paralelo; también limita max_concurrent_operations (default: 8)')
+    parser.add_argument('--exchanges', type=str, default=None,
+                       help='Exchanges separados por coma (default: SUPPORTED_EXCHANGES)')
+    parser.add_argument('--seed', type=int, default=PAPER_SEED, help=f'Semilla (default: {PAPER_SEED})')
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                       help='Multiplicador de PAPER_LATENCY_MS (0 = sin latencia, mide solo CPU)')
+    parser.add_argument('--failure-rate', type=float, default=PAPER_FAILURE_RATE,
+                       help='Probabilidad de ExchangeNotAvailable por llamada')
+    parser.add_argument('--timeout-rate', type=float, default=PAPER_TIMEOUT_RATE,
+                       help='Probabilidad de RequestTimeout por llamada (espera REQUEST_TIMEOUT)')
+    parser.add_argument('--via-scheduler', action='store_true',
+                       help='Enviar las oportunidades por el handler de Sebo y el OpportunityScheduler de main_v3')
+    parser.add_argument('--burst', type=int, default=20,
+                       help='Eventos spot-arb por ráfaga con --via-scheduler (default: 20)')
+    parser.add_argument('--workdir', type=str, default=None,
+                       help='Directorio para estado, logs y snapshots (default: uno temporal)')
+    parser.add_argument('--log-level', type=str, default='WARNING',
+                       choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                       help='Nivel de logging (default: WARNING)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if SIMULATION_MODE:
+        print("SIMULATION_MODE está activo: TradingLogic no llamaría a los exchanges. Desactívelo en config_v3.py")
+        return 1
+
+    # Las rutas de config_v3 son relativas: así nada toca el estado ni los logs reales
+    workdir = args.workdir or tempfile.mkdtemp(prefix='paper_load_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+    return asyncio.run(run_pipeline_test(args) if args.via_scheduler else run_load_test(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+# Simos/V3/request_scheduler.py
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from config_v3 import (
+    REQUEST_DEFAULT_RATE_LIMIT_MS, REQUEST_BUCKET_BURST_S, REQUEST_MAX_CONCURRENCY,
+    REQUEST_LANE_RESERVE, REQUEST_LANE_SLOT_RESERVE, REQUEST_METHOD_COSTS, REQUEST_COST_OVERRIDES
+)
+from metrics import registry
+
+# Carriles en orden de prioridad
+LANES = ['orders', 'withdrawals', 'prices', 'metadata']
+_LANE_PRIORITY = {lane: index for index, lane in enumerate(LANES)}
+
+METHOD_LANES = {
+    'create_order': 'orders',
+    'create_market_buy_order': 'orders',
+    'create_market_sell_order': 'orders',
+    'cancel_order': 'orders',
+    'fetch_order': 'orders',
+    'withdraw': 'withdrawals',
+    'fetch_deposit_address': 'withdrawals',
+    'fetch_ticker': 'prices',
+    'fetch_tickers': 'prices',
+    'fetch_order_book': 'prices',
+    'fetch_balance': 'prices'
+}
+
+# Carriles de solo lectura: llamadas idénticas en vuelo se comparten
+_COALESCING_LANES = {'prices', 'metadata'}
+
+REQUEST_QUEUE_WAIT = registry.histogram(
+    'v3_exchange_request_queue_wait_seconds', 'Espera en el scheduler antes de llamar al exchange', ['exchange', 'lane']
+)
+REQUEST_QUEUE_DEPTH = registry.gauge('v3_exchange_request_queue_depth', 'Requests en cola', ['exchange', 'lane'])
+REQUEST_COALESCED = registry.counter(
+    'v3_exchange_requests_coalesced_total', 'Requests atendidas por una llamada idéntica en vuelo', ['exchange', 'lane']
+)
+REQUEST_ABANDONED = registry.counter(
+    'v3_exchange_requests_abandoned_total', 'Requests descartadas en cola porque nadie las esperaba', ['exchange', 'lane']
+)
+REQUEST_TOKENS = registry.gauge('v3_exchange_rate_tokens', 'Tokens disponibles en el bucket', ['exchange'])
+
+def get_method_lane(method: str) -> str:
+    """Carril de un método CCXT (lo no listado es metadata: fees, markets, estado)."""
+    return METHOD_LANES.get(method, 'metadata')
+
+def _freeze(value: Any) -> Any:
+    """Versión hasheable de argumentos (listas de símbolos, params) para agrupar llamadas."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+def _retrieve_exception(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()
+
+class TokenBucket:
+    """Token bucket en unidades de costo de CCXT: rateLimit ms por unidad."""
+
+    def __init__(self, rate_limit_ms: float, burst_s: float):
+        self.rate = 1000.0 / max(rate_limit_ms, 1.0)  # unidades por segundo
+        self.capacity = max(self.rate * burst_s, 1.0)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, cost: float, reserve: float) -> float:
+        """Segundos hasta poder gastar cost dejando reserve * capacity libres (0 = ya)."""
+        self.refill()
+        # Un costo mayor que el bucket se admite con el bucket lleno (queda en negativo)
+        needed = min(cost + reserve * self.capacity, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def consume(self, cost: float):
+        self.tokens -= cost
+
+class _Request:
+    __slots__ = (
+        'lane', 'method', 'cost', 'call', 'args', 'kwargs', 'future', 'enqueued_at', 'coalesce_key', 'waiters', 'started'
+    )
+
+    def __init__(self, lane, method, cost, call, args, kwargs, future, coalesce_key):
+        self.lane = lane
+        self.method = method
+        self.cost = cost
+        self.call = call
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.coalesce_key = coalesce_key
+        self.waiters = 1  # Solicitantes esperando el resultado (más de uno si se agrupó)
+        self.started = False
+
+class ExchangeRequestQueue:
+    """Cola con prioridad de un exchange: un dispatcher saca siempre el carril más prioritario
+    que el bucket admita y lanza la llamada sin esperar a que termine (hasta REQUEST_MAX_CONCURRENCY,
+    menos los slots que los carriles de menor prioridad dejan libres para órdenes y retiros).
+    """
+
+    def __init__(self, exchange_id: str, rate_limit_ms: float):
+        self.logger = logging.getLogger('V3.RequestScheduler')
+        self.exchange_id = exchange_id
+        self.bucket = TokenBucket(rate_limit_ms, REQUEST_BUCKET_BURST_S)
+        self.cost_overrides = REQUEST_COST_OVERRIDES.get(exchange_id, {})
+
+        self._heap: List[Tuple[int, int, _Request]] = []
+        self._sequence = itertools.count()
+        self._in_flight_keys: Dict[Tuple, _Request] = {}
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.in_flight = 0
+
+        self.stats = {lane: {'submitted': 0, 'dispatched': 0, 'coalesced': 0, 'abandoned': 0,
+                             'wait_ms_total': 0.0, 'max_wait_ms': 0.0}
+                      for lane in LANES}
+
+    def method_cost(self, method: str) -> float:
+        return self.cost_overrides.get(method, REQUEST_METHOD_COSTS.get(method, 1))
+
+    def submit(self, method: str, call: Callable, args: tuple, kwargs: dict) -> _Request:
+        lane = get_method_lane(method)
+        self.stats[lane]['submitted'] += 1
+
+        coalesce_key = None
+        if lane in _COALESCING_LANES:
+            try:
+                coalesce_key = (method, _freeze(args), _freeze(kwargs))
+                hash(coalesce_key)
+            except TypeError:
+                coalesce_key = None
+
+            existing = self._in_flight_keys.get(coalesce_key) if coalesce_key else None
+            if existing is not None:
+                existing.waiters += 1
+                self.stats[lane]['coalesced'] += 1
+                REQUEST_COALESCED.inc(exchange=self.exchange_id, lane=lane)
+                return existing
+
+        future = asyncio.get_running_loop().create_future()
+        # Si todos los que esperaban fueron cancelados, el error no debe quedar sin leer
+        future.add_done_callback(_retrieve_exception)
+        request = _Request(lane, method, self.method_cost(method), call, args, kwargs, future, coalesce_key)
+        if coalesce_key:
+            self._in_flight_keys[coalesce_key] = request
+
+        heapq.heappush(self._heap, (_LANE_PRIORITY[lane], next(self._sequence), request))
+        self._ensure_dispatcher()
+        self._wakeup.set()
+        return request
+
+    def abandon(self, request: _Request):
+        """Un solicitante dejó de esperar (cancelado): sin nadie más esperando, la request
+        que aún no salió se descarta y no gasta tokens ni slots (una orden o un retiro no se envía).
+        """
+        request.waiters -= 1
+        if request.waiters > 0 or request.started or request.future.done():
+            return
+
+        request.future.cancel()
+        self._forget(request)
+        self.stats[request.lane]['abandoned'] += 1
+        REQUEST_ABANDONED.inc(exchange=self.exchange_id, lane=request.lane)
+        self._wakeup.set()
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def _dispatch_loop(self):
+        while self._heap:
+            self._wakeup.clear()
+
+            _, _, request = self._heap[0]
+            if request.future.done():
+                # Cancelada por stop() o abandonada mientras esperaba
+                heapq.heappop(self._heap)
+                self._forget(request)
+                continue
+
+            # Un carril de menor prioridad no ocupa los slots reservados (las de mayor prioridad
+            # están antes en el heap, así que si esta no entra tampoco entraría ninguna otra)
+            if self.in_flight >= self._slot_limit(request.lane):
+                await self._wakeup.wait()
+                continue
+
+            delay = self.bucket.wait_time(request.cost, REQUEST_LANE_RESERVE.get(request.lane, 0.0))
+            if delay > 0:
+                # Una request más prioritaria que llegue mientras tanto despierta al dispatcher
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            self.bucket.consume(request.cost)
+            self._start(request)
+
+    @staticmethod
+    def _slot_limit(lane: str) -> int:
+        return max(REQUEST_MAX_CONCURRENCY - REQUEST_LANE_SLOT_RESERVE.get(lane, 0), 1)
+
+    def _start(self, request: _Request):
+        wait_s = time.monotonic() - request.enqueued_at
+        lane_stats = self.stats[request.lane]
+        lane_stats['dispatched'] += 1
+        lane_stats['wait_ms_total'] += wait_s * 1000
+        lane_stats['max_wait_ms'] = max(lane_stats['max_wait_ms'], wait_s * 1000)
+        REQUEST_QUEUE_WAIT.observe(wait_s, exchange=self.exchange_id, lane=request.lane)
+
+        self.in_flight += 1
+        request.started = True
+        asyncio.create_task(self._run(request))
+
+    async def _run(self, request: _Request):
+        try:
+            result = await request.call(*request.args, **request.kwargs)
+            if not request.future.done():
+                request.future.set_result(result)
+        except Exception as e:
+            if not request.future.done():
+                request.future.set_exception(e)
+        finally:
+            self.in_flight -= 1
+            self._forget(request)
+            self._wakeup.set()
+
+    def _forget(self, request: _Request):
+        if request.coalesce_key and self._in_flight_keys.get(request.coalesce_key) is request:
+            del self._in_flight_keys[request.coalesce_key]
+
+    async def stop(self):
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        for _, _, request in self._heap:
+            if not request.future.done():
+                request.future.cancel()
+        self._heap.clear()
+        self._in_flight_keys.clear()
+
+    def queue_depths(self) -> Dict[str, int]:
+        depths = {lane: 0 for lane in LANES}
+        for _, _, request in self._heap:
+            if not request.future.done():
+                depths[request.lane] += 1
+        return depths
+
+    def get_stats(self) -> Dict[str, Any]:
+        self.bucket.refill()
+        depths = self.queue_depths()
+        lanes = {}
+        for lane, lane_stats in self.stats.items():
+            dispatched = lane_stats['dispatched']
+            lanes[lane] = {
+                **lane_stats,
+                'queued': depths[lane],
+                'avg_wait_ms': lane_stats['wait_ms_total'] / dispatched if dispatched else 0.0
+            }
+        return {
+            'rate_per_s': self.bucket.rate,
+            'capacity': self.bucket.capacity,
+            'tokens': self.bucket.tokens,
+            'in_flight': self.in_flight,
+            'lanes': lanes
+        }
+
+class RequestScheduler:
+    """Scheduler de requests CCXT por exchange: token bucket derivado de rateLimit,
+    carriles con prioridad (órdenes > retiros > precios > fees/metadata) y
+    agrupación de llamadas de lectura idénticas en vuelo.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('V3.RequestScheduler')
+        self.queues: Dict[str, ExchangeRequestQueue] = {}
+        registry.register_collector(self._collect_metrics)
+
+    def register_exchange(self, exchange_id: str, rate_limit_ms: float = None):
+        """Crea (o ajusta) la cola de un exchange con su rateLimit publicado en CCXT."""
+        rate_limit_ms = rate_limit_ms or REQUEST_DEFAULT_RATE_LIMIT_MS
+        queue = self.queues.get(exchange_id)
+        if queue is None:
+            self.queues[exchange_id] = ExchangeRequestQueue(exchange_id, rate_limit_ms)
+            self.logger.debug(f"Scheduler de requests para {exchange_id}: rateLimit {rate_limit_ms} ms")
+        else:
+            queue.bucket = TokenBucket(rate_limit_ms, REQUEST_BUCKET_BURST_S)
+
+    async def submit(self, exchange_id: str, method: str, call: Callable, *args, **kwargs) -> Any:
+        """Encola la llamada y espera su resultado (o su excepción)."""
+        if exchange_id not in self.queues:
+            self.register_exchange(exchange_id)
+        queue = self.queues[exchange_id]
+        request = queue.submit(method, call, args, kwargs)
+        try:
+            # shield: si quien espera es cancelado, la llamada compartida sigue para los demás;
+            # abandon() la descarta si era el último y todavía no salió
+            return await asyncio.shield(request.future)
+        except asyncio.CancelledError:
+            queue.abandon(request)
+            raise
+
+    async def stop(self):
+        for queue in self.queues.values():
+            await queue.stop()
+
+    def _collect_metrics(self):
+        for exchange_id, queue in self.queues.items():
+            for lane, depth in queue.queue_depths().items():
+                REQUEST_QUEUE_DEPTH.set(depth, exchange=exchange_id, lane=lane)
+            queue.bucket.refill()
+            REQUEST_TOKENS.set(queue.bucket.tokens, exchange=exchange_id)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Estado del bucket y espera por carril de cada exchange."""
+        return {exchange_id: queue.get_stats() for exchange_id, queue in self.queues.items()}
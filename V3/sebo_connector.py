@@ -3,19 +3,44 @@
 import asyncio
 import logging
 import json
+import time
 import urllib.parse
-from typing import Dict, Any, Optional, List, Callable
+from typing import Dict, Any, Optional, List, Callable, Tuple
 import socketio
 import aiohttp
-from config_v3 import WEBSOCKET_URL, SEBO_API_BASE_URL, REQUEST_TIMEOUT
+from config_v3 import (
+    WEBSOCKET_URL, SEBO_API_BASE_URL, REQUEST_TIMEOUT, SEBO_SERIALIZER, SEBO_CAPTURE_TOP20_FILE,
+    SEBO_RECORD_FILE
+)
+from http_pool import http_pool
 from utils import make_http_request, safe_dict_get, get_current_timestamp
+from serialization import get_serializer, TextJSONModule
+from sebo_recorder import SeboRecorder
+from log_writer import BufferedLineWriter
+from tracing import tracer, activate, deactivate
+from metrics import registry
+
+SEBO_EVENTS = registry.counter('v3_sebo_events_total', 'Eventos Socket.IO recibidos de Sebo', ['event'])
+SEBO_EVENT_RATE = registry.gauge(
+    'v3_sebo_events_per_second', 'Eventos por segundo desde el scrape anterior', ['event']
+)
+SEBO_CONNECTED = registry.gauge('v3_sebo_connected', 'Conexión Socket.IO con Sebo activa (1) o caída (0)')
 
 class SeboConnector:
     """Maneja la conexión con el servidor Sebo (Socket.IO y API REST)."""
     
     def __init__(self):
         self.logger = logging.getLogger('V3.SeboConnector')
-        self.sio = socketio.AsyncClient(logger=False, engineio_logger=False)
+        self.serializer = get_serializer(SEBO_SERIALIZER)
+        # La API REST de Sebo siempre responde JSON de texto
+        self._json_loads = json.loads if self.serializer.binary else self.serializer.loads
+        if self.serializer.binary:
+            # MessagePack en Socket.IO: Sebo debe usar socket.io-msgpack-parser
+            self.sio = socketio.AsyncClient(logger=False, engineio_logger=False, serializer='msgpack')
+        else:
+            self.sio = socketio.AsyncClient(
+                logger=False, engineio_logger=False, json=TextJSONModule(self.serializer)
+            )
         self.http_session: Optional[aiohttp.ClientSession] = None
         self.is_connected = False
         
@@ -28,12 +53,27 @@ class SeboConnector:
         self.latest_top20_data: List[Dict] = []
         self.latest_balances: Optional[Dict] = None
         
+        # Grabación opcional de todo lo recibido por Socket.IO
+        self.recorder = SeboRecorder(
+            SEBO_RECORD_FILE, namespace=urllib.parse.urlparse(WEBSOCKET_URL).path or '/'
+        ) if SEBO_RECORD_FILE else None
+        # Captura opcional de frames top 20 (una línea JSON por frame, escrita fuera del loop)
+        self.top20_capture = BufferedLineWriter(SEBO_CAPTURE_TOP20_FILE) if SEBO_CAPTURE_TOP20_FILE else None
+        
+        # Conteo de eventos por tipo (la tasa se calcula entre scrapes)
+        self.event_counts: Dict[str, int] = {}
+        self._rate_snapshot: Tuple[float, Dict[str, int]] = (time.monotonic(), {})
+        registry.register_collector(self._collect_metrics)
+        
         self._register_sio_handlers()
     
     async def initialize(self):
         """Inicializa la sesión HTTP."""
         if self.http_session is None or self.http_session.closed:
-            self.http_session = aiohttp.ClientSession()
+            self.http_session = http_pool.get_session('sebo', json_serialize=self.serializer.dumps_text)
+        
+        if self.recorder:
+            await self.recorder.start()
     
     async def cleanup(self):
         """Limpia recursos."""
@@ -42,6 +82,12 @@ class SeboConnector:
         
         if self.http_session and not self.http_session.closed:
             await self.http_session.close()
+        
+        if self.recorder:
+            await self.recorder.stop()
+        
+        if self.top20_capture:
+            await self.top20_capture.stop()
     
     def _register_sio_handlers(self):
         """Registra los handlers para eventos de Socket.IO."""
@@ -67,17 +113,32 @@ class SeboConnector:
     
     async def _on_spot_arb_data(self, data: Dict):
         """Maneja datos de arbitraje spot recibidos de Sebo."""
+        self._count_event('spot-arb')
+        if self.recorder:
+            self.recorder.record('spot-arb', data)
+        
+        # La traza de la oportunidad empieza al recibir el evento
+        symbol = safe_dict_get(data, 'symbol', 'N/A')
+        trace = tracer.start_trace(symbol=symbol, source='sebo')
+        token = activate(trace)
+        
         try:
-            symbol = safe_dict_get(data, 'symbol', 'N/A')
             self.logger.debug(f"Recibido spot-arb para {symbol}")
             
             if self.on_spot_arb_callback:
-                await self.on_spot_arb_callback(data)
+                with tracer.span('receive', trace):
+                    await self.on_spot_arb_callback(data)
         except Exception as e:
             self.logger.error(f"Error procesando spot-arb data: {e}")
+        finally:
+            deactivate(token)
     
     async def _on_balances_update(self, data: Dict):
         """Maneja actualizaciones de balance recibidas de Sebo."""
+        self._count_event('balances-update')
+        if self.recorder:
+            self.recorder.record('balances-update', data)
+        
         try:
             self.logger.info(f"Recibida actualización de balances: {len(data) if isinstance(data, (list, dict)) else 'Invalid'}")
             self.latest_balances = data
@@ -89,11 +150,18 @@ class SeboConnector:
     
     async def _on_top20_data(self, data: List[Dict]):
         """Maneja datos del top 20 recibidos de Sebo."""
+        self._count_event('top_20_data')
+        if self.recorder:
+            self.recorder.record('top_20_data', data)
+        
         try:
             if isinstance(data, list):
                 self.logger.info(f"Recibidos datos top 20: {len(data)} items")
                 self.latest_top20_data = data
                 
+                if self.top20_capture:
+                    self._capture_top20_frame(data)
+                
                 if self.on_top20_data_callback:
                     await self.on_top20_data_callback(data)
             else:
@@ -101,6 +169,27 @@ class SeboConnector:
         except Exception as e:
             self.logger.error(f"Error procesando top_20_data: {e}")
     
+    def _count_event(self, event: str):
+        self.event_counts[event] = self.event_counts.get(event, 0) + 1
+        SEBO_EVENTS.inc(event=event)
+    
+    def _collect_metrics(self):
+        now = time.monotonic()
+        last_time, last_counts = self._rate_snapshot
+        elapsed = now - last_time
+        if elapsed > 0:
+            for event, count in self.event_counts.items():
+                SEBO_EVENT_RATE.set((count - last_counts.get(event, 0)) / elapsed, event=event)
+        self._rate_snapshot = (now, dict(self.event_counts))
+        SEBO_CONNECTED.set(1 if self.is_connected else 0)
+    
+    def _capture_top20_frame(self, data: List[Dict]):
+        """Encola el frame top 20 recibido para el archivo de captura (una línea JSON por frame)."""
+        try:
+            self.top20_capture.write_line(json.dumps(data, default=str))
+        except Exception as e:
+            self.logger.error(f"Error capturando frame top 20: {e}")
+    
     async def connect_to_sebo(self) -> bool:
         """Conecta al servidor Sebo via Socket.IO."""
         try:
@@ -134,7 +223,8 @@ class SeboConnector:
         url = f"{SEBO_API_BASE_URL}/balances/exchange/{exchange_id}"
         
         result = await make_http_request(
-            self.http_session, 'GET', url, timeout=REQUEST_TIMEOUT
+            self.http_session, 'GET', url, timeout=REQUEST_TIMEOUT,
+            json_loads=self._json_loads
         )
         
         if result:
@@ -162,7 +252,8 @@ class SeboConnector:
         payload.pop('__v', None)
         
         result = await make_http_request(
-            self.http_session, 'PUT', url, timeout=REQUEST_TIMEOUT, json=payload
+            self.http_session, 'PUT', url, timeout=REQUEST_TIMEOUT, json=payload,
+            json_loads=self._json_loads
         )
         
         if result:
@@ -181,7 +272,8 @@ class SeboConnector:
         url = f"{SEBO_API_BASE_URL}/exchanges/{exchange_id}/withdrawal-fees/{symbol}"
         
         result = await make_http_request(
-            self.http_session, 'GET', url, timeout=REQUEST_TIMEOUT
+            self.http_session, 'GET', url, timeout=REQUEST_TIMEOUT,
+            json_loads=self._json_loads
         )
         
         if result:
@@ -199,7 +291,8 @@ class SeboConnector:
         params = {'limit': limit} if limit else {}
         
         result = await make_http_request(
-            self.http_session, 'GET', url, timeout=REQUEST_TIMEOUT, params=params
+            self.http_session, 'GET', url, timeout=REQUEST_TIMEOUT, params=params,
+            json_loads=self._json_loads
         )
         
         if result and isinstance(result, list):
@@ -0,0 +1,173 @@
+# Simos/V3/sebo_recorder.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from config_v3 import SEBO_RECORD_FLUSH_INTERVAL
+from utils import get_current_timestamp
+
+RECORDING_FORMAT = "sebo-recording"
+RECORDING_VERSION = 1
+
+# (nanosegundos desde el inicio de la grabación, evento, datos)
+RecordedEvent = Tuple[int, str, Any]
+
+class SeboRecorder:
+    """Graba los eventos Socket.IO recibidos de Sebo en un archivo append-only.
+
+    Formato (JSON lines): una línea de cabecera por sesión y luego una línea
+    compacta [t_ns, evento, datos] por evento, con t_ns medido con perf_counter_ns
+    desde el inicio de la sesión. Grabar solo agrega a un buffer en memoria;
+    la escritura se hace en un executor cada SEBO_RECORD_FLUSH_INTERVAL segundos.
+    """
+
+    def __init__(self, path: str, namespace: str = None, flush_interval: float = None):
+        self.logger = logging.getLogger('V3.SeboRecorder')
+        self.path = path
+        self.namespace = namespace
+        self.flush_interval = flush_interval if flush_interval is not None else SEBO_RECORD_FLUSH_INTERVAL
+
+        self._buffer: List[str] = []
+        self._start_ns: Optional[int] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.is_recording = False
+
+        self.stats = {
+            'events_recorded': 0,
+            'bytes_written': 0,
+            'flushes': 0,
+            'errors': 0
+        }
+
+    async def start(self):
+        """Abre una sesión de grabación nueva al final del archivo."""
+        if self.is_recording:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._start_ns = time.perf_counter_ns()
+        header = {
+            'format': RECORDING_FORMAT,
+            'version': RECORDING_VERSION,
+            'namespace': self.namespace,
+            'started_at': get_current_timestamp(),
+            'started_at_epoch_ns': time.time_ns()
+        }
+        self._buffer.append(json.dumps(header, separators=(',', ':')))
+
+        self.is_recording = True
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        self.logger.info(f"Grabando eventos de Sebo en {self.path}")
+
+    async def stop(self):
+        """Detiene la grabación escribiendo lo pendiente."""
+        if not self.is_recording:
+            return
+
+        self.is_recording = False
+        if self._flush_task:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+
+        await self.flush()
+        self.logger.info(f"Grabación detenida: {self.stats['events_recorded']} eventos en {self.path}")
+
+    def record(self, event: str, data: Any):
+        """Registra un evento (O(1) salvo la serialización; no toca el disco)."""
+        if not self.is_recording:
+            return
+
+        try:
+            elapsed_ns = time.perf_counter_ns() - self._start_ns
+            self._buffer.append(json.dumps([elapsed_ns, event, data], separators=(',', ':'), default=str))
+            self.stats['events_recorded'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.logger.error(f"Error grabando evento {event}: {e}")
+
+    async def flush(self):
+        """Escribe el buffer al archivo desde un executor."""
+        async with self._lock:
+            if not self._buffer:
+                return
+
+            lines, self._buffer = self._buffer, []
+            try:
+                written = await asyncio.get_running_loop().run_in_executor(None, self._append_lines, lines)
+                self.stats['bytes_written'] += written
+                self.stats['flushes'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.error(f"Error escribiendo grabación {self.path}: {e}")
+
+    def _append_lines(self, lines: List[str]) -> int:
+        data = '\n'.join(lines) + '\n'
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(data)
+        return len(data.encode('utf-8'))
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores de la grabación."""
+        return {
+            **self.stats,
+            'path': self.path,
+            'recording': self.is_recording,
+            'buffered': len(self._buffer)
+        }
+
+def read_recording(path: str, session: Optional[int] = None) -> Tuple[Dict, List[RecordedEvent]]:
+    """Lee una grabación y retorna (cabecera, eventos) de una sesión.
+
+    Sin session se toman todas las sesiones del archivo encadenadas; los tiempos
+    de cada sesión siguiente se desplazan para continuar tras la anterior.
+    """
+    header: Dict = {}
+    events: List[RecordedEvent] = []
+    session_index = -1
+    offset_ns = 0
+    last_ns = 0
+
+    for record in iter_recording_lines(path):
+        if isinstance(record, dict):
+            if record.get('format') != RECORDING_FORMAT:
+                raise ValueError(f"{path} no es una grabación de Sebo")
+            session_index += 1
+            offset_ns = last_ns
+            if (session is None and not header) or session == session_index:
+                header = record
+            continue
+
+        if session is not None and session != session_index:
+            continue
+
+        elapsed_ns, event, data = record
+        last_ns = offset_ns + elapsed_ns
+        events.append((last_ns, event, data))
+
+    return header, events
+
+def iter_recording_lines(path: str) -> Iterator[Any]:
+    """Itera las líneas de una grabación tolerando una última línea truncada."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Línea incompleta por un cierre abrupto: se ignora
+                logging.getLogger('V3.SeboRecorder').warning(f"Línea inválida ignorada en {path}")
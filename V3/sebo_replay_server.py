@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# Simos/V3/sebo_replay_server.py
+
+"""
+Servidor Socket.IO local que reemplaza a Sebo reproduciendo una grabación
+(SEBO_RECORD_FILE) hacia un CryptoArbitrageV3 sin modificar.
+Uso: python sebo_replay_server.py data/sebo_recording.jsonl [--speed 1|N|max] [--loop]
+
+V3 se conecta como siempre a WEBSOCKET_URL; el servidor escucha por defecto en
+ese mismo host/puerto y emite los eventos en el namespace grabado.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+import urllib.parse
+import socketio
+from aiohttp import web
+from config_v3 import WEBSOCKET_URL
+from sebo_recorder import read_recording
+
+class SeboReplayServer:
+    """Reproduce eventos grabados respetando sus tiempos relativos, escalados por speed."""
+
+    def __init__(self, events, namespace: str, speed: float = 1.0, loop: bool = False, wait_clients: int = 1):
+        self.logger = logging.getLogger('V3.SeboReplayServer')
+        self.events = events
+        self.namespace = namespace
+        self.speed = speed  # 0 = lo más rápido posible
+        self.loop = loop
+        self.wait_clients = wait_clients
+
+        self.sio = socketio.AsyncServer(async_mode='aiohttp', cors_allowed_origins='*')
+        self.app = web.Application()
+        self.sio.attach(self.app)
+
+        self.clients = set()
+        self._clients_ready = asyncio.Event()
+        self.stats = {
+            'events_emitted': 0,
+            'passes': 0,
+            'max_lag_ms': 0.0
+        }
+
+        self.sio.on('connect', namespace=self.namespace)(self._on_connect)
+        self.sio.on('disconnect', namespace=self.namespace)(self._on_disconnect)
+
+    async def _on_connect(self, sid, environ, auth=None):
+        self.clients.add(sid)
+        self.logger.info(f"Cliente conectado: {sid} ({len(self.clients)} conectados)")
+        if len(self.clients) >= self.wait_clients:
+            self._clients_ready.set()
+
+    async def _on_disconnect(self, sid, *args):
+        self.clients.discard(sid)
+        self.logger.info(f"Cliente desconectado: {sid}")
+
+    async def replay(self):
+        """Emite los eventos; cada evento sale en start + t / speed (sin acumular deriva)."""
+        await self._clients_ready.wait()
+        self.logger.info(
+            f"Reproduciendo {len(self.events)} eventos a "
+            f"{'velocidad máxima' if self.speed <= 0 else f'{self.speed:g}x'}"
+        )
+
+        while True:
+            pass_start = time.perf_counter()
+            first_ns = self.events[0][0]
+
+            for elapsed_ns, event, data in self.events:
+                if self.speed > 0:
+                    target = pass_start + (elapsed_ns - first_ns) / 1e9 / self.speed
+                    delay = target - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    else:
+                        self.stats['max_lag_ms'] = max(self.stats['max_lag_ms'], -delay * 1000)
+
+                await self.sio.emit(event, data, namespace=self.namespace)
+                self.stats['events_emitted'] += 1
+
+                if self.speed <= 0:
+                    # Ceder el loop para que el transporte vacíe los envíos
+                    await asyncio.sleep(0)
+
+            self.stats['passes'] += 1
+            duration = time.perf_counter() - pass_start
+            self.logger.info(
+                f"Pasada {self.stats['passes']} completa: {len(self.events)} eventos en {duration:.2f}s "
+                f"({len(self.events) / duration if duration > 0 else 0:.0f} eventos/s, "
+                f"retraso máximo {self.stats['max_lag_ms']:.1f} ms)"
+            )
+
+            if not self.loop:
+                return
+
+def main():
+    parser = argparse.ArgumentParser(description='Reproducir una grabación de Sebo como servidor Socket.IO local')
+    parser.add_argument('recording', type=str, help='Archivo grabado con SEBO_RECORD_FILE')
+    parser.add_argument('--speed', type=str, default='1',
+                       help="Factor de velocidad: 1 (tiempo real), N (N veces más rápido) o 'max'")
+    parser.add_argument('--loop', action='store_true', help='Repetir la grabación indefinidamente')
+    parser.add_argument('--session', type=int, default=None,
+                       help='Reproducir solo la sesión N del archivo (default: todas encadenadas)')
+    parser.add_argument('--events', type=str, default=None,
+                       help='Eventos a reproducir separados por coma (default: todos)')
+    parser.add_argument('--host', type=str, default=None, help='Host (default: el de WEBSOCKET_URL)')
+    parser.add_argument('--port', type=int, default=None, help='Puerto (default: el de WEBSOCKET_URL)')
+    parser.add_argument('--wait-clients', type=int, default=1,
+                       help='Clientes a esperar antes de empezar (default: 1)')
+    parser.add_argument('--exit-when-done', action='store_true',
+                       help='Terminar el servidor al acabar la reproducción')
+    parser.add_argument('--log-level', type=str, default='INFO',
+                       choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                       help='Nivel de logging (default: INFO)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('V3.SeboReplayServer')
+
+    speed = 0.0 if args.speed.lower() == 'max' else float(args.speed)
+
+    header, events = read_recording(args.recording, args.session)
+    if args.events:
+        selected = set(args.events.split(','))
+        events = [event for event in events if event[1] in selected]
+
+    if not events:
+        logger.error(f"La grabación {args.recording} no tiene eventos para reproducir")
+        return 1
+
+    parsed_url = urllib.parse.urlparse(WEBSOCKET_URL)
+    namespace = header.get('namespace') or parsed_url.path or '/'
+    host = args.host or parsed_url.hostname or 'localhost'
+    port = args.port or parsed_url.port or 3031
+
+    logger.info(f"Grabación del {header.get('started_at')}: {len(events)} eventos, namespace {namespace}")
+
+    async def run():
+        server = SeboReplayServer(events, namespace, speed, args.loop, args.wait_clients)
+        runner = web.AppRunner(server.app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Servidor de replay escuchando en http://{host}:{port}")
+
+        try:
+            await server.replay()
+            if not args.exit_when_done:
+                await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# Simos/V3/serialization.py
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+class Serializer:
+    """Serializador de mensajes: stdlib json por defecto."""
+
+    name = "json"
+    binary = False  # True si dumps produce bytes no-texto (frames binarios en WebSocket)
+
+    def dumps(self, data: Any):
+        return json.dumps(data, default=str)
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps_text(self, data: Any) -> str:
+        """Serializa a texto JSON (para transportes que exigen str, p. ej. Socket.IO)."""
+        return self.dumps(data)
+
+    def dumps_file(self, data: Any) -> bytes:
+        """Serializa para guardar en archivo (JSON legible)."""
+        return json.dumps(data, indent=2, default=str).encode('utf-8')
+
+class OrjsonSerializer(Serializer):
+    """JSON con orjson: mismo formato en el cable, encode/decode varias veces más rápido."""
+
+    name = "orjson"
+
+    def dumps(self, data: Any) -> str:
+        return self.dumps_bytes(data).decode('utf-8')
+
+    def dumps_bytes(self, data: Any) -> bytes:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps_file(self, data: Any) -> bytes:
+        return orjson.dumps(
+            data, default=str,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+class MsgpackSerializer(Serializer):
+    """MessagePack: frames binarios más pequeños; el cliente debe decodificar msgpack."""
+
+    name = "msgpack"
+    binary = True
+
+    def dumps(self, data: Any) -> bytes:
+        return msgpack.packb(data, default=str, use_bin_type=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    def dumps_text(self, data: Any) -> str:
+        return json.dumps(data, default=str)
+
+    def dumps_file(self, data: Any) -> bytes:
+        # Los archivos de estado son .json: se mantienen en texto
+        return Serializer.dumps_file(self, data)
+
+SERIALIZERS = {
+    "json": Serializer,
+    "orjson": OrjsonSerializer,
+    "msgpack": MsgpackSerializer
+}
+
+_REQUIRED_MODULES = {
+    "orjson": lambda: orjson,
+    "msgpack": lambda: msgpack
+}
+
+_instances: Dict[str, Serializer] = {}
+
+def available_serializers() -> List[str]:
+    """Serializadores utilizables en este entorno (según dependencias instaladas)."""
+    return [
+        name for name in SERIALIZERS
+        if name not in _REQUIRED_MODULES or _REQUIRED_MODULES[name]() is not None
+    ]
+
+def get_serializer(name: Optional[str] = None) -> Serializer:
+    """Retorna el serializador pedido; si no está disponible cae a stdlib json."""
+    name = (name or "json").lower()
+
+    if name not in _instances:
+        if name not in SERIALIZERS:
+            logging.getLogger('V3').warning(f"Serializador desconocido '{name}', usando json")
+            return get_serializer("json")
+
+        if name not in available_serializers():
+            logging.getLogger('V3').warning(f"Serializador '{name}' no instalado, usando json")
+            return get_serializer("json")
+
+        _instances[name] = SERIALIZERS[name]()
+
+    return _instances[name]
+
+class TextJSONModule:
+    """Adaptador con la interfaz del módulo json (dumps -> str) para python-socketio."""
+
+    def __init__(self, serializer: Serializer):
+        self.serializer = serializer
+
+    def dumps(self, data: Any, *args, **kwargs) -> str:
+        return self.serializer.dumps_text(data)
+
+    def loads(self, data, *args, **kwargs):
+        if self.serializer.binary:
+            return json.loads(data)
+        return self.serializer.loads(data)
@@ -268,12 +268,16 @@ class SimulationEngine:
             peak_balance = initial_balance
             daily_returns = []
             
+            # Evaluar todo el histórico con el modelo en una sola llamada batch
+            model_decisions = None
+            if self.ai_model.is_trained:
+                model_decisions = self.ai_model.predict_batch(historical_data)['should_execute'].to_numpy()
+            
             for i, data in enumerate(historical_data):
                 try:
                     # Simular decisión del modelo
-                    if self.ai_model.is_trained:
-                        prediction = self.ai_model.predict(data)
-                        should_execute = prediction['should_execute']
+                    if model_decisions is not None:
+                        should_execute = bool(model_decisions[i])
                     else:
                         # Lógica básica para backtest sin modelo entrenado
                         percentage_diff = safe_float(data.get('percentage_difference', 0))
@@ -386,7 +390,7 @@ class SimulationEngine:
                     
                     # Decisión del modelo
                     if self.ai_model.is_trained:
-                        prediction = self.ai_model.predict(opportunity)
+                        prediction = await self.ai_model.predict_async(opportunity)
                         should_execute = prediction['should_execute']
                     else:
                         # Decisión básica
@@ -497,18 +501,20 @@ class SimulationEngine:
             total_profit_predicted = 0.0
             total_profit_actual = 0.0
             
-            for data in validation_data:
+            # Predicciones de todo el conjunto de validación en una sola llamada
+            predictions = self.ai_model.predict_batch(validation_data)
+            predicted_decisions = predictions['should_execute'].to_numpy()
+            predicted_profits = predictions['predicted_profit_usdt'].to_numpy()
+            
+            for i, data in enumerate(validation_data):
                 try:
-                    # Predicción del modelo
-                    prediction = self.ai_model.predict(data)
-                    
                     # Resultado real
                     actual_success = data.get('success', False)
                     actual_profit = safe_float(data.get('net_profit_usdt', 0))
                     
                     # Comparar predicción con realidad
-                    predicted_success = prediction['should_execute']
-                    predicted_profit = prediction['predicted_profit_usdt']
+                    predicted_success = bool(predicted_decisions[i])
+                    predicted_profit = float(predicted_profits[i])
                     
                     if predicted_success == actual_success:
                         correct_predictions += 1
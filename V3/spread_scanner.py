@@ -0,0 +1,357 @@
+# Simos/V3/spread_scanner.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+import numpy as np
+from config_v3 import (
+    SUPPORTED_EXCHANGES, PREFERRED_NETWORKS, DEFAULT_FIXED_INVESTMENT_USDT,
+    SCANNER_INTERVAL, SCANNER_FETCH_TIMEOUT, SCANNER_UNIVERSE_FILE, SCANNER_QUOTE_CURRENCY,
+    SCANNER_MIN_NET_PROFIT_PERCENTAGE
+)
+from utils import safe_float
+
+DEFAULT_TAKER_FEE = 0.001
+
+def compute_spreads(
+    asks: np.ndarray,
+    bids: np.ndarray,
+    taker_fees: np.ndarray,
+    withdrawal_fees: np.ndarray,
+    investment_usdt: float
+) -> Dict[str, np.ndarray]:
+    """Calcula en una pasada la mejor combinación compra/venta por símbolo.
+
+    Todas las matrices son símbolo x exchange; precios faltantes van como NaN y
+    withdrawal_fees está en unidades del activo (inf si no hay red de retiro).
+    """
+    # Costo efectivo de comprar y neto de vender, incluyendo taker fee
+    net_buy = asks * (1 + taker_fees)
+    net_sell = bids * (1 - taker_fees)
+
+    # Cantidad recibida en el exchange de venta tras el retiro
+    quantity = investment_usdt / net_buy - withdrawal_fees
+
+    # symbol x buy_exchange x sell_exchange
+    profit = quantity[:, :, None] * net_sell[:, None, :] - investment_usdt
+    profit = np.where(np.isfinite(profit), profit, -np.inf)
+
+    exchange_count = asks.shape[1]
+    same_exchange = np.eye(exchange_count, dtype=bool)
+    profit[:, same_exchange] = -np.inf
+
+    best_flat = profit.reshape(profit.shape[0], -1).argmax(axis=1)
+    buy_index, sell_index = np.divmod(best_flat, exchange_count)
+    rows = np.arange(asks.shape[0])
+    best_profit = profit[rows, buy_index, sell_index]
+
+    buy_price = asks[rows, buy_index]
+    sell_price = bids[rows, sell_index]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gross_percentage = (sell_price - buy_price) / buy_price * 100
+
+    return {
+        'buy_index': buy_index,
+        'sell_index': sell_index,
+        'buy_price': buy_price,
+        'sell_price': sell_price,
+        'gross_percentage': gross_percentage,
+        'net_profit_usdt': best_profit,
+        'net_profit_percentage': best_profit / investment_usdt * 100
+    }
+
+def to_sebo_opportunity(result: Dict) -> Dict:
+    """Convierte un resultado del scanner al formato de spot-arb/top 20 de Sebo."""
+    return {
+        'symbol': result['symbol'],
+        'exchange_min_id': result['buy_exchange_id'],
+        'exchange_max_id': result['sell_exchange_id'],
+        'price_at_exMin_to_buy_asset': result['buy_price'],
+        'price_at_exMax_to_sell_asset': result['sell_price'],
+        'percentage_difference': f"{result['gross_percentage']:.4f}%",
+        'fees_exMin': {
+            'taker_fee': result['buy_taker_fee'],
+            'withdrawal_fee_asset': result['withdrawal_fee_asset']
+        },
+        'fees_exMax': {'taker_fee': result['sell_taker_fee']},
+        'analysis_id': f"scanner-{result['cycle_id']}",
+        'source': 'scanner'
+    }
+
+class SpreadScanner:
+    """Escanea spreads entre exchanges para todo el universo de símbolos con un fetch_tickers por exchange."""
+
+    def __init__(
+        self,
+        exchange_manager,
+        exchanges: List[str] = None,
+        universe_path: str = None,
+        interval: float = None,
+        investment_usdt: float = None,
+        min_net_profit_percentage: float = None,
+        results_callback: Callable[[List[Dict]], Awaitable[None]] = None
+    ):
+        self.logger = logging.getLogger('V3.SpreadScanner')
+        self.exchange_manager = exchange_manager
+        self.exchanges = exchanges or SUPPORTED_EXCHANGES
+        self.universe_path = universe_path if universe_path is not None else SCANNER_UNIVERSE_FILE
+        self.interval = interval or SCANNER_INTERVAL
+        self.investment_usdt = investment_usdt or DEFAULT_FIXED_INVESTMENT_USDT
+        self.min_net_profit_percentage = (
+            min_net_profit_percentage if min_net_profit_percentage is not None else SCANNER_MIN_NET_PROFIT_PERCENTAGE
+        )
+        self.results_callback = results_callback
+
+        self.universe: Optional[set] = self._load_universe()
+        self.last_results: List[Dict] = []
+        self.cycle_id = 0
+        self._scan_task: Optional[asyncio.Task] = None
+
+        # Matrices de fees cacheadas; se recalculan si cambian símbolos o el catálogo
+        self._fee_matrix_key = None
+        self._fee_matrices: Tuple[np.ndarray, np.ndarray] = None
+
+        self.stats = {
+            'cycles': 0,
+            'last_cycle_ms': 0.0,
+            'last_compute_ms': 0.0,
+            'symbols': 0,
+            'pairs_evaluated': 0,
+            'opportunities': 0,
+            'fetch_ms': {},
+            'fetch_errors': {}
+        }
+
+    def _load_universe(self) -> Optional[set]:
+        """Carga la lista de pares de Sebo (spot_usdt_coins.json); None para usar todos los markets."""
+        if not self.universe_path or not os.path.exists(self.universe_path):
+            return None
+
+        try:
+            with open(self.universe_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            universe = set(data.keys()) if isinstance(data, dict) else {item.get('symbol') for item in data}
+            self.logger.info(f"Universo del scanner: {len(universe)} símbolos desde {self.universe_path}")
+            return universe
+        except Exception as e:
+            self.logger.error(f"Error cargando universo del scanner: {e}")
+            return None
+
+    # Ciclo de escaneo
+
+    async def start(self):
+        """Inicia el escaneo periódico."""
+        if self._scan_task is None:
+            self._scan_task = asyncio.create_task(self._scan_loop())
+            self.logger.info(f"Scanner de spreads iniciado ({len(self.exchanges)} exchanges, cada {self.interval}s)")
+
+    async def stop(self):
+        """Detiene el escaneo."""
+        if self._scan_task:
+            self._scan_task.cancel()
+            await asyncio.gather(self._scan_task, return_exceptions=True)
+            self._scan_task = None
+
+    async def _scan_loop(self):
+        while True:
+            started = time.monotonic()
+            try:
+                results = await self.scan_once()
+                if self.results_callback and results:
+                    await self.results_callback(results)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error en ciclo del scanner: {e}")
+
+            await asyncio.sleep(max(self.interval - (time.monotonic() - started), 0.1))
+
+    async def _fetch_exchange_tickers(self, exchange_id: str) -> Tuple[str, Optional[Dict]]:
+        started = time.perf_counter()
+        try:
+            tickers = await asyncio.wait_for(
+                self.exchange_manager.get_tickers(exchange_id), timeout=SCANNER_FETCH_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            self.stats['fetch_errors'][exchange_id] = self.stats['fetch_errors'].get(exchange_id, 0) + 1
+            self.logger.warning(f"Timeout en fetch_tickers de {exchange_id}")
+            tickers = None
+
+        self.stats['fetch_ms'][exchange_id] = (time.perf_counter() - started) * 1000
+        return exchange_id, tickers
+
+    async def scan_once(self) -> List[Dict]:
+        """Un ciclo: un fetch_tickers por exchange en paralelo y un cálculo vectorizado."""
+        cycle_started = time.perf_counter()
+        responses = await asyncio.gather(*(self._fetch_exchange_tickers(ex) for ex in self.exchanges))
+
+        exchanges = [exchange_id for exchange_id, tickers in responses if tickers]
+        if len(exchanges) < 2:
+            self.logger.warning("Scanner: se necesitan tickers de al menos 2 exchanges")
+            return []
+
+        # La matriz de precios y el cálculo corren fuera del event loop; las fees se leen
+        # en el loop porque FeeCatalogue actualiza sus índices ahí
+        loop = asyncio.get_running_loop()
+        compute_started = time.perf_counter()
+        symbols, asks, bids = await loop.run_in_executor(
+            None, self._build_price_matrix, [(ex, t) for ex, t in responses if t]
+        )
+        if not symbols:
+            return []
+
+        taker_fees, withdrawal_fees = self._get_fee_matrices(symbols, exchanges)
+        results = await loop.run_in_executor(
+            None, self._compute_results, symbols, exchanges, asks, bids, taker_fees, withdrawal_fees
+        )
+
+        self.cycle_id += 1
+        for result in results:
+            result['cycle_id'] = self.cycle_id
+        self.last_results = results
+
+        now = time.perf_counter()
+        self.stats.update({
+            'cycles': self.stats['cycles'] + 1,
+            'last_cycle_ms': (now - cycle_started) * 1000,
+            'last_compute_ms': (now - compute_started) * 1000,
+            'symbols': len(symbols),
+            'pairs_evaluated': len(symbols) * len(exchanges) * (len(exchanges) - 1),
+            'opportunities': len(results)
+        })
+
+        self.logger.debug(
+            f"Scanner ciclo {self.cycle_id}: {len(symbols)} símbolos x {len(exchanges)} exchanges, "
+            f"{len(results)} oportunidades en {self.stats['last_cycle_ms']:.0f} ms"
+        )
+        return results
+
+    def _compute_results(
+        self,
+        symbols: List[str],
+        exchanges: List[str],
+        asks: np.ndarray,
+        bids: np.ndarray,
+        taker_fees: np.ndarray,
+        withdrawal_fees: np.ndarray
+    ) -> List[Dict]:
+        """Cálculo vectorizado del ciclo; solo lee arrays (se ejecuta en el executor)."""
+        spreads = compute_spreads(asks, bids, taker_fees, withdrawal_fees, self.investment_usdt)
+        return self._collect_results(symbols, exchanges, spreads, taker_fees, withdrawal_fees)
+
+    def _build_price_matrix(self, responses: List[Tuple[str, Dict]]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Construye las matrices símbolo x exchange de ask y bid (NaN si falta)."""
+        suffix = f"/{SCANNER_QUOTE_CURRENCY}"
+        symbol_sets = []
+        for _, tickers in responses:
+            symbol_sets.append({symbol for symbol in tickers if symbol.endswith(suffix)})
+
+        # Solo interesan símbolos presentes en al menos dos exchanges
+        counts: Dict[str, int] = {}
+        for symbol_set in symbol_sets:
+            for symbol in symbol_set:
+                counts[symbol] = counts.get(symbol, 0) + 1
+        symbols = sorted(
+            symbol for symbol, count in counts.items()
+            if count >= 2 and (self.universe is None or symbol in self.universe)
+        )
+        if not symbols:
+            return [], np.empty((0, 0)), np.empty((0, 0))
+
+        symbol_index = {symbol: index for index, symbol in enumerate(symbols)}
+        asks = np.full((len(symbols), len(responses)), np.nan)
+        bids = np.full((len(symbols), len(responses)), np.nan)
+
+        for column, (_, tickers) in enumerate(responses):
+            rows = np.fromiter((symbol_index.get(symbol, -1) for symbol in tickers), dtype=np.int64, count=len(tickers))
+            # CCXT deja None cuando no hay precio; como float se vuelve NaN
+            ask_values = np.array([ticker.get('ask') for ticker in tickers.values()], dtype=float)
+            bid_values = np.array([ticker.get('bid') for ticker in tickers.values()], dtype=float)
+
+            known = rows >= 0
+            asks[rows[known], column] = ask_values[known]
+            bids[rows[known], column] = bid_values[known]
+
+        asks[~(asks > 0)] = np.nan
+        bids[~(bids > 0)] = np.nan
+        return symbols, asks, bids
+
+    def _get_fee_matrices(self, symbols: List[str], exchanges: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Matrices de taker fee y fee de retiro (en el activo) desde el catálogo de tarifas.
+
+        Se llama en el event loop; al refrescar crea arrays nuevos, así los que ya
+        recibió el executor nunca se modifican.
+        """
+        catalogue = getattr(self.exchange_manager, 'fee_catalogue', None)
+        loaded_at = tuple(catalogue.loaded_at.get(ex) for ex in exchanges) if catalogue else None
+        key = (tuple(symbols), tuple(exchanges), loaded_at)
+        if key == self._fee_matrix_key:
+            return self._fee_matrices
+
+        taker_fees = np.full((len(symbols), len(exchanges)), DEFAULT_TAKER_FEE)
+        withdrawal_fees = np.zeros((len(symbols), len(exchanges)))
+
+        if catalogue:
+            for column, exchange_id in enumerate(exchanges):
+                if not catalogue.has_exchange(exchange_id):
+                    continue
+                exchange_fees = catalogue.trading_fees.get(exchange_id, {})
+
+                for row, symbol in enumerate(symbols):
+                    taker = (exchange_fees.get(symbol) or {}).get('taker')
+                    if taker is not None:
+                        taker_fees[row, column] = taker
+
+                    base = symbol.split('/')[0]
+                    if not catalogue.get_networks(exchange_id, base):
+                        continue  # Sin datos de redes: no penalizar
+                    network = catalogue.find_cheapest_network(exchange_id, base, PREFERRED_NETWORKS.get(base, []))
+                    withdrawal_fees[row, column] = safe_float(network.get('fee'), np.inf) if network else np.inf
+
+        self._fee_matrix_key = key
+        self._fee_matrices = (taker_fees, withdrawal_fees)
+        return self._fee_matrices
+
+    def _collect_results(
+        self,
+        symbols: List[str],
+        exchanges: List[str],
+        spreads: Dict[str, np.ndarray],
+        taker_fees: np.ndarray,
+        withdrawal_fees: np.ndarray
+    ) -> List[Dict]:
+        """Filtra por ganancia neta mínima y ordena de mayor a menor."""
+        net_percentage = spreads['net_profit_percentage']
+        selected = np.flatnonzero(net_percentage >= self.min_net_profit_percentage)
+        selected = selected[np.argsort(-net_percentage[selected])]
+
+        results = []
+        for row in selected:
+            buy_column = spreads['buy_index'][row]
+            sell_column = spreads['sell_index'][row]
+            results.append({
+                'symbol': symbols[row],
+                'buy_exchange_id': exchanges[buy_column],
+                'sell_exchange_id': exchanges[sell_column],
+                'buy_price': float(spreads['buy_price'][row]),
+                'sell_price': float(spreads['sell_price'][row]),
+                'gross_percentage': float(spreads['gross_percentage'][row]),
+                'net_profit_usdt': float(spreads['net_profit_usdt'][row]),
+                'net_profit_percentage': float(net_percentage[row]),
+                'buy_taker_fee': float(taker_fees[row, buy_column]),
+                'sell_taker_fee': float(taker_fees[row, sell_column]),
+                'withdrawal_fee_asset': float(withdrawal_fees[row, buy_column]),
+                'investment_usdt': self.investment_usdt
+            })
+        return results
+
+    def get_top_opportunities(self, limit: int = 20) -> List[Dict]:
+        """Retorna los mejores spreads del último ciclo."""
+        return self.last_results[:limit]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estadísticas del scanner."""
+        return {**self.stats, 'cycle_id': self.cycle_id, 'universe_size': len(self.universe) if self.universe else None}
@@ -0,0 +1,166 @@
+# Simos/V3/state_checkpoint.py
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, Any, Optional
+from config_v3 import CHECKPOINT_DEBOUNCE_S, CHECKPOINT_FSYNC
+from serialization import Serializer, get_serializer
+from metrics import registry
+
+CHECKPOINT_EVENTS = registry.counter(
+    'v3_checkpoint_events_total', 'Marcas y escrituras de archivos de estado', ['name', 'kind']
+)
+
+def write_file_atomic(path: str, data: bytes, fsync: bool = True) -> int:
+    """Escribe un archivo completo de forma atómica: archivo temporal en el mismo directorio + rename.
+
+    Un lector (o un reinicio tras un corte) ve el archivo anterior o el nuevo, nunca uno a medias.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return len(data)
+
+class _Checkpoint:
+    """Estado pendiente de un archivo: último dato marcado y tarea de escritura programada."""
+
+    __slots__ = ('name', 'path', 'data', 'dirty', 'timer', 'stats')
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self.data: Any = None
+        self.dirty = False
+        self.timer: Optional[asyncio.Task] = None
+        self.stats = {
+            'marks': 0,
+            'writes': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'bytes_written': 0,
+            'last_write_ms': 0.0
+        }
+
+class StateCheckpointer:
+    """Escrituras diferidas y atómicas de archivos de estado (trading_state.json, balance_cache.json).
+
+    mark_dirty solo guarda el último dato; la primera marca programa una escritura
+    CHECKPOINT_DEBOUNCE_S después y las marcas siguientes dentro de esa ventana se
+    agrupan en ella. La serialización se hace en el loop (así se copia un estado
+    consistente) y la escritura + rename en un executor; si falla, se reprograma
+    con el mismo dato. flush() escribe todo lo pendiente de inmediato (usado en el shutdown).
+    """
+
+    def __init__(self, serializer: Serializer = None, debounce_s: float = None, fsync: bool = None):
+        self.logger = logging.getLogger('V3.StateCheckpointer')
+        self.serializer = serializer or get_serializer('json')
+        self.debounce_s = CHECKPOINT_DEBOUNCE_S if debounce_s is None else debounce_s
+        self.fsync = CHECKPOINT_FSYNC if fsync is None else fsync
+
+        self.checkpoints: Dict[str, _Checkpoint] = {}
+        self._lock = asyncio.Lock()
+
+    def register(self, name: str, path: str):
+        """Registra un archivo de estado bajo un nombre."""
+        if name not in self.checkpoints:
+            self.checkpoints[name] = _Checkpoint(name, path)
+
+    def mark_dirty(self, name: str, data: Any):
+        """Marca el estado como modificado; la escritura se agrupa con las marcas siguientes."""
+        checkpoint = self.checkpoints[name]
+        if checkpoint.dirty:
+            checkpoint.stats['coalesced'] += 1
+            CHECKPOINT_EVENTS.inc(name=name, kind='coalesced')
+
+        checkpoint.data = data
+        checkpoint.dirty = True
+        checkpoint.stats['marks'] += 1
+
+        self._schedule(checkpoint)
+
+    def _schedule(self, checkpoint: _Checkpoint):
+        """Programa una escritura diferida si no hay otra esperando."""
+        if checkpoint.timer is None or checkpoint.timer.done():
+            checkpoint.timer = asyncio.create_task(self._delayed_write(checkpoint))
+
+    def get_pending(self, name: str) -> Optional[Any]:
+        """Dato marcado y aún no escrito (más reciente que el archivo), o None."""
+        checkpoint = self.checkpoints.get(name)
+        return checkpoint.data if checkpoint and checkpoint.dirty else None
+
+    async def _delayed_write(self, checkpoint: _Checkpoint):
+        try:
+            await asyncio.sleep(self.debounce_s)
+            # Desde aquí una marca nueva (o un reintento) programa su propio timer
+            if checkpoint.timer is asyncio.current_task():
+                checkpoint.timer = None
+            # shield: un flush() que cancele el timer no debe cortar una escritura en curso
+            await asyncio.shield(self._write(checkpoint))
+        except asyncio.CancelledError:
+            pass
+
+    async def _write(self, checkpoint: _Checkpoint) -> bool:
+        """Serializa el último dato en el loop y lo escribe atómicamente en un executor."""
+        async with self._lock:
+            if not checkpoint.dirty:
+                return True
+
+            data, checkpoint.dirty = checkpoint.data, False
+            start = time.perf_counter()
+            try:
+                payload = self.serializer.dumps_file(data)
+                written = await asyncio.get_running_loop().run_in_executor(
+                    None, write_file_atomic, checkpoint.path, payload, self.fsync
+                )
+                checkpoint.stats['writes'] += 1
+                checkpoint.stats['bytes_written'] += written
+                checkpoint.stats['last_write_ms'] = (time.perf_counter() - start) * 1000
+                CHECKPOINT_EVENTS.inc(name=checkpoint.name, kind='write')
+                self.logger.debug(f"Checkpoint {checkpoint.name} escrito ({written} bytes)")
+                return True
+
+            except Exception as e:
+                checkpoint.stats['errors'] += 1
+                CHECKPOINT_EVENTS.inc(name=checkpoint.name, kind='error')
+                self.logger.error(f"Error escribiendo checkpoint {checkpoint.name} en {checkpoint.path}: {e}")
+                # Sin marca nueva en el medio, se reintenta con el mismo dato
+                if not checkpoint.dirty:
+                    checkpoint.data = data
+                    checkpoint.dirty = True
+                self._schedule(checkpoint)
+                return False
+
+    async def flush(self, name: str = None) -> bool:
+        """Escribe de inmediato lo pendiente (de un archivo o de todos)."""
+        checkpoints = [self.checkpoints[name]] if name else list(self.checkpoints.values())
+        success = True
+        for checkpoint in checkpoints:
+            if checkpoint.timer and not checkpoint.timer.done():
+                checkpoint.timer.cancel()
+            checkpoint.timer = None
+            success = await self._write(checkpoint) and success
+        return success
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Contadores por archivo de estado."""
+        return {
+            name: {**checkpoint.stats, 'path': checkpoint.path, 'dirty': checkpoint.dirty}
+            for name, checkpoint in self.checkpoints.items()
+        }
@@ -0,0 +1,192 @@
+# Simos/V3/tracing.py
+
+import contextvars
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+from config_v3 import (
+    TRACING_ENABLED, TRACING_SAMPLE_RATE, TRACING_LATENCY_BUCKETS_MS, TRACING_RECENT_TRACES
+)
+from metrics import registry, LatencyHistogram
+
+STAGE_LATENCY = registry.histogram(
+    'v3_stage_latency_seconds', 'Latencia por etapa de las oportunidades trazadas', ['stage']
+)
+
+# Etapas principales de una oportunidad, en orden; cada una tiene columna propia en el log
+TRACE_STAGES = [
+    'receive', 'queue_wait', 'validate', 'balance_config', 'stop_loss', 'market_data',
+    'feature_prep', 'inference', 'execution', 'persistence', 'broadcast'
+]
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('v3_trace', default=None)
+
+class Trace:
+    """Traza de una oportunidad: duración acumulada por span desde el evento de Sebo."""
+
+    __slots__ = ('trace_id', 'start_ns', 'spans', 'attributes', 'outcome', 'total_ms')
+
+    def __init__(self, trace_id: str, attributes: Dict = None):
+        self.trace_id = trace_id
+        self.start_ns = time.perf_counter_ns()
+        self.spans: Dict[str, float] = {}
+        self.attributes = attributes or {}
+        self.outcome: Optional[str] = None
+        self.total_ms: Optional[float] = None
+
+    def add_span(self, name: str, duration_ms: float):
+        """Suma la duración al span (un span puede repetirse, p. ej. varias llamadas)."""
+        self.spans[name] = self.spans.get(name, 0.0) + duration_ms
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter_ns() - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'end_to_end_ms': self.total_ms if self.total_ms is not None else self.elapsed_ms(),
+            'outcome': self.outcome,
+            'spans_ms': dict(self.spans),
+            **self.attributes
+        }
+
+class _Span:
+    """Context manager que mide un span contra la traza activa."""
+
+    __slots__ = ('tracer', 'name', 'trace', 'start_ns')
+
+    def __init__(self, tracer: 'Tracer', name: str, trace: Trace):
+        self.tracer = tracer
+        self.name = name
+        self.trace = trace
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer.record(self.name, (time.perf_counter_ns() - self.start_ns) / 1e6, self.trace)
+        return False
+
+class _NoopSpan:
+    """Span vacío cuando no hay traza activa (sin costo de medición)."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+class Tracer:
+    """Trazas por oportunidad con histogramas de latencia por etapa.
+
+    La traza activa viaja en un ContextVar: las tareas creadas con gather/create_task
+    la heredan, y donde el contexto se corta (cola del scheduler) se pasa explícitamente.
+    """
+
+    def __init__(self, enabled: bool = None, sample_rate: float = None, buckets_ms: List[float] = None):
+        self.logger = logging.getLogger('V3.Tracer')
+        self.enabled = TRACING_ENABLED if enabled is None else enabled
+        self.sample_rate = TRACING_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.buckets_ms = buckets_ms or TRACING_LATENCY_BUCKETS_MS
+
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.recent_traces: deque = deque(maxlen=TRACING_RECENT_TRACES)
+        self._ids = itertools.count(1)
+
+        self.stats = {
+            'traces_started': 0,
+            'traces_finished': 0,
+            'traces_sampled_out': 0
+        }
+
+    def start_trace(self, **attributes) -> Optional[Trace]:
+        """Crea una traza (o None si el tracing está apagado o no fue muestreada)."""
+        if not self.enabled:
+            return None
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.stats['traces_sampled_out'] += 1
+            return None
+
+        self.stats['traces_started'] += 1
+        return Trace(f"t{next(self._ids)}", attributes)
+
+    def span(self, name: str, trace: Trace = None):
+        """Mide un bloque: `with tracer.span('validate'): ...` (no-op sin traza activa)."""
+        trace = trace or _current_trace.get()
+        if trace is None:
+            return _NOOP_SPAN
+        return _Span(self, name, trace)
+
+    def record(self, name: str, duration_ms: float, trace: Trace = None):
+        """Registra una duración ya medida en la traza y en el histograma de la etapa."""
+        trace = trace or _current_trace.get()
+        if trace is None:
+            return
+
+        trace.add_span(name, duration_ms)
+        self._observe(name, duration_ms)
+
+    def finish(self, trace: Optional[Trace], outcome: str = None):
+        """Cierra la traza registrando su latencia de punta a punta."""
+        if trace is None or trace.total_ms is not None:
+            return
+
+        trace.total_ms = trace.elapsed_ms()
+        trace.outcome = outcome
+        self._observe('end_to_end', trace.total_ms)
+        self.recent_traces.append(trace)
+        self.stats['traces_finished'] += 1
+
+    def _observe(self, name: str, duration_ms: float):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram(self.buckets_ms)
+        histogram.observe(duration_ms)
+        STAGE_LATENCY.observe(duration_ms / 1000, stage=name)
+
+    def get_stats(self, include_buckets: bool = False, recent: int = 0) -> Dict[str, Any]:
+        """Resumen por etapa (p50/p95/p99) y, opcionalmente, las trazas más recientes."""
+        stages = {}
+        for name in sorted(self.histograms, key=self._stage_order):
+            stage_stats = self.histograms[name].get_stats()
+            if not include_buckets:
+                stage_stats.pop('buckets')
+            stages[name] = stage_stats
+
+        stats = {
+            **self.stats,
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'stages': stages
+        }
+        if recent:
+            stats['recent_traces'] = [trace.to_dict() for trace in list(self.recent_traces)[-recent:]]
+        return stats
+
+    @staticmethod
+    def _stage_order(name: str):
+        stage = name.split('.')[0]
+        position = TRACE_STAGES.index(stage) if stage in TRACE_STAGES else len(TRACE_STAGES)
+        return position, name
+
+def current_trace() -> Optional[Trace]:
+    """Traza activa en el contexto actual."""
+    return _current_trace.get()
+
+def activate(trace: Optional[Trace]):
+    """Activa una traza en el contexto actual; retorna el token para desactivarla."""
+    return _current_trace.set(trace)
+
+def deactivate(token):
+    _current_trace.reset(token)
+
+# Tracer del proceso (como logging.getLogger, compartido por todos los módulos)
+tracer = Tracer()
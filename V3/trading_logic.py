@@ -2,20 +2,33 @@
 
 import asyncio
 import logging
+import math
+import numpy as np
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List, Callable
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Tuple
 from config_v3 import (
     MIN_PROFIT_PERCENTAGE, MIN_PROFIT_USDT, MIN_OPERATIONAL_USDT,
     DEFAULT_INVESTMENT_MODE, DEFAULT_INVESTMENT_PERCENTAGE, DEFAULT_FIXED_INVESTMENT_USDT,
-    SIMULATION_MODE, SIMULATION_DELAY, PREFERRED_NETWORKS
+    SIMULATION_MODE, SIMULATION_DELAY, PREFERRED_NETWORKS, MAX_CONCURRENT_OPERATIONS,
+    MARKET_DATA_CALL_TIMEOUT, DEPTH_ORDER_BOOK_LIMIT, DEPTH_CANDIDATE_SIZES
 )
 from utils import (
     create_symbol_dict, safe_float, safe_dict_get, get_current_timestamp,
     is_profitable_operation, format_operation_summary, find_cheapest_network
 )
+from arbitrage_calculator import calculate_depth_aware_profitability
 from exchange_manager import ExchangeManager
 from data_persistence import DataPersistence
 from ai_model import ArbitrageAIModel
+from tracing import tracer, current_trace
+from metrics import registry
+
+OPPORTUNITY_OUTCOMES = registry.counter(
+    'v3_opportunities_total', 'Oportunidades procesadas por resultado', ['decision_outcome']
+)
+OPERATIONS_IN_FLIGHT = registry.gauge('v3_operations_in_flight', 'Oportunidades admitidas en proceso')
+RESERVED_CAPITAL = registry.gauge('v3_reserved_capital_usdt', 'Capital reservado por operaciones en curso')
+TRADING_ACTIVE = registry.gauge('v3_trading_active', 'Trading activo (1) o detenido (0)')
 
 class TradingLogic:
     """Maneja la lógica central de trading y arbitraje."""
@@ -27,8 +40,8 @@ class TradingLogic:
         self.ai_model = ai_model or ArbitrageAIModel()
         
         # Estado del trading
-        self.is_trading_active = False
-        self.current_operation = None
+        self.trading_active = False
+        self.active_operations: Dict[str, Dict] = {}
         self.trading_stats = {
             'operations_count': 0,
             'successful_operations': 0,
@@ -40,9 +53,19 @@ class TradingLogic:
         self.usdt_holder_exchange_id = "binance"  # Exchange principal para USDT
         self.global_sl_active_flag = False
         
+        # Control de concurrencia
+        self.max_concurrent_operations = MAX_CONCURRENT_OPERATIONS
+        self.in_flight_count = 0  # Oportunidades admitidas (procesando o esperando lock)
+        self.reserved_capital_usdt = 0.0  # Capital comprometido por operaciones en curso
+        self._pair_locks: Dict[str, asyncio.Lock] = {}
+        self._pair_lock_users: Dict[str, int] = {}  # Oportunidades que tienen o esperan cada lock
+        self._operation_counter = 0
+        
         # Callbacks
         self.on_operation_complete_callback: Optional[Callable] = None
         self.on_trading_status_change_callback: Optional[Callable] = None
+        
+        registry.register_collector(self._collect_metrics)
     
     async def initialize(self):
         """Inicializa el módulo de trading logic."""
@@ -65,27 +88,27 @@ class TradingLogic:
         try:
             state = await self.data_persistence.load_trading_state()
             if state:
-                self.is_trading_active = state.get('is_trading_active', False)
+                self.trading_active = state.get('is_trading_active', False)
                 self.usdt_holder_exchange_id = state.get('usdt_holder_exchange_id', 'binance')
                 self.global_sl_active_flag = state.get('global_sl_active_flag', False)
                 self.trading_stats = state.get('trading_stats', self.trading_stats)
                 
-                self.logger.info(f"Estado de trading cargado - Activo: {self.is_trading_active}")
+                self.logger.info(f"Estado de trading cargado - Activo: {self.trading_active}")
         except Exception as e:
             self.logger.error(f"Error cargando estado de trading: {e}")
     
-    async def _save_trading_state(self):
-        """Guarda el estado actual del trading."""
+    async def _save_trading_state(self, immediate: bool = False):
+        """Guarda el estado actual del trading (agrupado; immediate para cambios de estado del trading)."""
         try:
             state = {
-                'is_trading_active': self.is_trading_active,
+                'is_trading_active': self.trading_active,
                 'usdt_holder_exchange_id': self.usdt_holder_exchange_id,
                 'global_sl_active_flag': self.global_sl_active_flag,
                 'trading_stats': self.trading_stats,
-                'current_operation': self.current_operation
+                'active_operations': list(self.active_operations.values())
             }
             
-            await self.data_persistence.save_trading_state(state)
+            await self.data_persistence.save_trading_state(state, immediate=immediate)
         except Exception as e:
             self.logger.error(f"Error guardando estado de trading: {e}")
     
@@ -93,18 +116,18 @@ class TradingLogic:
     
     async def start_trading(self, config: Dict = None):
         """Inicia el trading automatizado."""
-        if self.is_trading_active:
+        if self.trading_active:
             self.logger.warning("Trading ya está activo")
             return
         
-        self.is_trading_active = True
+        self.trading_active = True
         self.trading_stats['start_time'] = get_current_timestamp()
         
         # Aplicar configuración si se proporciona
         if config:
             self.usdt_holder_exchange_id = config.get('usdt_holder_exchange_id', self.usdt_holder_exchange_id)
         
-        await self._save_trading_state()
+        await self._save_trading_state(immediate=True)
         
         self.logger.info(f"Trading iniciado - Exchange principal: {self.usdt_holder_exchange_id}")
         
@@ -113,12 +136,12 @@ class TradingLogic:
     
     async def stop_trading(self):
         """Detiene el trading automatizado."""
-        if not self.is_trading_active:
+        if not self.trading_active:
             self.logger.warning("Trading ya está inactivo")
             return
         
-        self.is_trading_active = False
-        await self._save_trading_state()
+        self.trading_active = False
+        await self._save_trading_state(immediate=True)
         
         self.logger.info("Trading detenido")
         
@@ -127,70 +150,131 @@ class TradingLogic:
     
     # Procesamiento de oportunidades
     
-    async def process_arbitrage_opportunity(self, opportunity_data: Dict) -> Dict:
-        """Procesa una oportunidad de arbitraje."""
-        if not self.is_trading_active:
+    async def process_arbitrage_opportunity(self, opportunity_data: Dict, defer_log: bool = False) -> Dict:
+        """Procesa una oportunidad de arbitraje.
+        
+        Con defer_log=True la fila del log no se escribe: viaja en result['operation_log_data']
+        para que quien despacha la registre después de cerrar la traza.
+        """
+        result = await self._admit_opportunity(opportunity_data, defer_log)
+        OPPORTUNITY_OUTCOMES.inc(decision_outcome=result.get('decision_outcome', 'UNKNOWN'))
+        return result
+    
+    async def _admit_opportunity(self, opportunity_data: Dict, defer_log: bool = False) -> Dict:
+        """Aplica los límites de concurrencia y procesa la oportunidad con el lock de su par."""
+        if not self.trading_active:
             return self._create_operation_result("TRADING_INACTIVE", "Trading no está activo")
         
-        if self.current_operation:
-            return self._create_operation_result("OPERATION_IN_PROGRESS", "Operación en progreso")
+        if self.in_flight_count >= self.max_concurrent_operations:
+            return self._create_operation_result(
+                "MAX_CONCURRENCY_REACHED",
+                f"Máximo de operaciones simultáneas alcanzado ({self.max_concurrent_operations})"
+            )
+        
+        # Crear diccionario de símbolo
+        symbol_dict = create_symbol_dict(opportunity_data)
+        pair_key = self._get_pair_key(symbol_dict)
         
+        # Las oportunidades del mismo símbolo/par de exchanges se serializan,
+        # las independientes se procesan en paralelo
+        self.in_flight_count += 1
+        try:
+            async with self._get_pair_lock(pair_key):
+                return await self._process_opportunity(symbol_dict, pair_key, defer_log)
+        finally:
+            self.in_flight_count -= 1
+            self._release_pair_lock(pair_key)
+    
+    async def _process_opportunity(self, symbol_dict: Dict, pair_key: str, defer_log: bool = False) -> Dict:
+        """Valida, evalúa y ejecuta una oportunidad con el lock de su par adquirido."""
         operation_start_time = asyncio.get_event_loop().time()
-        symbol = safe_dict_get(opportunity_data, 'symbol', 'N/A')
+        symbol = symbol_dict.get('symbol') or 'N/A'
+        
+        self._operation_counter += 1
+        operation_id = f"{pair_key}#{self._operation_counter}"
+        reserved_amount = 0.0
         
         try:
-            self.current_operation = {
+            self.active_operations[operation_id] = {
+                'operation_id': operation_id,
                 'symbol': symbol,
+                'buy_exchange_id': symbol_dict.get('buy_exchange_id'),
+                'sell_exchange_id': symbol_dict.get('sell_exchange_id'),
                 'start_time': operation_start_time,
                 'status': 'PROCESSING'
             }
             
-            self.logger.info(f"Procesando oportunidad: {symbol}")
-            
-            # Crear diccionario de símbolo
-            symbol_dict = create_symbol_dict(opportunity_data)
+            self.logger.info(f"Procesando oportunidad: {symbol} ({len(self.active_operations)} en curso)")
             
             # Validaciones iniciales
-            validation_result = await self._validate_opportunity(symbol_dict)
+            with tracer.span('validate'):
+                validation_result = await self._validate_opportunity(symbol_dict)
             if not validation_result['valid']:
-                return self._create_operation_result("VALIDATION_FAILED", validation_result['reason'])
+                return self._create_operation_result(
+                    validation_result.get('decision_outcome', 'VALIDATION_FAILED'), validation_result['reason']
+                )
             
             # Obtener configuración de balance
-            balance_config = await self._get_balance_config()
+            with tracer.span('balance_config'):
+                balance_config = await self._get_balance_config()
             if not balance_config:
                 return self._create_operation_result("BALANCE_CONFIG_ERROR", "No se pudo obtener configuración de balance")
             
             # Verificar stop loss global
-            if await self._check_global_stop_loss(balance_config):
+            with tracer.span('stop_loss'):
+                global_stop_loss = await self._check_global_stop_loss(balance_config)
+            if global_stop_loss:
                 return self._create_operation_result("GLOBAL_STOP_LOSS", "Stop loss global activado")
             
-            # Calcular monto de inversión
-            investment_amount = self._calculate_investment_amount(balance_config)
+            # Calcular monto de inversión y reservarlo contra el balance disponible
+            investment_amount = self._reserve_capital(balance_config)
             if investment_amount < MIN_OPERATIONAL_USDT:
                 return self._create_operation_result("INSUFFICIENT_BALANCE", f"Balance insuficiente: {investment_amount} USDT")
+            reserved_amount = investment_amount
+            self.active_operations[operation_id]['investment_usdt'] = investment_amount
             
             # Obtener precios actuales y tarifas
-            market_data = await self._get_market_data(symbol_dict)
+            with tracer.span('market_data'):
+                market_data = await self._get_market_data(symbol_dict)
             if not market_data['valid']:
-                return self._create_operation_result("MARKET_DATA_ERROR", market_data['reason'])
+                return self._create_operation_result(
+                    "MARKET_DATA_ERROR",
+                    market_data['reason'],
+                    {'market_data_timings_ms': market_data.get('timings_ms', {})}
+                )
             
-            # Preparar datos para la IA
-            ai_input_data = self._prepare_ai_input_data(
-                symbol_dict, balance_config, investment_amount, market_data
-            )
+            with tracer.span('feature_prep'):
+                # Ajustar tamaño y precios con la profundidad real de los order books
+                depth_analysis = self._analyze_depth(symbol_dict, market_data, investment_amount)
+                if depth_analysis:
+                    sized_amount = depth_analysis['max_profitable_investment_usdt']
+                    if MIN_OPERATIONAL_USDT <= sized_amount < investment_amount:
+                        self._release_capital(investment_amount - sized_amount)
+                        investment_amount = reserved_amount = sized_amount
+                        self.active_operations[operation_id]['investment_usdt'] = investment_amount
+                    
+                    self._apply_fill_prices(symbol_dict, market_data, investment_amount)
+                
+                # Preparar datos para la IA
+                ai_input_data = self._prepare_ai_input_data(
+                    symbol_dict, balance_config, investment_amount, market_data
+                )
             
             # Decisión de la IA
-            ai_decision = self.ai_model.predict(ai_input_data)
+            with tracer.span('inference'):
+                ai_decision = await self.ai_model.predict_async(ai_input_data)
             ai_input_data['ai_decision'] = ai_decision
             
             self.logger.info(f"Decisión IA para {symbol}: {ai_decision['should_execute']} (confianza: {ai_decision['confidence']:.3f})")
             
             # Ejecutar operación si es rentable
             if ai_decision.get('should_execute', False):
-                if SIMULATION_MODE:
-                    execution_result = await self._simulate_operation(ai_input_data)
-                else:
-                    execution_result = await self._execute_real_operation(ai_input_data)
+                self.active_operations[operation_id]['status'] = 'EXECUTING'
+                with tracer.span('execution'):
+                    if SIMULATION_MODE:
+                        execution_result = await self._simulate_operation(ai_input_data)
+                    else:
+                        execution_result = await self._execute_real_operation(ai_input_data)
             else:
                 execution_result = self._create_operation_result(
                     "NOT_PROFITABLE", 
@@ -201,15 +285,22 @@ class TradingLogic:
             if execution_result.get('success', False) or execution_result.get('decision_outcome') == 'NOT_PROFITABLE':
                 self.ai_model.update_with_feedback(ai_input_data, execution_result)
             
-            # Actualizar estadísticas
-            await self._update_trading_stats(execution_result)
-            
-            # Registrar operación
-            operation_log_data = {**ai_input_data, **execution_result}
-            operation_log_data['execution_time_ms'] = (asyncio.get_event_loop().time() - operation_start_time) * 1000
-            operation_log_data['ai_confidence'] = ai_decision.get('confidence', 0.0)
-            
-            await self.data_persistence.log_operation_to_csv(operation_log_data)
+            with tracer.span('persistence'):
+                # Actualizar estadísticas
+                await self._update_trading_stats(execution_result)
+                
+                # Registrar operación
+                operation_log_data = {**ai_input_data, **execution_result}
+                operation_log_data['execution_time_ms'] = (asyncio.get_event_loop().time() - operation_start_time) * 1000
+                operation_log_data['ai_confidence'] = ai_decision.get('confidence', 0.0)
+                operation_log_data['market_data_timings_ms'] = market_data.get('timings_ms', {})
+                
+                if defer_log:
+                    execution_result['operation_log_data'] = operation_log_data
+                else:
+                    trace = current_trace()
+                    operation_log_data['trace'] = trace.to_dict() if trace else None
+                    await self.data_persistence.log_operation_to_csv(operation_log_data)
             
             # Callback de operación completada
             if self.on_operation_complete_callback:
@@ -225,7 +316,46 @@ class TradingLogic:
             return self._create_operation_result("PROCESSING_ERROR", error_msg)
         
         finally:
-            self.current_operation = None
+            self._release_capital(reserved_amount)
+            self.active_operations.pop(operation_id, None)
+    
+    def _get_pair_key(self, symbol_dict: Dict) -> str:
+        """Clave de conflicto de una oportunidad: símbolo y par de exchanges."""
+        return f"{symbol_dict.get('symbol')}|{symbol_dict.get('buy_exchange_id')}|{symbol_dict.get('sell_exchange_id')}"
+    
+    def _get_pair_lock(self, pair_key: str) -> asyncio.Lock:
+        """Obtiene (o crea) el lock asociado a un símbolo/par de exchanges y registra un usuario."""
+        lock = self._pair_locks.get(pair_key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._pair_locks[pair_key] = lock
+        self._pair_lock_users[pair_key] = self._pair_lock_users.get(pair_key, 0) + 1
+        return lock
+    
+    def _release_pair_lock(self, pair_key: str):
+        """Descarta el lock del par cuando nadie lo tiene ni lo espera (evita que el dict crezca sin límite)."""
+        users = self._pair_lock_users.get(pair_key, 0) - 1
+        if users > 0:
+            self._pair_lock_users[pair_key] = users
+        else:
+            self._pair_lock_users.pop(pair_key, None)
+            self._pair_locks.pop(pair_key, None)
+    
+    def _reserve_capital(self, balance_config: Dict) -> float:
+        """Calcula el monto de inversión limitado al capital no reservado y lo reserva."""
+        current_balance = safe_float(balance_config.get('balance_usdt', 0))
+        available_balance = max(current_balance - self.reserved_capital_usdt, 0.0)
+        
+        amount = min(self._calculate_investment_amount(balance_config), available_balance)
+        if amount >= MIN_OPERATIONAL_USDT:
+            self.reserved_capital_usdt += amount
+        
+        return amount
+    
+    def _release_capital(self, amount: float):
+        """Libera capital reservado por una operación finalizada."""
+        if amount > 0:
+            self.reserved_capital_usdt = max(self.reserved_capital_usdt - amount, 0.0)
     
     async def _validate_opportunity(self, symbol_dict: Dict) -> Dict:
         """Valida una oportunidad de arbitraje."""
@@ -239,6 +369,16 @@ class TradingLogic:
         if buy_exchange == sell_exchange:
             return {'valid': False, 'reason': 'Exchanges de compra y venta son iguales'}
         
+        # Rechazo inmediato si algún circuito de los exchanges está abierto
+        for exchange_id in (buy_exchange, sell_exchange):
+            block_reason = self.exchange_manager.get_circuit_block_reason(exchange_id)
+            if block_reason:
+                return {
+                    'valid': False,
+                    'reason': f'Exchange {exchange_id} no disponible: {block_reason}',
+                    'decision_outcome': 'CIRCUIT_OPEN'
+                }
+        
         # Verificar que los exchanges estén disponibles
         if not await self.exchange_manager.test_exchange_connection(buy_exchange):
             return {'valid': False, 'reason': f'Exchange de compra no disponible: {buy_exchange}'}
@@ -314,38 +454,169 @@ class TradingLogic:
         return min(amount, current_balance)
     
     async def _get_market_data(self, symbol_dict: Dict) -> Dict:
-        """Obtiene datos de mercado actuales."""
+        """Obtiene datos de mercado actuales lanzando todas las sub-llamadas en paralelo."""
+        loop = asyncio.get_event_loop()
+        stage_start = loop.time()
+        
         try:
             symbol = symbol_dict['symbol']
             buy_exchange = symbol_dict['buy_exchange_id']
             sell_exchange = symbol_dict['sell_exchange_id']
+            base_currency = symbol.split('/')[0]  # Ej: BTC/USDT -> BTC
             
-            # Obtener precios actuales
-            buy_ask, _ = await self.exchange_manager.get_current_prices(buy_exchange, symbol)
-            _, sell_bid = await self.exchange_manager.get_current_prices(sell_exchange, symbol)
+            # Precios, tarifas de trading e información de retiro (para el activo)
+            calls = {
+                'buy_ticker': self.exchange_manager.get_current_prices(buy_exchange, symbol),
+                'sell_ticker': self.exchange_manager.get_current_prices(sell_exchange, symbol),
+                'buy_order_book': self.exchange_manager.get_order_book(buy_exchange, symbol, DEPTH_ORDER_BOOK_LIMIT),
+                'sell_order_book': self.exchange_manager.get_order_book(sell_exchange, symbol, DEPTH_ORDER_BOOK_LIMIT),
+                'buy_fees': self.exchange_manager.get_trading_fees(buy_exchange, symbol),
+                'sell_fees': self.exchange_manager.get_trading_fees(sell_exchange, symbol),
+                'withdrawal_info': self.exchange_manager.get_withdrawal_fees(buy_exchange, base_currency)
+            }
             
-            if not buy_ask or not sell_bid:
-                return {'valid': False, 'reason': 'No se pudieron obtener precios actuales'}
+            results = await asyncio.gather(
+                *(self._timed_market_call(name, call) for name, call in calls.items())
+            )
             
-            # Obtener tarifas de trading
-            buy_fees = await self.exchange_manager.get_trading_fees(buy_exchange, symbol)
-            sell_fees = await self.exchange_manager.get_trading_fees(sell_exchange, symbol)
+            values = {}
+            errors = {}
+            timings_ms = {}
+            for name, value, elapsed_ms, error in results:
+                values[name] = value
+                timings_ms[name] = elapsed_ms
+                if error:
+                    errors[name] = error
+            timings_ms['total'] = (loop.time() - stage_start) * 1000
             
-            # Obtener información de retiro (para el activo)
-            base_currency = symbol.split('/')[0]  # Ej: BTC/USDT -> BTC
-            withdrawal_info = await self.exchange_manager.get_withdrawal_fees(buy_exchange, base_currency)
+            if errors:
+                self.logger.warning(f"Datos de mercado parciales para {symbol}: {errors}")
+            
+            buy_ask, _ = values['buy_ticker'] or (None, None)
+            _, sell_bid = values['sell_ticker'] or (None, None)
+            
+            # Los precios son obligatorios; tarifas y retiros admiten resultado parcial
+            if not buy_ask or not sell_bid:
+                return {
+                    'valid': False,
+                    'reason': 'No se pudieron obtener precios actuales',
+                    'errors': errors,
+                    'timings_ms': timings_ms
+                }
             
             return {
                 'valid': True,
                 'buy_price': buy_ask,
                 'sell_price': sell_bid,
-                'buy_fees': buy_fees,
-                'sell_fees': sell_fees,
-                'withdrawal_info': withdrawal_info
+                'buy_fees': values['buy_fees'] or {},
+                'sell_fees': values['sell_fees'] or {},
+                'withdrawal_info': values['withdrawal_info'] or {},
+                'buy_order_book': values['buy_order_book'],
+                'sell_order_book': values['sell_order_book'],
+                'partial': bool(errors),
+                'errors': errors,
+                'timings_ms': timings_ms
             }
             
         except Exception as e:
-            return {'valid': False, 'reason': f'Error obteniendo datos de mercado: {e}'}
+            return {
+                'valid': False,
+                'reason': f'Error obteniendo datos de mercado: {e}',
+                'timings_ms': {'total': (loop.time() - stage_start) * 1000}
+            }
+    
+    def _analyze_depth(self, symbol_dict: Dict, market_data: Dict, investment_amount: float) -> Optional[Dict]:
+        """Evalúa varios tamaños de inversión recorriendo los order books de ambas patas."""
+        if not market_data.get('buy_order_book') or not market_data.get('sell_order_book'):
+            return None
+        
+        sizes = np.linspace(
+            MIN_OPERATIONAL_USDT, max(investment_amount, MIN_OPERATIONAL_USDT), DEPTH_CANDIDATE_SIZES
+        )
+        analysis = calculate_depth_aware_profitability(
+            self._build_depth_fee_data(symbol_dict, market_data), sizes,
+            market_data['buy_order_book'], market_data['sell_order_book']
+        )
+        if analysis['error_message']:
+            return None
+        
+        market_data['depth_analysis'] = {
+            'max_profitable_investment_usdt': analysis['max_profitable_investment_usdt'],
+            'best_investment_usdt': analysis['best_investment_usdt'],
+            'best_net_profit_usdt': analysis['best_net_profit_usdt']
+        }
+        return analysis
+    
+    def _apply_fill_prices(self, symbol_dict: Dict, market_data: Dict, investment_amount: float):
+        """Sustituye los precios top-of-book por los VWAP de llenado para el monto final."""
+        fill = calculate_depth_aware_profitability(
+            self._build_depth_fee_data(symbol_dict, market_data), [investment_amount],
+            market_data['buy_order_book'], market_data['sell_order_book']
+        )
+        buy_vwap, sell_vwap = fill['buy_vwap'][0], fill['sell_vwap'][0]
+        
+        if math.isfinite(buy_vwap) and math.isfinite(sell_vwap):
+            market_data['top_of_book_buy_price'] = market_data['buy_price']
+            market_data['top_of_book_sell_price'] = market_data['sell_price']
+            market_data['buy_price'] = buy_vwap
+            market_data['sell_price'] = sell_vwap
+            market_data['depth_analysis']['fully_filled'] = fill['fully_filled'][0]
+            market_data['depth_analysis']['net_profit_usdt'] = fill['net_profit_usdt'][0]
+    
+    def _build_depth_fee_data(self, symbol_dict: Dict, market_data: Dict) -> Dict:
+        """Arma las tarifas con las claves que espera arbitrage_calculator."""
+        symbol = symbol_dict['symbol']
+        base_currency = symbol.split('/')[0]
+        
+        networks = (market_data.get('withdrawal_info') or {}).get(base_currency, {}).get('networks', [])
+        if isinstance(networks, dict):
+            networks = list(networks.values())
+        asset_network = find_cheapest_network(networks, PREFERRED_NETWORKS.get(base_currency, []))
+        
+        usdt_network = None
+        if self.usdt_holder_exchange_id != symbol_dict['buy_exchange_id']:
+            usdt_network = self.exchange_manager.fee_catalogue.find_cheapest_network(
+                self.usdt_holder_exchange_id, 'USDT', PREFERRED_NETWORKS.get('USDT', [])
+            )
+        
+        return {
+            'ex_min_taker_fee_rate_sebo': self._extract_taker_fee(market_data.get('buy_fees'), symbol),
+            'ex_max_taker_fee_rate_sebo': self._extract_taker_fee(market_data.get('sell_fees'), symbol),
+            'asset_withdrawal_fee_from_ex_min_sebo': self._network_fee(asset_network),
+            'initial_usdt_withdrawal_selected_fee': self._network_fee(usdt_network)
+        }
+    
+    def _extract_taker_fee(self, fees: Optional[Dict], symbol: str) -> float:
+        """Obtiene la tarifa taker desde la respuesta por símbolo o plana."""
+        if not isinstance(fees, dict):
+            return 0.001
+        
+        symbol_fees = fees.get(symbol, fees)
+        return safe_float(symbol_fees.get('taker') if isinstance(symbol_fees, dict) else None, 0.001)
+    
+    def _network_fee(self, network: Optional[Dict]) -> float:
+        """Fee de una red; las fees desconocidas no se descuentan."""
+        fee = safe_float(network.get('fee')) if network else 0.0
+        return fee if math.isfinite(fee) else 0.0
+    
+    async def _timed_market_call(self, name: str, call: Awaitable) -> Tuple[str, Any, float, Optional[str]]:
+        """Ejecuta una sub-llamada de datos de mercado con deadline y mide su latencia."""
+        loop = asyncio.get_event_loop()
+        call_start = loop.time()
+        value, error = None, None
+        
+        try:
+            value = await asyncio.wait_for(call, timeout=MARKET_DATA_CALL_TIMEOUT)
+            if value is None:
+                error = 'sin datos'
+        except asyncio.TimeoutError:
+            error = f'timeout ({MARKET_DATA_CALL_TIMEOUT}s)'
+        except Exception as e:
+            error = str(e)
+        
+        elapsed_ms = (loop.time() - call_start) * 1000
+        tracer.record(f'market_data.{name}', elapsed_ms)
+        return name, value, elapsed_ms, error
     
     def _prepare_ai_input_data(
         self, 
@@ -450,16 +721,18 @@ class TradingLogic:
             
             # Paso 1: Transferir USDT al exchange de compra (si es necesario)
             if self.usdt_holder_exchange_id != buy_exchange:
-                transfer_result = await self._transfer_usdt_between_exchanges(
-                    self.usdt_holder_exchange_id, buy_exchange, investment_usdt
-                )
+                with tracer.span('execution.transfer_usdt'):
+                    transfer_result = await self._transfer_usdt_between_exchanges(
+                        self.usdt_holder_exchange_id, buy_exchange, investment_usdt
+                    )
                 if not transfer_result['success']:
                     return self._create_operation_result("TRANSFER_FAILED", transfer_result['reason'])
             
             # Paso 2: Comprar el activo
-            buy_result = await self.exchange_manager.create_market_buy_order(
-                buy_exchange, symbol, investment_usdt
-            )
+            with tracer.span('execution.buy'):
+                buy_result = await self.exchange_manager.create_market_buy_order(
+                    buy_exchange, symbol, investment_usdt
+                )
             if not buy_result:
                 return self._create_operation_result("BUY_FAILED", "Error en orden de compra")
             
@@ -470,18 +743,20 @@ class TradingLogic:
             
             # Paso 3: Transferir activo al exchange de venta
             base_currency = symbol.split('/')[0]
-            transfer_result = await self._transfer_asset_between_exchanges(
-                buy_exchange, sell_exchange, base_currency, filled_amount
-            )
+            with tracer.span('execution.transfer_asset'):
+                transfer_result = await self._transfer_asset_between_exchanges(
+                    buy_exchange, sell_exchange, base_currency, filled_amount
+                )
             if not transfer_result['success']:
                 return self._create_operation_result("ASSET_TRANSFER_FAILED", transfer_result['reason'])
             
             received_amount = transfer_result['received_amount']
             
             # Paso 4: Vender el activo
-            sell_result = await self.exchange_manager.create_market_sell_order(
-                sell_exchange, symbol, received_amount
-            )
+            with tracer.span('execution.sell'):
+                sell_result = await self.exchange_manager.create_market_sell_order(
+                    sell_exchange, symbol, received_amount
+                )
             if not sell_result:
                 return self._create_operation_result("SELL_FAILED", "Error en orden de venta")
             
@@ -491,9 +766,10 @@ class TradingLogic:
             
             # Paso 5: Devolver USDT al exchange principal (si es diferente)
             if sell_exchange != self.usdt_holder_exchange_id:
-                return_result = await self._transfer_usdt_between_exchanges(
-                    sell_exchange, self.usdt_holder_exchange_id, usdt_received
-                )
+                with tracer.span('execution.return_usdt'):
+                    return_result = await self._transfer_usdt_between_exchanges(
+                        sell_exchange, self.usdt_holder_exchange_id, usdt_received
+                    )
                 # Nota: Este paso es opcional y puede fallar sin afectar la operación principal
             
             return self._create_operation_result(
@@ -528,10 +804,8 @@ class TradingLogic:
                 return {'success': False, 'reason': 'No se pudo obtener dirección de depósito'}
             
             # Determinar la red más económica
-            withdrawal_fees = await self.exchange_manager.get_withdrawal_fees(from_exchange, 'USDT')
-            cheapest_network = find_cheapest_network(
-                withdrawal_fees.get('USDT', {}).get('networks', []),
-                PREFERRED_NETWORKS.get('USDT', [])
+            cheapest_network = await self.exchange_manager.find_cheapest_network(
+                from_exchange, 'USDT', PREFERRED_NETWORKS.get('USDT', [])
             )
             
             if not cheapest_network:
@@ -570,10 +844,8 @@ class TradingLogic:
             if not deposit_address:
                 return {'success': False, 'reason': f'No se pudo obtener dirección de depósito para {currency}'}
             
-            withdrawal_fees = await self.exchange_manager.get_withdrawal_fees(from_exchange, currency)
-            cheapest_network = find_cheapest_network(
-                withdrawal_fees.get(currency, {}).get('networks', []),
-                PREFERRED_NETWORKS.get(currency, [])
+            cheapest_network = await self.exchange_manager.find_cheapest_network(
+                from_exchange, currency, PREFERRED_NETWORKS.get(currency, [])
             )
             
             if not cheapest_network:
@@ -649,9 +921,23 @@ class TradingLogic:
     
     def is_trading_active(self) -> bool:
         """Retorna si el trading está activo."""
-        return self.is_trading_active
+        return self.trading_active
+    
+    def get_active_operations(self) -> List[Dict]:
+        """Retorna las operaciones en curso."""
+        return list(self.active_operations.values())
+    
+    def _collect_metrics(self):
+        OPERATIONS_IN_FLIGHT.set(self.in_flight_count)
+        RESERVED_CAPITAL.set(self.reserved_capital_usdt)
+        TRADING_ACTIVE.set(1 if self.trading_active else 0)
     
-    def get_current_operation(self) -> Optional[Dict]:
-        """Retorna la operación actual si existe."""
-        return self.current_operation
+    def get_concurrency_stats(self) -> Dict:
+        """Retorna el estado del pipeline concurrente de oportunidades."""
+        return {
+            'in_flight': self.in_flight_count,
+            'active_operations': len(self.active_operations),
+            'max_concurrent_operations': self.max_concurrent_operations,
+            'reserved_capital_usdt': self.reserved_capital_usdt
+        }
 
@@ -3,12 +3,190 @@
 import asyncio
 import logging
 import json
+import time
 import urllib.parse
-from typing import Dict, Any, Set, Optional, Callable
+from collections import OrderedDict, deque
+from typing import Dict, Any, Set, List, Optional, Callable, Hashable
 import websockets
 from websockets.exceptions import ConnectionClosed
-from config_v3 import UI_WEBSOCKET_URL
+from config_v3 import (
+    UI_WEBSOCKET_URL, UI_CLIENT_QUEUE_SIZE, UI_SLOW_CLIENT_POLICY, UI_CLIENT_SEND_TIMEOUT,
+    UI_CLIENT_MAX_LAG, UI_COALESCED_MESSAGE_TYPES, UI_TOP20_HISTORY_SIZE, UI_DEFAULT_SERIALIZER
+)
 from utils import get_current_timestamp
+from serialization import Serializer, get_serializer, available_serializers
+from metrics import registry
+
+UI_CLIENTS = registry.gauge('v3_ui_clients', 'Clientes UI conectados')
+UI_OUTBOX_DEPTH = registry.gauge('v3_ui_outbox_depth', 'Mensajes pendientes de fan-out')
+UI_MAX_CLIENT_QUEUE = registry.gauge('v3_ui_max_client_queue', 'Mayor cola pendiente entre los clientes UI')
+UI_BROADCAST = registry.counter('v3_ui_broadcast_total', 'Contadores del fan-out a la UI', ['kind'])
+
+TOP20_TOPIC = "top20"
+TOP20_MODES = ("full", "delta")
+
+def get_row_key(row: Dict) -> str:
+    """Clave de una fila del top 20 / evento spot-arb: símbolo y par de exchanges."""
+    return f"{row.get('symbol')}|{row.get('exchange_min_id')}|{row.get('exchange_max_id')}"
+
+def get_message_topic(message_data: Dict) -> Optional[str]:
+    """Tópico al que pertenece un mensaje broadcast (el top 20 agrupa full, snapshot y delta)."""
+    message_type = message_data.get('type')
+    if message_type in ('top20_data', 'top20_snapshot', 'top20_delta'):
+        return TOP20_TOPIC
+    return message_type
+
+def get_coalesce_key(message_data: Dict) -> Optional[str]:
+    """Clave de último valor para tipos de alta frecuencia; None si el mensaje no se coalesce."""
+    message_type = message_data.get('type')
+    if message_type not in UI_COALESCED_MESSAGE_TYPES:
+        return None
+    
+    if message_type == 'spot_arb_data':
+        # Cada evento spot-arb es de un símbolo/par: solo se reemplaza el del mismo par
+        return f"spot_arb_data|{get_row_key(message_data.get('payload') or {})}"
+    
+    return message_type
+
+def compute_top20_delta(old_rows: Dict[str, Dict], new_rows: Dict[str, Dict]) -> Dict[str, Any]:
+    """Diferencia por fila entre dos versiones del top 20.
+    
+    Las actualizaciones llevan solo los campos que cambiaron; 'order' se incluye solo
+    si el orden resultante no es el de las filas previas seguidas de las insertadas.
+    """
+    inserts = {key: row for key, row in new_rows.items() if key not in old_rows}
+    removes = [key for key in old_rows if key not in new_rows]
+    
+    updates = {}
+    for key, row in new_rows.items():
+        old_row = old_rows.get(key)
+        if old_row is None or old_row == row:
+            continue
+        changed = {field: value for field, value in row.items() if old_row.get(field) != value}
+        changed.update({field: None for field in old_row if field not in row})
+        updates[key] = changed
+    
+    delta = {'inserts': inserts, 'updates': updates, 'removes': removes}
+    
+    implied_order = [key for key in old_rows if key in new_rows] + list(inserts)
+    if implied_order != list(new_rows):
+        delta['order'] = list(new_rows)
+    
+    return delta
+
+class ClientChannel:
+    """Cola acotada y tarea de escritura de un cliente UI."""
+    
+    def __init__(self, websocket, broadcaster: 'UIBroadcaster'):
+        self.websocket = websocket
+        self.broadcaster = broadcaster
+        self.logger = broadcaster.logger
+        
+        # Formato negociado con el cliente (json por defecto, orjson o msgpack)
+        self.serializer: Serializer = broadcaster.default_serializer
+        
+        # clave -> frame ya serializado; las claves de coalescing conservan su posición
+        self.pending: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._sequence = 0
+        self._full_since: Optional[float] = None
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        self.closed = False
+        
+        # Suscripciones: None recibe todos los tópicos salvo los excluidos
+        self.topics: Optional[Set[str]] = None
+        self.excluded_topics: Set[str] = set()
+        self.top20_mode = "full"
+        self.top20_version: Optional[int] = None  # Última versión encolada a este cliente
+    
+    def wants(self, topic: Optional[str]) -> bool:
+        """Indica si el cliente está suscrito al tópico."""
+        if topic is None:
+            return True
+        if self.topics is None:
+            return topic not in self.excluded_topics
+        return topic in self.topics
+    
+    def subscribe(self, topics: List[str]):
+        """Declarar tópicos reemplaza el 'todos' por defecto por la lista explícita."""
+        if self.topics is None:
+            self.topics = set()
+        self.topics.update(topics)
+    
+    def unsubscribe(self, topics: List[str]):
+        if self.topics is None:
+            self.excluded_topics.update(topics)
+        else:
+            self.topics.difference_update(topics)
+    
+    def enqueue(self, frame, coalesce_key: Optional[str] = None):
+        """Encola un frame sin bloquear aplicando coalescing y la política de lentos."""
+        if self.closed:
+            return
+        
+        stats = self.broadcaster.broadcast_stats
+        if coalesce_key is not None and coalesce_key in self.pending:
+            self.pending[coalesce_key] = frame
+            stats['frames_coalesced'] += 1
+            return
+        
+        if len(self.pending) >= UI_CLIENT_QUEUE_SIZE:
+            now = time.monotonic()
+            self._full_since = self._full_since or now
+            
+            if UI_SLOW_CLIENT_POLICY == "disconnect" or now - self._full_since > UI_CLIENT_MAX_LAG:
+                self.disconnect("cola llena")
+                return
+            
+            self.pending.popitem(last=False)
+            stats['frames_dropped'] += 1
+        
+        if coalesce_key is None:
+            self._sequence += 1
+            coalesce_key = self._sequence
+        
+        self.pending[coalesce_key] = frame
+        self._wakeup.set()
+    
+    async def _writer_loop(self):
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                
+                while self.pending:
+                    _, frame = self.pending.popitem(last=False)
+                    await asyncio.wait_for(self.websocket.send(frame), timeout=UI_CLIENT_SEND_TIMEOUT)
+                    self.broadcaster.broadcast_stats['frames_sent'] += 1
+                
+                self._full_since = None
+                
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.disconnect("send demasiado lento")
+        except ConnectionClosed:
+            self.closed = True
+        except Exception as e:
+            self.logger.error(f"Error enviando mensaje a cliente UI: {e}")
+            self.closed = True
+    
+    def disconnect(self, reason: str):
+        """Desconecta a un cliente que no da abasto."""
+        if self.closed:
+            return
+        
+        self.closed = True
+        self.pending.clear()
+        self.broadcaster.broadcast_stats['slow_clients_disconnected'] += 1
+        self.logger.warning(f"Cliente UI desconectado por lentitud ({reason})")
+        asyncio.create_task(self.websocket.close(code=1013, reason="Cliente demasiado lento"))
+    
+    async def close(self):
+        """Detiene la tarea de escritura."""
+        self.closed = True
+        self._writer_task.cancel()
+        await asyncio.gather(self._writer_task, return_exceptions=True)
 
 class UIBroadcaster:
     """Maneja la comunicación WebSocket con la interfaz de usuario."""
@@ -16,9 +194,35 @@ class UIBroadcaster:
     def __init__(self):
         self.logger = logging.getLogger('V3.UIBroadcaster')
         self.ui_clients: Set[websockets.WebSocketServerProtocol] = set()
+        self.client_channels: Dict[Any, ClientChannel] = {}
+        self.default_serializer = get_serializer(UI_DEFAULT_SERIALIZER)
         self.server = None
         self.is_running = False
         
+        # Bandeja de salida: los llamadores solo encolan; el fan-out serializa una vez por mensaje
+        self._outbox: 'OrderedDict[Hashable, Dict]' = OrderedDict()
+        self._outbox_sequence = 0
+        self._outbox_event = asyncio.Event()
+        self._fanout_task: Optional[asyncio.Task] = None
+        
+        # Top 20 versionado: la versión actual y un historial corto para deltas
+        self.top20_rows: Dict[str, Dict] = {}
+        self.top20_version = 0
+        self.top20_history: deque = deque([(0, {})], maxlen=UI_TOP20_HISTORY_SIZE)
+        
+        self.broadcast_stats = {
+            'messages_broadcast': 0,
+            'messages_serialized': 0,
+            'frames_sent': 0,
+            'frames_coalesced': 0,
+            'frames_dropped': 0,
+            'slow_clients_disconnected': 0,
+            'top20_deltas': 0,
+            'top20_snapshots': 0,
+            'top20_resyncs': 0
+        }
+        registry.register_collector(self._collect_metrics)
+        
         # Callbacks para mensajes de la UI
         self.on_trading_start_callback: Optional[Callable] = None
         self.on_trading_stop_callback: Optional[Callable] = None
@@ -50,6 +254,7 @@ class UIBroadcaster:
                 port
             )
             
+            self._fanout_task = asyncio.create_task(self._fanout_loop())
             self.is_running = True
             self.logger.info(f"Servidor WebSocket UI iniciado en ws://{host}:{port}")
             
@@ -59,6 +264,14 @@ class UIBroadcaster:
     
     async def stop_server(self):
         """Detiene el servidor WebSocket."""
+        if self._fanout_task:
+            self._fanout_task.cancel()
+            await asyncio.gather(self._fanout_task, return_exceptions=True)
+            self._fanout_task = None
+        
+        for channel in list(self.client_channels.values()):
+            await channel.close()
+        
         if self.server:
             self.server.close()
             await self.server.wait_closed()
@@ -71,6 +284,13 @@ class UIBroadcaster:
         self.logger.info(f"Cliente UI conectado: {client_address} (path: {path})")
         
         self.ui_clients.add(websocket)
+        channel = ClientChannel(websocket, self)
+        self.client_channels[websocket] = channel
+        
+        # Negociación del formato por query string: ws://host/api/spot/ui?serializer=msgpack
+        requested = urllib.parse.parse_qs(urllib.parse.urlparse(path or '').query).get('serializer')
+        if requested:
+            channel.serializer = get_serializer(requested[0])
         
         try:
             # Enviar estado inicial al cliente
@@ -86,6 +306,29 @@ class UIBroadcaster:
             self.logger.error(f"Error en cliente UI {client_address}: {e}")
         finally:
             self.ui_clients.discard(websocket)
+            self.client_channels.pop(websocket, None)
+            await channel.close()
+    
+    def _send_to_client(self, websocket, message_data: Dict):
+        """Encola un mensaje para un solo cliente, respetando el orden con los broadcasts."""
+        channel = self.client_channels.get(websocket)
+        if channel:
+            channel.enqueue(channel.serializer.dumps(message_data))
+    
+    def _frame_for(self, channel: ClientChannel, message_data: Dict, frames: Dict[str, Any]):
+        """Serializa una vez por formato y reutiliza el frame entre clientes del mismo formato."""
+        serializer = channel.serializer
+        if serializer.name not in frames:
+            frames[serializer.name] = serializer.dumps(message_data)
+            self.broadcast_stats['messages_serialized'] += 1
+        return frames[serializer.name]
+    
+    def _decode_client_message(self, websocket, message):
+        """Los frames binarios se decodifican con el formato del cliente; los de texto son JSON."""
+        channel = self.client_channels.get(websocket)
+        if isinstance(message, bytes) and channel and channel.serializer.binary:
+            return channel.serializer.loads(message)
+        return json.loads(message)
     
     async def _send_initial_state(self, websocket):
         """Envía el estado inicial a un cliente UI recién conectado."""
@@ -94,19 +337,21 @@ class UIBroadcaster:
             "payload": {
                 "trading_active": self.trading_active,
                 "trading_stats": self.trading_stats,
+                "serializer": self.client_channels[websocket].serializer.name,
+                "available_serializers": available_serializers(),
                 "timestamp": get_current_timestamp()
             }
         }
         
         try:
-            await websocket.send(json.dumps(initial_state))
+            self._send_to_client(websocket, initial_state)
         except Exception as e:
             self.logger.error(f"Error enviando estado inicial: {e}")
     
     async def _process_ui_message(self, websocket, message: str):
         """Procesa mensajes recibidos de la UI."""
         try:
-            data = json.loads(message)
+            data = self._decode_client_message(websocket, message)
             message_type = data.get('type')
             payload = data.get('payload', {})
             
@@ -120,6 +365,15 @@ class UIBroadcaster:
                 await self._send_trading_status(websocket)
             elif message_type == 'ping':
                 await self._send_pong(websocket)
+            elif message_type == 'subscribe':
+                self._handle_subscribe(websocket, payload)
+            elif message_type == 'unsubscribe':
+                self._handle_unsubscribe(websocket, payload)
+            elif message_type == 'set_serializer':
+                self._handle_set_serializer(websocket, payload)
+            elif message_type == 'top20_resync':
+                self.broadcast_stats['top20_resyncs'] += 1
+                self._send_top20_snapshot(websocket)
             else:
                 # Callback genérico para otros mensajes
                 if self.on_ui_message_callback:
@@ -130,6 +384,86 @@ class UIBroadcaster:
         except Exception as e:
             self.logger.error(f"Error procesando mensaje UI: {e}")
     
+    def _handle_subscribe(self, websocket, payload: Dict):
+        """Registra tópicos y el modo del top 20 ('full' o 'delta') declarados por el cliente.
+        
+        Ejemplo: {"type": "subscribe", "payload": {"topics": ["top20", "balance_update"], "top20_mode": "delta"}}
+        """
+        channel = self.client_channels.get(websocket)
+        if not channel:
+            return
+        
+        topics = payload.get('topics')
+        if topics:
+            channel.subscribe(topics)
+        
+        top20_mode = payload.get('top20_mode')
+        if top20_mode in TOP20_MODES and top20_mode != channel.top20_mode:
+            channel.top20_mode = top20_mode
+            channel.top20_version = None
+        
+        self._send_subscriptions(websocket)
+        
+        # Un cliente en modo delta arranca de un snapshot
+        if channel.top20_mode == "delta" and channel.wants(TOP20_TOPIC) and channel.top20_version is None:
+            self._send_top20_snapshot(websocket)
+    
+    def _handle_set_serializer(self, websocket, payload: Dict):
+        """Cambia el formato del cliente; la confirmación ya viaja en el formato nuevo."""
+        channel = self.client_channels.get(websocket)
+        if not channel:
+            return
+        
+        channel.serializer = get_serializer(payload.get('serializer'))
+        self._send_to_client(websocket, {
+            "type": "serializer_changed",
+            "payload": {"serializer": channel.serializer.name}
+        })
+    
+    def _handle_unsubscribe(self, websocket, payload: Dict):
+        """Quita tópicos de la suscripción del cliente."""
+        channel = self.client_channels.get(websocket)
+        if not channel:
+            return
+        
+        channel.unsubscribe(payload.get('topics') or [])
+        if not channel.wants(TOP20_TOPIC):
+            channel.top20_version = None
+        
+        self._send_subscriptions(websocket)
+    
+    def _send_subscriptions(self, websocket):
+        channel = self.client_channels[websocket]
+        self._send_to_client(websocket, {
+            "type": "subscriptions",
+            "payload": {
+                "topics": sorted(channel.topics) if channel.topics is not None else None,
+                "excluded_topics": sorted(channel.excluded_topics),
+                "top20_mode": channel.top20_mode,
+                "top20_version": self.top20_version
+            }
+        })
+    
+    def _build_top20_snapshot(self) -> Dict:
+        return {
+            "type": "top20_snapshot",
+            "payload": {
+                "version": self.top20_version,
+                "rows": list(self.top20_rows.values())
+            },
+            "timestamp": get_current_timestamp()
+        }
+    
+    def _send_top20_snapshot(self, websocket):
+        """Envía el top 20 completo y versionado a un cliente en modo delta."""
+        channel = self.client_channels.get(websocket)
+        if not channel:
+            return
+        
+        self._send_to_client(websocket, self._build_top20_snapshot())
+        channel.top20_version = self.top20_version
+        self.broadcast_stats['top20_snapshots'] += 1
+    
     async def _handle_start_trading(self, payload: Dict):
         """Maneja la solicitud de inicio de trading."""
         if not self.trading_active:
@@ -171,7 +505,7 @@ class UIBroadcaster:
         }
         
         try:
-            await websocket.send(json.dumps(status_message))
+            self._send_to_client(websocket, status_message)
         except Exception as e:
             self.logger.error(f"Error enviando estado de trading: {e}")
     
@@ -183,35 +517,139 @@ class UIBroadcaster:
         }
         
         try:
-            await websocket.send(json.dumps(pong_message))
+            self._send_to_client(websocket, pong_message)
         except Exception as e:
             self.logger.error(f"Error enviando pong: {e}")
     
     # Métodos públicos para broadcasting
     
     async def broadcast_message(self, message_data: Dict):
-        """Envía un mensaje a todos los clientes UI conectados."""
+        """Encola un mensaje para todos los clientes UI; costo O(1) sin importar cuántos haya."""
         if not self.ui_clients:
             return
         
-        message_json = json.dumps(message_data)
-        disconnected_clients = set()
+        self.broadcast_stats['messages_broadcast'] += 1
+        coalesce_key = get_coalesce_key(message_data)
         
-        for client in self.ui_clients:
-            try:
-                await client.send(message_json)
-            except ConnectionClosed:
-                disconnected_clients.add(client)
-            except Exception as e:
-                self.logger.error(f"Error enviando mensaje a cliente UI: {e}")
-                disconnected_clients.add(client)
+        if coalesce_key is not None and coalesce_key in self._outbox:
+            self._outbox[coalesce_key] = message_data
+            self.broadcast_stats['frames_coalesced'] += 1
+        else:
+            if coalesce_key is None:
+                self._outbox_sequence += 1
+                self._outbox[self._outbox_sequence] = message_data
+            else:
+                self._outbox[coalesce_key] = message_data
         
-        # Remover clientes desconectados
-        for client in disconnected_clients:
-            self.ui_clients.discard(client)
+        self._outbox_event.set()
+    
+    async def _fanout_loop(self):
+        """Serializa cada mensaje una sola vez y lo reparte a las colas de los clientes."""
+        while True:
+            await self._outbox_event.wait()
+            self._outbox_event.clear()
+            
+            while self._outbox:
+                key, message_data = self._outbox.popitem(last=False)
+                coalesce_key = key if isinstance(key, str) else None
+                
+                if message_data.get('type') == 'top20_data':
+                    self._fanout_top20(message_data)
+                    continue
+                
+                topic = get_message_topic(message_data)
+                frames: Dict[str, Any] = {}
+                
+                try:
+                    for channel in list(self.client_channels.values()):
+                        if channel.wants(topic):
+                            channel.enqueue(self._frame_for(channel, message_data, frames), coalesce_key)
+                except Exception as e:
+                    self.logger.error(f"Error serializando mensaje para UI: {e}")
+            
+            # Ceder el loop entre lotes para no acaparar con ráfagas grandes
+            await asyncio.sleep(0)
+    
+    def _fanout_top20(self, message_data: Dict):
+        """Reparte el top 20: lista completa a clientes 'full' y deltas por versión base a clientes 'delta'.
+        
+        Los clientes con la misma versión base comparten el frame serializado. Si la base
+        ya salió del historial se envía un snapshot; si un delta se pierde (cola llena),
+        el cliente detecta el salto de versión y pide 'top20_resync'.
+        """
+        history = dict(self.top20_history)
+        full_message = {**message_data, "version": self.top20_version}
+        full_frames: Dict[str, Any] = {}
+        delta_messages: Dict[Optional[int], Dict] = {}
+        delta_frames: Dict[Optional[int], Dict[str, Any]] = {}
+        
+        try:
+            for channel in list(self.client_channels.values()):
+                if not channel.wants(TOP20_TOPIC):
+                    continue
+                
+                if channel.top20_mode == "full":
+                    channel.enqueue(self._frame_for(channel, full_message, full_frames), 'top20_data')
+                    continue
+                
+                base_version = channel.top20_version
+                if base_version == self.top20_version:
+                    continue
+                
+                if base_version not in history:
+                    base_version = None
+                
+                if base_version not in delta_messages:
+                    if base_version is None:
+                        delta_messages[None] = self._build_top20_snapshot()
+                    else:
+                        delta_messages[base_version] = {
+                            "type": "top20_delta",
+                            "payload": {
+                                "base_version": base_version,
+                                "version": self.top20_version,
+                                **compute_top20_delta(history[base_version], self.top20_rows)
+                            },
+                            "timestamp": message_data.get('timestamp')
+                        }
+                    delta_frames[base_version] = {}
+                
+                # Los deltas no se coalescen en la cola: cada uno depende del anterior
+                channel.enqueue(self._frame_for(channel, delta_messages[base_version], delta_frames[base_version]))
+                channel.top20_version = self.top20_version
+                self.broadcast_stats['top20_snapshots' if base_version is None else 'top20_deltas'] += 1
+                
+        except Exception as e:
+            self.logger.error(f"Error repartiendo top 20 a la UI: {e}")
+    
+    def get_broadcast_stats(self) -> Dict[str, Any]:
+        """Retorna estadísticas del fan-out a la UI."""
+        return {
+            **self.broadcast_stats,
+            'top20_version': self.top20_version,
+            'clients': len(self.client_channels),
+            'outbox_depth': len(self._outbox),
+            'max_client_queue': max((len(c.pending) for c in self.client_channels.values()), default=0)
+        }
+    
+    def _collect_metrics(self):
+        stats = self.get_broadcast_stats()
+        UI_CLIENTS.set(stats['clients'])
+        UI_OUTBOX_DEPTH.set(stats['outbox_depth'])
+        UI_MAX_CLIENT_QUEUE.set(stats['max_client_queue'])
+        for kind, value in self.broadcast_stats.items():
+            UI_BROADCAST.set(value, kind=kind)
     
     async def broadcast_top20_data(self, top20_data: list):
-        """Retransmite datos del top 20 a la UI."""
+        """Retransmite datos del top 20 a la UI y avanza su versión."""
+        rows = {get_row_key(row): row for row in top20_data if isinstance(row, dict)}
+        if rows == self.top20_rows and list(rows) == list(self.top20_rows):
+            return
+        
+        self.top20_rows = rows
+        self.top20_version += 1
+        self.top20_history.append((self.top20_version, rows))
+        
         message = {
             "type": "top20_data",
             "payload": top20_data,
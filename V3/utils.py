@@ -4,8 +4,9 @@ import json
 import logging
 import asyncio
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 import aiohttp
+from http_pool import http_pool
 
 def setup_logging(log_level: str = "INFO", log_file: str = None):
     """Configura el sistema de logging para V3."""
@@ -118,19 +119,23 @@ def create_symbol_dict(top20_item: Dict) -> Dict[str, Any]:
     }
 
 async def make_http_request(
-    session: aiohttp.ClientSession,
+    session: Optional[aiohttp.ClientSession],
     method: str,
     url: str,
     timeout: int = 30,
+    json_loads: Callable = json.loads,
     **kwargs
 ) -> Optional[Dict]:
-    """Realiza una petición HTTP de forma segura."""
+    """Realiza una petición HTTP de forma segura (sin sesión usa la del pool compartido)."""
     try:
+        if session is None:
+            session = http_pool.get_session()
+        
         async with session.request(
             method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs
         ) as response:
             if response.status == 200:
-                return await response.json()
+                return await response.json(loads=json_loads)
             else:
                 logging.getLogger('V3').warning(
                     f"HTTP {method} {url} returned status {response.status}"
@@ -143,9 +148,14 @@ async def make_http_request(
         logging.getLogger('V3').error(f"Error en petición HTTP {method} {url}: {e}")
         return None
 
-def save_json_file(data: Dict, filepath: str) -> bool:
-    """Guarda datos en un archivo JSON."""
+def save_json_file(data: Dict, filepath: str, serializer=None) -> bool:
+    """Guarda datos en un archivo JSON (con el serializador dado, por defecto stdlib json)."""
     try:
+        if serializer is not None:
+            with open(filepath, 'wb') as f:
+                f.write(serializer.dumps_file(data))
+            return True
+        
         with open(filepath, 'w') as f:
             json.dump(data, f, indent=2, default=str)
         return True
@@ -153,9 +163,13 @@ def save_json_file(data: Dict, filepath: str) -> bool:
         logging.getLogger('V3').error(f"Error guardando archivo JSON {filepath}: {e}")
         return False
 
-def load_json_file(filepath: str) -> Optional[Dict]:
+def load_json_file(filepath: str, serializer=None) -> Optional[Dict]:
     """Carga datos desde un archivo JSON."""
     try:
+        if serializer is not None and not serializer.binary:
+            with open(filepath, 'rb') as f:
+                return serializer.loads(f.read())
+        
         with open(filepath, 'r') as f:
             return json.load(f)
     except FileNotFoundError: